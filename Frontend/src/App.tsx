@@ -3,37 +3,31 @@ import Header from './components/Header';
 import ChatContainer from './components/ChatContainer';
 import Sidebar from './components/Sidebar';
 import { ThemeProvider } from './context/ThemeContext';
-import { conversationService, Conversation } from './services/conversationService';
+import { conversationService, Conversation, ChatMessage } from './services/conversationService';
 
 function App() {
   const [sidebarOpen, setSidebarOpen] = useState(false);
   const [conversations, setConversations] = useState<Conversation[]>([]);
   const [currentConversationId, setCurrentConversationId] = useState<string | null>(null);
 
-  // Charger les conversations au démarrage
+  // Charger les conversations au démarrage (première page, les plus récentes)
   useEffect(() => {
-    const loadedConversations = conversationService.getConversations();
-    setConversations(loadedConversations);
+    conversationService.getConversations()
+      .then(({ conversations }) => setConversations(conversations))
+      .catch(error => console.error('Erreur lors du chargement des conversations:', error));
   }, []);
 
   const handleMenuClick = () => {
     setSidebarOpen(!sidebarOpen);
   };
 
-  const handleNewChat = () => {
-    const initialMessage = {
-      id: '1',
-      type: 'assistant',
-      content: "Bonjour ! Je suis l'assistant IA de DURABILIS.CO, spécialisé dans l'analyse de documents techniques sur le développement durable, l'environnement et le sport. Comment puis-je vous aider aujourd'hui ?",
-      timestamp: new Date(),
-    };
-
-    const newConversation = conversationService.createConversation(
-      `Nouvelle conversation ${new Date().toLocaleString('fr-FR')}`,
-      initialMessage
-    );
+  const updateConversation = (conversationId: string, update: (conv: Conversation) => Conversation) => {
+    setConversations(prev => prev.map(conv => conv.id === conversationId ? update(conv) : conv));
+  };
 
-    setConversations(prev => [...prev, newConversation]);
+  const handleNewChat = async () => {
+    const newConversation = await conversationService.createConversation();
+    setConversations(prev => [newConversation, ...prev]);
     setCurrentConversationId(newConversation.id);
 
     if (window.innerWidth < 1024) {
@@ -41,8 +35,16 @@ function App() {
     }
   };
 
-  const handleDeleteConversation = (conversationId: string) => {
-    if (conversationService.deleteConversation(conversationId)) {
+  // Crée la conversation au premier message envoyé hors conversation
+  const handleEnsureConversation = async (firstMessage: string): Promise<string> => {
+    const newConversation = await conversationService.createConversation(firstMessage.slice(0, 60));
+    setConversations(prev => [newConversation, ...prev]);
+    setCurrentConversationId(newConversation.id);
+    return newConversation.id;
+  };
+
+  const handleDeleteConversation = async (conversationId: string) => {
+    if (await conversationService.deleteConversation(conversationId)) {
       setConversations(prev => prev.filter(conv => conv.id !== conversationId));
       if (currentConversationId === conversationId) {
         setCurrentConversationId(null);
@@ -50,6 +52,34 @@ function App() {
     }
   };
 
+  // Les échanges sont enregistrés par le serveur : on ne met à jour que l'état local
+  const handleConversationUpdate = (conversationId: string, messages: ChatMessage[]) => {
+    setConversations(prev => {
+      const conversation = prev.find(conv => conv.id === conversationId);
+      if (!conversation) return prev;
+      const updated = {
+        ...conversation,
+        messages,
+        lastMessage: messages[messages.length - 1]?.content ?? conversation.lastMessage,
+        updatedAt: new Date(),
+      };
+      return [updated, ...prev.filter(conv => conv.id !== conversationId)];
+    });
+  };
+
+  const loadMessages = async (conversationId: string, before?: number) => {
+    try {
+      const { messages, nextBefore } = await conversationService.getMessages(conversationId, before);
+      updateConversation(conversationId, conv => ({
+        ...conv,
+        messages: before === undefined ? messages : [...messages, ...conv.messages],
+        olderMessagesCursor: nextBefore,
+      }));
+    } catch (error) {
+      console.error('Erreur lors du chargement des messages:', error);
+    }
+  };
+
   const handleExport = () => {
     console.log('Export conversation');
   };
@@ -60,6 +90,10 @@ function App() {
 
   const handleConversationSelect = (conversationId: string) => {
     setCurrentConversationId(conversationId);
+    const conversation = conversations.find(conv => conv.id === conversationId);
+    if (conversation && conversation.messages.length === 0 && conversation.messageCount > 0) {
+      loadMessages(conversationId);
+    }
     if (window.innerWidth < 1024) {
       setSidebarOpen(false);
     }
@@ -93,14 +127,11 @@ function App() {
           <ChatContainer 
             onNewChat={handleNewChat}
             currentConversation={currentConversation}
-            onConversationUpdate={(messages) => {
-              if (currentConversationId) {
-                const updated = conversationService.updateConversation(currentConversationId, messages);
-                if (updated) {
-                  setConversations(prev => 
-                    prev.map(conv => conv.id === currentConversationId ? updated : conv)
-                  );
-                }
+            onEnsureConversation={handleEnsureConversation}
+            onConversationUpdate={handleConversationUpdate}
+            onLoadOlderMessages={() => {
+              if (currentConversation && currentConversation.olderMessagesCursor !== null) {
+                loadMessages(currentConversation.id, currentConversation.olderMessagesCursor);
               }
             }}
           />
@@ -3,37 +3,29 @@ import { useState, useEffect } from 'react';
 import MessageList from './MessageList';
 import InputArea from './InputArea';
 import { chatService } from '../services/api';
-import { Conversation } from '../services/conversationService';
-
-interface Message {
-  id: string;
-  type: 'user' | 'assistant';
-  content: string;
-  timestamp: Date;
-  sources?: {
-    title: string;
-    fichier: string;
-    date_modification: string;
-  }[];
-}
+import { Conversation, ChatMessage as Message } from '../services/conversationService';
 
 interface ChatContainerProps {
   onNewChat: () => void;
   currentConversation: Conversation | null;
-  onConversationUpdate: (messages: Message[]) => void;
+  onEnsureConversation: (firstMessage: string) => Promise<string>;
+  onConversationUpdate: (conversationId: string, messages: Message[]) => void;
+  onLoadOlderMessages: () => void;
 }
 
 const ChatContainer: React.FC<ChatContainerProps> = ({ 
   onNewChat, 
   currentConversation,
-  onConversationUpdate 
+  onEnsureConversation,
+  onConversationUpdate,
+  onLoadOlderMessages
 }) => {
   const [messages, setMessages] = useState<Message[]>([]);
   const [isLoading, setIsLoading] = useState(false);
 
   // Mettre à jour les messages quand la conversation change
   useEffect(() => {
-    if (currentConversation) {
+    if (currentConversation && currentConversation.messages.length > 0) {
       setMessages(currentConversation.messages);
     } else {
       setMessages([{
@@ -56,15 +48,33 @@ const ChatContainer: React.FC<ChatContainerProps> = ({
 
     const newMessages = [...messages, userMessage];
     setMessages(newMessages);
-    onConversationUpdate(newMessages);
     setIsLoading(true);
 
+    let conversationId = currentConversation?.id;
     try {
-      // Appel à notre API
-      const response = await chatService.sendMessage(content);
+      // Le serveur enregistre l'échange dans la conversation passée en session_id
+      if (!conversationId) {
+        conversationId = await onEnsureConversation(content);
+      }
+      onConversationUpdate(conversationId, newMessages);
+
+      // Appel à notre API en streaming : la réponse s'affiche au fil de la génération
+      const assistantId = (Date.now() + 1).toString();
+      let streamed = '';
+      const response = await chatService.sendMessageStream(content, conversationId, {
+        onToken: (text) => {
+          streamed += text;
+          setMessages([...newMessages, {
+            id: assistantId,
+            type: 'assistant',
+            content: streamed,
+            timestamp: new Date(),
+          }]);
+        },
+      });
       
       const assistantMessage: Message = {
-        id: (Date.now() + 1).toString(),
+        id: assistantId,
         type: 'assistant',
         content: response.reponse,
         timestamp: new Date(),
@@ -77,7 +87,7 @@ const ChatContainer: React.FC<ChatContainerProps> = ({
 
       const updatedMessages = [...newMessages, assistantMessage];
       setMessages(updatedMessages);
-      onConversationUpdate(updatedMessages);
+      onConversationUpdate(conversationId, updatedMessages);
     } catch (error) {
       // Message d'erreur en cas d'échec
       const errorMessage: Message = {
@@ -88,7 +98,9 @@ const ChatContainer: React.FC<ChatContainerProps> = ({
       };
       const updatedMessages = [...newMessages, errorMessage];
       setMessages(updatedMessages);
-      onConversationUpdate(updatedMessages);
+      if (conversationId) {
+        onConversationUpdate(conversationId, updatedMessages);
+      }
     } finally {
       setIsLoading(false);
     }
@@ -149,6 +161,14 @@ const ChatContainer: React.FC<ChatContainerProps> = ({
       )}
 
       {/* Message List */}
+      {messages.length > 1 && currentConversation && currentConversation.olderMessagesCursor !== null && (
+        <button
+          onClick={onLoadOlderMessages}
+          className="mx-auto mt-2 text-xs text-durabilis-primary dark:text-durabilis-light hover:underline"
+        >
+          Afficher les messages précédents
+        </button>
+      )}
       {messages.length > 1 && (
         <MessageList messages={messages} isLoading={isLoading} />
       )}
@@ -1,5 +1,5 @@
 import React, { useState } from 'react';
-import { Conversation } from '../services/conversationService';
+import { Conversation, conversationService } from '../services/conversationService';
 
 interface SidebarProps {
   isOpen: boolean;
@@ -54,8 +54,9 @@ const Sidebar: React.FC<SidebarProps> = ({
     }
   };
 
-  const handleExportConversation = (e: React.MouseEvent, conversation: Conversation) => {
+  const handleExportConversation = async (e: React.MouseEvent, conversation: Conversation) => {
     e.stopPropagation();
+    const messages = await conversationService.getAllMessages(conversation.id);
 
     const exportContent = `
 DURABILIS.CO - Export de Conversation
@@ -65,7 +66,7 @@ Titre: ${conversation.title}
 Date: ${conversation.updatedAt.toLocaleString('fr-FR')}
 
 Messages:
-${conversation.messages.map(msg => `
+${messages.map(msg => `
 ${msg.type === 'user' ? '👤 Vous' : '🤖 Assistant'}: ${msg.content}
 `).join('\n')}
 
@@ -151,7 +152,7 @@ Export généré le: ${new Date().toLocaleString('fr-FR')}
                         {conversation.title}
                       </h3>
                       <p className="text-xs text-gray-500 dark:text-gray-400 truncate">
-                        {conversation.messages[conversation.messages.length - 1]?.content || 'Nouvelle conversation'}
+                        {conversation.lastMessage || 'Nouvelle conversation'}
                       </p>
                       <p className="text-xs text-gray-400 dark:text-gray-500 mt-1">
                         {conversation.updatedAt.toLocaleString('fr-FR')}
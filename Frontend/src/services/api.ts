@@ -1,6 +1,6 @@
 import axios from 'axios';
 
-const API_URL = 'http://localhost:8000/api';
+export const API_URL = 'http://localhost:8000/api';
 
 interface Source {
     fichier: string;
@@ -15,9 +15,29 @@ interface ChatResponse {
 
 interface ChatRequest {
     message: string;
+    session_id?: string;
 }
 
-const api = axios.create({
+interface StreamHandlers {
+    onToken: (text: string) => void;
+    signal?: AbortSignal;
+}
+
+// Découpe un flux text/event-stream en événements { event, data }
+const parseSseEvent = (block: string): { event: string; data: string } => {
+    let event = 'message';
+    const data: string[] = [];
+    for (const line of block.split('\n')) {
+        if (line.startsWith('event:')) {
+            event = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+            data.push(line.slice(5).trim());
+        }
+    }
+    return { event, data: data.join('\n') };
+};
+
+export const api = axios.create({
     baseURL: API_URL,
     headers: {
         'Content-Type': 'application/json',
@@ -25,9 +45,10 @@ const api = axios.create({
 });
 
 export const chatService = {
-    sendMessage: async (message: string): Promise<ChatResponse> => {
+    sendMessage: async (message: string, sessionId?: string): Promise<ChatResponse> => {
         try {
-            const response = await api.post<ChatResponse>('/chat', { message });
+            const payload: ChatRequest = { message, session_id: sessionId };
+            const response = await api.post<ChatResponse>('/chat', payload);
             return response.data;
         } catch (error) {
             console.error('Erreur lors de l\'envoi du message:', error);
@@ -35,6 +56,55 @@ export const chatService = {
         }
     },
 
+    // Variante streaming : les tokens sont transmis à onToken dès leur génération,
+    // la promesse se résout avec la réponse complète et ses sources.
+    sendMessageStream: async (
+        message: string,
+        sessionId: string | undefined,
+        { onToken, signal }: StreamHandlers
+    ): Promise<ChatResponse> => {
+        const payload: ChatRequest = { message, session_id: sessionId };
+        const response = await fetch(`${API_URL}/chat/stream`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                Accept: 'text/event-stream',
+            },
+            body: JSON.stringify(payload),
+            signal,
+        });
+
+        if (!response.ok || !response.body) {
+            throw new Error(`Erreur HTTP ${response.status}`);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let separator = buffer.indexOf('\n\n');
+            while (separator !== -1) {
+                const { event, data } = parseSseEvent(buffer.slice(0, separator));
+                buffer = buffer.slice(separator + 2);
+                separator = buffer.indexOf('\n\n');
+
+                if (event === 'token') {
+                    onToken(JSON.parse(data).text);
+                } else if (event === 'end') {
+                    return JSON.parse(data) as ChatResponse;
+                } else if (event === 'error') {
+                    throw new Error(JSON.parse(data).detail);
+                }
+            }
+        }
+        throw new Error('Flux interrompu avant la fin de la réponse');
+    },
+
     checkHealth: async (): Promise<{ status: string }> => {
         try {
             const response = await api.get<{ status: string }>('/health');
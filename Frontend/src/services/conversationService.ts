@@ -1,89 +1,133 @@
-import { Message } from '../types/Message';
+import { api } from './api';
+
+// Message tel qu'affiché dans le fil de discussion
+export interface ChatMessage {
+  id: string;
+  type: 'user' | 'assistant';
+  content: string;
+  timestamp: Date;
+  sources?: {
+    title: string;
+    fichier: string;
+    date_modification: string;
+  }[];
+}
 
 export interface Conversation {
   id: string;
   title: string;
-  messages: Message[];
+  // Messages chargés (la page la plus récente, puis les pages précédentes à la demande)
+  messages: ChatMessage[];
+  messageCount: number;
+  lastMessage: string | null;
+  // Curseur pour charger les messages plus anciens (null : tout est chargé)
+  olderMessagesCursor: number | null;
   createdAt: Date;
   updatedAt: Date;
 }
 
-class ConversationService {
-  private readonly STORAGE_KEY = 'durabilis_conversations';
+interface ServerConversation {
+  id: string;
+  title: string | null;
+  created_at: string;
+  updated_at: string;
+  message_count: number;
+  last_message: string | null;
+}
 
-  // Récupérer toutes les conversations
-  getConversations(): Conversation[] {
-    const conversations = localStorage.getItem(this.STORAGE_KEY);
-    if (!conversations) return [];
-    
-    return JSON.parse(conversations).map((conv: any) => ({
-      ...conv,
-      createdAt: new Date(conv.createdAt),
-      updatedAt: new Date(conv.updatedAt),
-      messages: conv.messages.map((msg: any) => ({
-        ...msg,
-        timestamp: new Date(msg.timestamp)
-      }))
-    }));
-  }
+interface ServerMessage {
+  seq: number;
+  role: 'user' | 'assistant';
+  content: string;
+  sources: { fichier: string; titre: string; date_modification: string }[];
+  created_at: string;
+}
 
-  // Récupérer une conversation spécifique
-  getConversation(id: string): Conversation | null {
-    const conversations = this.getConversations();
-    return conversations.find(conv => conv.id === id) || null;
-  }
+const DEFAULT_TITLE = 'Nouvelle conversation';
 
-  // Créer une nouvelle conversation
-  createConversation(title: string, initialMessage: Message): Conversation {
-    const conversations = this.getConversations();
-    const newConversation: Conversation = {
-      id: Date.now().toString(),
-      title,
-      messages: [initialMessage],
-      createdAt: new Date(),
-      updatedAt: new Date()
-    };
+const toConversation = (conv: ServerConversation): Conversation => ({
+  id: conv.id,
+  title: conv.title || DEFAULT_TITLE,
+  messages: [],
+  messageCount: conv.message_count,
+  lastMessage: conv.last_message,
+  olderMessagesCursor: null,
+  createdAt: new Date(conv.created_at),
+  updatedAt: new Date(conv.updated_at),
+});
 
-    conversations.push(newConversation);
-    this.saveConversations(conversations);
-    return newConversation;
+const toChatMessage = (conversationId: string, msg: ServerMessage): ChatMessage => ({
+  id: `${conversationId}-${msg.seq}`,
+  type: msg.role,
+  content: msg.content,
+  timestamp: new Date(msg.created_at),
+  sources: msg.sources.map(source => ({
+    title: source.titre,
+    fichier: source.fichier,
+    date_modification: source.date_modification,
+  })),
+});
+
+// Conversations enregistrées côté serveur (/api/conversations). Les échanges sont
+// ajoutés par le serveur lui-même quand l'identifiant de la conversation est passé
+// comme session_id à /api/chat/stream : le client n'a jamais à renvoyer l'historique.
+class ConversationService {
+  // Récupérer une page de conversations, des plus récentes aux plus anciennes
+  async getConversations(
+    before?: string
+  ): Promise<{ conversations: Conversation[]; nextCursor: string | null }> {
+    const response = await api.get<{ conversations: ServerConversation[]; next_cursor: string | null }>(
+      '/conversations',
+      { params: { before } }
+    );
+    return {
+      conversations: response.data.conversations.map(toConversation),
+      nextCursor: response.data.next_cursor,
+    };
   }
 
-  // Mettre à jour une conversation
-  updateConversation(id: string, messages: Message[]): Conversation | null {
-    const conversations = this.getConversations();
-    const index = conversations.findIndex(conv => conv.id === id);
-    
-    if (index === -1) return null;
+  // Créer une nouvelle conversation (vide)
+  async createConversation(title?: string): Promise<Conversation> {
+    const response = await api.post<ServerConversation>('/conversations', { title });
+    return toConversation(response.data);
+  }
 
-    const updatedConversation = {
-      ...conversations[index],
-      messages,
-      updatedAt: new Date()
+  // Récupérer une page de messages : les plus récents, ou ceux qui précèdent `before`
+  async getMessages(
+    id: string,
+    before?: number
+  ): Promise<{ messages: ChatMessage[]; nextBefore: number | null }> {
+    const response = await api.get<{ messages: ServerMessage[]; next_before: number | null }>(
+      `/conversations/${id}/messages`,
+      { params: { before } }
+    );
+    return {
+      messages: response.data.messages.map(msg => toChatMessage(id, msg)),
+      nextBefore: response.data.next_before,
     };
+  }
 
-    conversations[index] = updatedConversation;
-    this.saveConversations(conversations);
-    return updatedConversation;
+  // Récupérer tous les messages d'une conversation (export)
+  async getAllMessages(id: string): Promise<ChatMessage[]> {
+    let { messages, nextBefore } = await this.getMessages(id);
+    while (nextBefore !== null) {
+      const page = await this.getMessages(id, nextBefore);
+      messages = [...page.messages, ...messages];
+      nextBefore = page.nextBefore;
+    }
+    return messages;
   }
 
   // Supprimer une conversation
-  deleteConversation(id: string): boolean {
-    const conversations = this.getConversations();
-    const filteredConversations = conversations.filter(conv => conv.id !== id);
-    
-    if (filteredConversations.length === conversations.length) {
+  async deleteConversation(id: string): Promise<boolean> {
+    try {
+      await api.delete(`/conversations/${id}`);
+      return true;
+    } catch (error) {
+      console.error('Erreur lors de la suppression de la conversation:', error);
       return false;
     }
-
-    this.saveConversations(filteredConversations);
-    return true;
-  }
-
-  // Sauvegarder toutes les conversations
-  private saveConversations(conversations: Conversation[]): void {
-    localStorage.setItem(this.STORAGE_KEY, JSON.stringify(conversations));
   }
 }
 
-export const conversationService = new ConversationService(); 
\ No newline at end of file
+export const conversationService = new ConversationService();
@@ -1,7 +1,11 @@
+import argparse
 import docx
+import hashlib
 import json
+import multiprocessing
 import os
 from datetime import datetime
+from ingestion import iter_records
 
 def get_docx_metadata(document):
     """
@@ -69,75 +73,184 @@ def extract_text_from_docx(docx_filepath):
         print(f"Une erreur est survenue lors de la lecture de '{docx_filepath}' : {e}")
         return None, None
 
-def convert_all_docx_to_single_json(source_directory, output_file):
+def file_sha1(filepath):
+    """Calcule l'empreinte SHA-1 du contenu d'un fichier."""
+    digest = hashlib.sha1()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def extract_document(docx_filepath):
+    """
+    Extrait un document Word complet (contenu et métadonnées).
+    Exécutée dans un processus du pool : tout ce qu'elle renvoie doit être sérialisable.
+
+    Args:
+        docx_filepath (str): Le chemin complet du fichier Word à lire.
+
+    Returns:
+        tuple: (nom du fichier, document ou None en cas d'erreur, empreinte SHA-1).
+    """
+    filename = os.path.basename(docx_filepath)
+    sha1 = file_sha1(docx_filepath)
+    extracted_paragraphs, document_obj = extract_text_from_docx(docx_filepath)
+    if extracted_paragraphs is None:
+        return filename, None, sha1
+
+    record = {
+        "metadata": get_docx_metadata(document_obj),
+        "content": {
+            "paragraphs": extracted_paragraphs
+        }
+    }
+    return filename, record, sha1
+
+def load_state(state_file):
+    """Charge l'état de la dernière conversion (date de modification, taille et empreinte par fichier)."""
+    try:
+        with open(state_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def find_unchanged(source_directory, filenames, previous_state):
+    """
+    Sépare les fichiers inchangés depuis la dernière conversion des autres.
+
+    Un fichier est inchangé si sa date de modification et sa taille sont identiques ;
+    si seule la date a changé, on compare son empreinte SHA-1 (bien moins coûteuse
+    qu'une nouvelle lecture par python-docx).
+
+    Returns:
+        tuple: (état des fichiers inchangés, liste des fichiers à convertir).
+    """
+    state = {}
+    to_convert = []
+    for filename in filenames:
+        filepath = os.path.join(source_directory, filename)
+        stat = os.stat(filepath)
+        previous = previous_state.get(filename)
+        current = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+        if previous and previous["size"] == stat.st_size:
+            if previous["mtime_ns"] == stat.st_mtime_ns or previous["sha1"] == file_sha1(filepath):
+                state[filename] = {**current, "sha1": previous["sha1"]}
+                continue
+        to_convert.append(filename)
+    return state, to_convert
+
+def convert_all_docx_to_single_json(source_directory, output_file, workers=None, incremental=True):
     """
     Convertit tous les documents Word (.docx) d'un répertoire en un seul fichier JSON.
     Chaque document est stocké avec ses métadonnées et son contenu.
 
+    Les fichiers sont lus en parallèle par un pool de processus. Si `output_file` se
+    termine par `.jsonl`, chaque document est écrit sur sa propre ligne dès qu'il est
+    extrait, sans garder le corpus en mémoire. En mode incrémental, les fichiers dont
+    la date de modification, la taille ou l'empreinte n'ont pas changé depuis la
+    dernière exécution ne sont pas relus : leur entrée est reprise du fichier précédent.
+
     Args:
         source_directory (str): Le répertoire contenant les fichiers DOCX.
-        output_file (str): Le chemin du fichier JSON de sortie.
+        output_file (str): Le chemin du fichier JSON (ou JSONL) de sortie.
+        workers (int, optional): Nombre de processus (par défaut, le nombre de cœurs).
+        incremental (bool): Réutiliser les documents inchangés de la dernière exécution.
     """
-    # Dictionnaire qui contiendra tous les documents
-    all_documents = {}
-    
-    # Parcourir tous les fichiers .docx du répertoire
-    for filename in os.listdir(source_directory):
-        if filename.endswith(".docx"):
-            docx_filepath = os.path.join(source_directory, filename)
-            # Extraire le texte et l'objet document
-            extracted_paragraphs, document_obj = extract_text_from_docx(docx_filepath)
-            
-            if extracted_paragraphs is not None:
-                # Extraire les métadonnées (uniquement les non vides)
-                metadata = get_docx_metadata(document_obj)
-                
-                # Ajouter le document au dictionnaire principal
-                all_documents[filename] = {
-                    "metadata": metadata,
-                    "content": {
-                        "paragraphs": extracted_paragraphs
-                    }
-                }
-                print(f"Le document '{filename}' a été traité avec succès.")
+    streaming = output_file.endswith(".jsonl")
+    state_file = output_file + ".state.json"
+    filenames = sorted(f for f in os.listdir(source_directory) if f.endswith(".docx"))
+
+    previous_state = load_state(state_file) if incremental and os.path.exists(output_file) else {}
+    state, to_convert = find_unchanged(source_directory, filenames, previous_state)
 
     try:
-        # Sauvegarder tous les documents dans un seul fichier JSON
-        with open(output_file, mode='w', encoding='utf-8') as json_file:
-            json.dump(all_documents, json_file, indent=4, ensure_ascii=False)
+        tmp_file = output_file + ".tmp"
+        with open(tmp_file, mode='w', encoding='utf-8') as json_file:
+            # Dictionnaire qui contiendra tous les documents (mode JSON uniquement)
+            all_documents = {}
+
+            def write(filename, record):
+                if streaming:
+                    json_file.write(json.dumps({"fichier": filename, **record}, ensure_ascii=False) + "\n")
+                else:
+                    all_documents[filename] = record
+
+            # Reprendre les documents inchangés depuis la sortie précédente
+            if state:
+                for filename, record in iter_records(output_file):
+                    if filename in state:
+                        record.pop("fichier", None)
+                        write(filename, record)
+                        state[filename]["reused"] = True
+                for filename in [f for f, entry in state.items() if not entry.pop("reused", False)]:
+                    # Absent de la sortie précédente : il faut le reconvertir
+                    del state[filename]
+                    to_convert.append(filename)
+                print(f"{len(state)} document(s) inchangé(s) repris sans relecture.")
+
+            paths = [os.path.join(source_directory, filename) for filename in to_convert]
+            with multiprocessing.Pool(processes=workers) as pool:
+                for filename, record, sha1 in pool.imap_unordered(extract_document, paths, chunksize=4):
+                    if record is None:
+                        continue
+                    write(filename, record)
+                    stat = os.stat(os.path.join(source_directory, filename))
+                    state[filename] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha1": sha1}
+                    print(f"Le document '{filename}' a été traité avec succès.")
+
+            # Sauvegarder tous les documents dans un seul fichier JSON
+            if not streaming:
+                json.dump(all_documents, json_file, indent=4, ensure_ascii=False)
+
+        os.replace(tmp_file, output_file)
+        with open(state_file, mode='w', encoding='utf-8') as f:
+            json.dump(state, f)
         print(f"\nTous les documents ont été convertis et sauvegardés dans '{output_file}'")
     except Exception as e:
         print(f"Une erreur est survenue lors de la sauvegarde du fichier JSON : {e}")
 
 # --- Programme principal ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Conversion des documents Word en corpus JSON/JSONL")
+    parser.add_argument("--source", default="vos_fichiers_word", help="Dossier contenant les fichiers Word")
+    parser.add_argument("--output", default="Data.json", help="Fichier de sortie (.json ou .jsonl pour le streaming)")
+    parser.add_argument("--workers", type=int, default=None, help="Nombre de processus (défaut : nombre de cœurs)")
+    parser.add_argument("--full", action="store_true", help="Tout reconvertir, même les fichiers inchangés")
+    args = parser.parse_args()
+
     # Configuration des chemins
-    SOURCE_DOCX_DIR = "vos_fichiers_word"  # Dossier contenant les fichiers Word
-    OUTPUT_JSON_FILE = "Data.json"  # Fichier JSON de sortie
+    SOURCE_DOCX_DIR = args.source  # Dossier contenant les fichiers Word
+    OUTPUT_JSON_FILE = args.output  # Fichier JSON de sortie
 
     # Création d'un fichier DOCX d'exemple si le dossier n'existe pas
     if not os.path.exists(SOURCE_DOCX_DIR):
         os.makedirs(SOURCE_DOCX_DIR)
-    try:
-        # Création d'un document Word de test
-        doc = docx.Document()
-        # Définition des métadonnées pour le document de test
-        doc.core_properties.title = "Rapport Mensuel"
-        doc.core_properties.author = "Jean Dupont"
-        doc.core_properties.subject = "Analyse des ventes"
-        doc.core_properties.keywords = "ventes, rapport, mensuel, analyse"
-        doc.core_properties.comments = "Ce rapport couvre les ventes de Mai 2025."
-        doc.core_properties.last_modified_by = "Jane Doe"
-        # Ajout du contenu
-        doc.add_heading('Rapport d\'Activité Mai 2025', level=1)
-        doc.add_paragraph('Ceci est le récapitulatif des performances pour le mois écoulé.')
-        doc.add_paragraph('Les ventes ont augmenté de 15% par rapport au mois précédent.')
-        # Sauvegarde du document
-        doc.save(os.path.join(SOURCE_DOCX_DIR, "rapport_mai.docx"))
-        print(f"Fichier DOCX d'exemple créé dans '{SOURCE_DOCX_DIR}' pour le test.")
-    except Exception as e:
-        print(f"Impossible de créer le fichier DOCX d'exemple. Assurez-vous d'avoir 'python-docx' installé. Erreur: {e}")
+        try:
+            # Création d'un document Word de test
+            doc = docx.Document()
+            # Définition des métadonnées pour le document de test
+            doc.core_properties.title = "Rapport Mensuel"
+            doc.core_properties.author = "Jean Dupont"
+            doc.core_properties.subject = "Analyse des ventes"
+            doc.core_properties.keywords = "ventes, rapport, mensuel, analyse"
+            doc.core_properties.comments = "Ce rapport couvre les ventes de Mai 2025."
+            doc.core_properties.last_modified_by = "Jane Doe"
+            # Ajout du contenu
+            doc.add_heading('Rapport d\'Activité Mai 2025', level=1)
+            doc.add_paragraph('Ceci est le récapitulatif des performances pour le mois écoulé.')
+            doc.add_paragraph('Les ventes ont augmenté de 15% par rapport au mois précédent.')
+            # Sauvegarde du document
+            doc.save(os.path.join(SOURCE_DOCX_DIR, "rapport_mai.docx"))
+            print(f"Fichier DOCX d'exemple créé dans '{SOURCE_DOCX_DIR}' pour le test.")
+        except Exception as e:
+            print(f"Impossible de créer le fichier DOCX d'exemple. Assurez-vous d'avoir 'python-docx' installé. Erreur: {e}")
 
     # Conversion de tous les documents en un seul fichier JSON
-    convert_all_docx_to_single_json(SOURCE_DOCX_DIR, OUTPUT_JSON_FILE)
+    convert_all_docx_to_single_json(
+        SOURCE_DOCX_DIR,
+        OUTPUT_JSON_FILE,
+        workers=args.workers,
+        incremental=not args.full
+    )
     print("\nConversion de tous les documents Word en un seul fichier JSON terminée.")
\ No newline at end of file
@@ -0,0 +1,244 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+from langchain.schema import Document
+
+
+def normalize_question(question):
+    """Normalise une question pour la clé du cache (casse, espaces, ponctuation finale)."""
+    question = unicodedata.normalize("NFC", question).lower().strip()
+    question = re.sub(r"\s+", " ", question)
+    return question.rstrip(" ?!.")
+
+
+def _serialize(payload):
+    return json.dumps({
+        "answer": payload["answer"],
+        "source_documents": [
+            {"page_content": doc.page_content, "metadata": doc.metadata}
+            for doc in payload["source_documents"]
+        ]
+    }, ensure_ascii=False)
+
+
+def _deserialize(raw):
+    data = json.loads(raw)
+    return {
+        "answer": data["answer"],
+        "source_documents": [Document(**doc) for doc in data["source_documents"]]
+    }
+
+
+class AnswerCache:
+    """
+    Cache des réponses placé devant le pipeline RAG.
+
+    Deux niveaux de recherche :
+      - exact : clé = question autonome normalisée ;
+      - sémantique : question dont l'embedding a une similarité cosinus au moins
+        égale à `similarity_threshold` avec celui d'une question déjà posée.
+
+    Les entrées sont évincées par ancienneté d'usage (LRU, `max_entries`) et par
+    durée de vie (`ttl`). Chaque entrée est rattachée à une version du corpus :
+    dès que l'index est reconstruit, tout le cache est invalidé. Si `db_path` est
+    fourni, les entrées sont aussi écrites dans SQLite et rechargées au démarrage.
+
+    Plusieurs processus (les workers d'un serveur) peuvent partager le même fichier :
+    avant chaque recherche, un processus lit les réponses que les autres y ont
+    ajoutées depuis sa dernière lecture (par rowid croissant, donc par l'index de
+    la table), si bien qu'une réponse calculée par un worker sert à tous.
+    """
+
+    def __init__(self, max_entries=1000, ttl=86400, similarity_threshold=0.95, db_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.version = None
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # clé -> {"payload", "vector", "created"}
+        self._matrix = None            # embeddings normalisés, dans l'ordre de `_keys`
+        self._keys = []
+        self._lock = threading.Lock()
+        self.db_path = db_path
+        self._db = None
+        self._synced = 0  # rowid de la dernière ligne SQLite lue
+        if db_path:
+            self._connect()
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                " key TEXT PRIMARY KEY, version TEXT, vector BLOB,"
+                " payload TEXT, created REAL)"
+            )
+            self._db.commit()
+
+    def _connect(self):
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+
+    def reopen(self):
+        """
+        Nouvelle connexion SQLite, à appeler dans un processus créé par fork : une
+        connexion ouverte avant le fork ne doit pas être utilisée par le processus fils.
+        """
+        if self._db is not None:
+            with self._lock:
+                self._connect()
+
+    def get(self, question, version, vector=None):
+        """
+        Cherche une réponse en cache.
+
+        Args:
+            question (str): Question autonome (après reformulation).
+            version (str): Version courante du corpus.
+            vector (list, optional): Embedding de la question, pour le niveau sémantique.
+
+        Returns:
+            dict: La réponse (`answer`, `source_documents`) ou None.
+        """
+        return self.lookup(question, version, vector)[0]
+
+    def lookup(self, question, version, vector=None):
+        """
+        Comme `get`, mais indique aussi le niveau qui a répondu.
+
+        Returns:
+            tuple: (réponse ou None, "exact", "semantic" ou "miss").
+        """
+        key = normalize_question(question)
+        with self._lock:
+            self._check_version(version)
+            self._sync()
+            now = time.time()
+
+            entry = self._entries.get(key)
+            if entry is not None and now - entry["created"] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry["payload"], "exact"
+
+            if vector is not None and self._entries:
+                match = self._nearest(vector)
+                if match is not None:
+                    entry = self._entries[match]
+                    if now - entry["created"] <= self.ttl:
+                        self._entries.move_to_end(match)
+                        self.hits += 1
+                        self.semantic_hits += 1
+                        return entry["payload"], "semantic"
+
+            self.misses += 1
+            return None, "miss"
+
+    def put(self, question, version, payload, vector=None):
+        """Enregistre une réponse pour la question autonome donnée."""
+        key = normalize_question(question)
+        payload = {"answer": payload["answer"], "source_documents": list(payload["source_documents"])}
+        vector = self._normalize(vector) if vector is not None else None
+        created = time.time()
+        with self._lock:
+            self._check_version(version)
+            self._store(key, payload, vector, created)
+            if self._db is not None:
+                rowid = self._db.execute(
+                    "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?)",
+                    (key, version, vector.tobytes() if vector is not None else None,
+                     _serialize(payload), created)
+                ).lastrowid
+                self._db.commit()
+                # Aucune autre écriture entre-temps : inutile de relire sa propre ligne
+                if rowid == self._synced + 1:
+                    self._synced = rowid
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+            if self._db is not None:
+                self._db.execute("DELETE FROM answers")
+                self._db.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0
+        }
+
+    def _check_version(self, version):
+        if version == self.version:
+            return
+        # Nouveau corpus : tout ce qui a été calculé sur l'ancien index est périmé
+        self._entries.clear()
+        self._matrix = None
+        self.version = version
+        if self._db is not None:
+            self._db.execute("DELETE FROM answers WHERE version != ?", (version,))
+            self._db.commit()
+            self._synced = self._db.execute("SELECT COALESCE(MAX(rowid), 0) FROM answers").fetchone()[0]
+            rows = self._db.execute(
+                "SELECT key, vector, payload, created FROM answers"
+                " WHERE created >= ? ORDER BY created",
+                (time.time() - self.ttl,)
+            ).fetchall()
+            self._load(rows[-self.max_entries:])
+            self._db.commit()
+
+    def _sync(self):
+        # Réponses ajoutées par les autres processus depuis la dernière lecture
+        if self._db is None:
+            return
+        rows = self._db.execute(
+            "SELECT rowid, key, vector, payload, created FROM answers"
+            " WHERE rowid > ? AND version = ? ORDER BY rowid",
+            (self._synced, self.version)
+        ).fetchall()
+        if not rows:
+            return
+        self._synced = rows[-1][0]
+        expired = time.time() - self.ttl
+        self._load([row[1:] for row in rows if row[4] >= expired])
+        self._db.commit()
+
+    def _load(self, rows):
+        for key, vector, payload, created in rows:
+            vector = np.frombuffer(vector, dtype=np.float32) if vector is not None else None
+            self._store(key, _deserialize(payload), vector, created)
+
+    def _store(self, key, payload, vector, created):
+        self._entries[key] = {"payload": payload, "vector": vector, "created": created}
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            if self._db is not None:
+                self._db.execute("DELETE FROM answers WHERE key = ?", (evicted,))
+        self._matrix = None
+
+    def _nearest(self, vector):
+        if self._matrix is None:
+            self._keys = [key for key, entry in self._entries.items() if entry["vector"] is not None]
+            if not self._keys:
+                return None
+            self._matrix = np.vstack([self._entries[key]["vector"] for key in self._keys])
+        scores = self._matrix @ self._normalize(vector)
+        best = int(np.argmax(scores))
+        if scores[best] >= self.similarity_threshold:
+            return self._keys[best]
+        return None
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
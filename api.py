@@ -1,11 +1,59 @@
-from fastapi import FastAPI, HTTPException
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import uuid
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timezone
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, field_validator
+from typing import List, Optional, Union
 import uvicorn
-from chatbot import qa_chain, format_response
+from chatbot import (
+    answer_question, stream_answer, answer_batch, answer_cache_stats, conversation_store,
+    warm_up, skip_warm_up, readiness, resolve_corpus, close_idle_corpora, corpus_stats, metadata_filter
+)
+from corpus_registry import UnknownCorpus
+from concurrency import AdmissionController, ServerBusy
+from config import (
+    API_CONFIG, BATCH_CONFIG, CONVERSATION_CONFIG, CORPUS_CONFIG, SERVER_CONFIG, STARTUP_CONFIG
+)
+from model_client import upstream_stats
+import tracing
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app):
+    # Le préchauffage tourne en arrière-plan : le serveur répond tout de suite à
+    # /api/health, et /api/ready passe à 200 une fois les ressources prêtes.
+    warm_up_task = None
+    if STARTUP_CONFIG["warm_up"]:
+        warm_up_task = asyncio.ensure_future(admission.execute(warm_up, STARTUP_CONFIG["dummy_query"]))
+        # L'erreur éventuelle est déjà journalisée et exposée par /api/ready
+        warm_up_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+    else:
+        skip_warm_up()
+    idle_task = asyncio.ensure_future(close_idle_corpora_periodically())
+    yield
+    idle_task.cancel()
+    if warm_up_task is not None and not warm_up_task.done():
+        warm_up_task.cancel()
+    admission.shutdown()
 
-app = FastAPI(title="Chatbot RAG API")
+async def close_idle_corpora_periodically():
+    # Les corpus inutilisés sont aussi fermés à chaque question ; cette boucle couvre
+    # les périodes sans aucune requête
+    while True:
+        await asyncio.sleep(max(1, CORPUS_CONFIG["idle_timeout"] / 4))
+        close_idle_corpora()
+
+app = FastAPI(title="Chatbot RAG API", lifespan=lifespan)
 
 # Configuration CORS pour permettre les requêtes depuis le frontend
 app.add_middleware(
@@ -14,6 +62,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
+)
+
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    # Identifiant de requête : repris de l'en-tête client ou généré, puis renvoyé
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    request.state.request_id = request_id
+    response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+# Contrôle d'admission : les appels bloquants au modèle tournent dans un pool dédié
+admission = AdmissionController(
+    max_in_flight=API_CONFIG["max_in_flight"],
+    max_queue=API_CONFIG["max_queue"],
+    queue_timeout=API_CONFIG["queue_timeout"]
 )
 
 class Source(BaseModel):
@@ -21,18 +86,136 @@ class Source(BaseModel):
     titre: str
     date_modification: str
 
+class ChatFilters(BaseModel):
+    documents: Optional[List[str]] = None     # Noms de fichiers (métadonnée `source`)
+    date_from: Optional[Union[datetime, date]] = None  # Date de modification minimale (incluse)
+    date_to: Optional[Union[datetime, date]] = None    # Date de modification maximale (incluse)
+    indice_rag: Optional[List[str]] = None
+
+    @field_validator("date_from", "date_to", mode="before")
+    @classmethod
+    def date_only(cls, value):
+        # "2025-05-26" désigne le jour entier : on le garde comme date, sans heure
+        if isinstance(value, str) and re.fullmatch(r"\d{4}-\d{2}-\d{2}", value.strip()):
+            return date.fromisoformat(value.strip())
+        return value
+
+    def where(self):
+        return metadata_filter(self.documents, self.date_from, self.date_to, self.indice_rag)
+
 class ChatRequest(BaseModel):
     message: str
+    session_id: Optional[str] = None
+    corpus: Optional[str] = None
+    filters: Optional[ChatFilters] = None
 
 class ChatResponse(BaseModel):
     reponse: str
     sources: List[Source] = []
 
+class BatchQuestion(BaseModel):
+    message: str
+    id: Optional[str] = None
+
+class BatchRequest(BaseModel):
+    questions: List[BatchQuestion]
+    corpus: Optional[str] = None
+    filters: Optional[ChatFilters] = None
+
+class ConversationCreate(BaseModel):
+    title: Optional[str] = None
+
+class Conversation(BaseModel):
+    id: str
+    title: Optional[str] = None
+    created_at: str
+    updated_at: str
+    message_count: int
+    last_message: Optional[str] = None
+
+class ConversationPage(BaseModel):
+    conversations: List[Conversation]
+    next_cursor: Optional[str] = None
+
+class ConversationMessage(BaseModel):
+    seq: int
+    role: str
+    content: str
+    sources: List[Source] = []
+    created_at: str
+
+class MessagePage(BaseModel):
+    messages: List[ConversationMessage]
+    next_before: Optional[int] = None
+
+class TurnRequest(BaseModel):
+    message: str
+    corpus: Optional[str] = None
+    filters: Optional[ChatFilters] = None
+
+def source_from_metadata(metadata):
+    # Clés écrites par ingestion.record_fields
+    return Source(
+        fichier=metadata.get('source', ''),
+        titre=metadata.get('titre', ''),
+        date_modification=metadata.get('modifié', '')
+    )
+
+def request_filter(filters):
+    return filters.where() if filters is not None else None
+
+def build_sources(docs):
+    """Convertit les chunks retrouvés en sources renvoyées au client."""
+    return [source_from_metadata(doc.metadata) for doc in docs]
+
+def isoformat(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+def conversation_model(conversation):
+    return Conversation(
+        id=conversation["id"],
+        title=conversation["title"],
+        created_at=isoformat(conversation["created"]),
+        updated_at=isoformat(conversation["updated"]),
+        message_count=conversation["message_count"],
+        last_message=conversation["last_message"]
+    )
+
+def get_conversation_store():
+    if conversation_store is None:
+        raise HTTPException(status_code=404, detail="Les conversations enregistrées sont désactivées.")
+    return conversation_store
+
+def page_size(limit):
+    return min(limit or CONVERSATION_CONFIG["page_size"], CONVERSATION_CONFIG["max_page_size"])
+
+def check_corpus(name):
+    """Refuse (404) une requête qui désigne un corpus non déclaré."""
+    try:
+        return resolve_corpus(name)
+    except UnknownCorpus as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+def busy_error(e):
+    return HTTPException(
+        status_code=e.status_code,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+def sse_event(event, data):
+    """Formate un événement server-sent events."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
 @app.post("/api/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
+    request_id = http_request.state.request_id
+    corpus = check_corpus(request.corpus)
     try:
-        # Obtenir la réponse du chatbot en utilisant invoke()
-        response = qa_chain.invoke({"question": request.message})
+        # Obtenir la réponse du chatbot sans bloquer la boucle d'événements
+        with tracing.trace(request_id, "chat"):
+            response = await admission.run(answer_question, request.message, request.session_id, corpus,
+                                           request_filter(request.filters))
         
         # Obtenir la réponse et les sources
         answer = response['answer'] if 'answer' in response else response['text']
@@ -40,27 +223,302 @@ async def chat(request: ChatRequest):
         
         # Si des sources sont disponibles, les formater
         if 'source_documents' in response:
-            sources = [
-                Source(
-                    fichier=doc.metadata.get('source', ''),
-                    titre=doc.metadata.get('title', ''),
-                    date_modification=doc.metadata.get('date', '')
-                )
-                for doc in response['source_documents']
-            ]
+            sources = build_sources(response['source_documents'])
         
         # Retourner la réponse avec les sources
         return ChatResponse(
             reponse=answer,
             sources=sources
         )
+    except ServerBusy as e:
+        raise busy_error(e)
     except Exception as e:
-        print(f"Erreur lors du traitement de la requête: {str(e)}")  # Ajout de logging
+        logger.exception(f"Erreur lors du traitement de la requête {request_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """
+    Diffuse la réponse token par token (text/event-stream).
+
+    Événements émis : `token` ({"text": ...}) pour chaque fragment généré, puis
+    `end` ({"reponse": ..., "sources": [...]}) ou `error` ({"detail": ...}).
+    Si le client se déconnecte, la génération en amont est interrompue.
+    """
+    corpus = check_corpus(request.corpus)
+    # La place est réservée avant de répondre pour pouvoir renvoyer 429/503 proprement
+    try:
+        await admission.acquire()
+    except ServerBusy as e:
+        raise busy_error(e)
+
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    cancelled = threading.Event()
+    trace = tracing.begin(http_request.state.request_id, "chat_stream")
+
+    def publish(item):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            # Boucle d'événements déjà fermée
+            pass
+
+    def produce():
+        events = stream_answer(request.message, request.session_id, corpus, request_filter(request.filters))
+        status = "cancelled"
+        try:
+            for event in events:
+                if cancelled.is_set():
+                    break
+                publish(event)
+                if event[0] == "end":
+                    status = "ok"
+        except Exception as e:
+            logger.exception(f"Erreur lors du streaming de la réponse {trace.request_id}: {str(e)}")
+            status = "error"
+            # Quota dépassé (429) ou délai dépassé (504) : le client peut réessayer
+            publish(("error", {"detail": str(e), "status": getattr(e, "status_code", 500)}))
+        finally:
+            # Fermer le générateur interrompt le flux Gemini s'il est encore ouvert
+            events.close()
+            publish(None)
+            trace.finish(status=status)
+
+    # La place est libérée quand le producteur a réellement terminé
+    producer = asyncio.ensure_future(admission.execute(produce))
+    producer.add_done_callback(lambda _: admission.release())
+
+    async def event_stream():
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                kind, payload = item
+                if kind == "token":
+                    yield sse_event("token", {"text": payload})
+                elif kind == "end":
+                    sources = [source.model_dump() for source in build_sources(payload["source_documents"])]
+                    yield sse_event("end", {
+                        "reponse": payload["answer"],
+                        "sources": sources,
+                        "request_id": trace.request_id
+                    })
+                else:
+                    yield sse_event("error", payload)
+        finally:
+            # Déconnexion du client ou fin normale : on arrête le producteur
+            cancelled.set()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/chat/batch")
+async def chat_batch(request: BatchRequest, http_request: Request):
+    """
+    Répond à une série de questions indépendantes (évaluations), en JSON Lines.
+
+    Une ligne par question, dans l'ordre de la requête, envoyée dès que la réponse
+    et toutes les précédentes sont prêtes : {"index", "id", "reponse", "sources"},
+    ou {"index", "id", "error", "status"} si cette question a échoué. Un lot occupe une seule
+    place du contrôle d'admission ; ses générations sont parallélisées et limitées
+    en débit par BATCH_CONFIG.
+    """
+    if len(request.questions) > BATCH_CONFIG["max_questions"]:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Au plus {BATCH_CONFIG['max_questions']} questions par lot."
+        )
+    corpus = check_corpus(request.corpus)
+    try:
+        await admission.acquire()
+    except ServerBusy as e:
+        raise busy_error(e)
+
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    cancelled = threading.Event()
+    trace = tracing.begin(http_request.state.request_id, "chat_batch")
+    trace.set("questions", len(request.questions))
+
+    def publish(item):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            pass
+
+    def produce():
+        results = answer_batch([question.message for question in request.questions], corpus=corpus,
+                               where=request_filter(request.filters))
+        status = "cancelled"
+        try:
+            for item in results:
+                if cancelled.is_set():
+                    break
+                publish(item)
+            else:
+                status = "ok"
+        except Exception as e:
+            logger.exception(f"Erreur lors du traitement du lot {trace.request_id}: {str(e)}")
+            status = "error"
+            publish(("error", str(e)))
+        finally:
+            results.close()
+            publish(None)
+            trace.finish(status=status)
+
+    producer = asyncio.ensure_future(admission.execute(produce))
+    producer.add_done_callback(lambda _: admission.release())
+
+    async def lines():
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                position, response = item
+                if position == "error":
+                    line = {"error": response}
+                else:
+                    line = {"index": position, "id": request.questions[position].id}
+                    if isinstance(response, Exception):
+                        line["error"] = str(response)
+                        line["status"] = getattr(response, "status_code", 500)
+                    else:
+                        line["reponse"] = response["answer"]
+                        line["sources"] = [source.model_dump() for source in build_sources(response["source_documents"])]
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+        finally:
+            cancelled.set()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.post("/api/conversations", response_model=Conversation, status_code=201)
+def create_conversation(request: ConversationCreate):
+    """
+    Crée une conversation enregistrée. Son identifiant s'utilise comme `session_id`
+    de /api/chat et /api/chat/stream : chaque échange y est alors ajouté.
+    """
+    return conversation_model(get_conversation_store().create(request.title))
+
+@app.get("/api/conversations", response_model=ConversationPage)
+def list_conversations(limit: Optional[int] = Query(None, ge=1), before: Optional[str] = None):
+    """Conversations, des plus récemment mises à jour aux plus anciennes (pagination par curseur)."""
+    try:
+        conversations, cursor = get_conversation_store().list(page_size(limit), before)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ConversationPage(
+        conversations=[conversation_model(c) for c in conversations],
+        next_cursor=cursor
+    )
+
+@app.get("/api/conversations/{conversation_id}", response_model=Conversation)
+def get_conversation(conversation_id: str):
+    conversation = get_conversation_store().get(conversation_id)
+    if conversation is None:
+        raise HTTPException(status_code=404, detail="Conversation introuvable.")
+    return conversation_model(conversation)
+
+@app.get("/api/conversations/{conversation_id}/messages", response_model=MessagePage)
+def list_messages(conversation_id: str, limit: Optional[int] = Query(None, ge=1),
+                  before: Optional[int] = None):
+    """
+    Messages d'une conversation, dans l'ordre chronologique. Sans `before`, la page
+    contient les messages les plus récents ; `next_before` permet de remonter.
+    """
+    store = get_conversation_store()
+    if store.get(conversation_id) is None:
+        raise HTTPException(status_code=404, detail="Conversation introuvable.")
+    messages, cursor = store.messages(conversation_id, page_size(limit), before)
+    return MessagePage(
+        messages=[
+            ConversationMessage(
+                seq=message["seq"],
+                role=message["role"],
+                content=message["content"],
+                sources=[source_from_metadata(metadata) for metadata in message["sources"]],
+                created_at=isoformat(message["created"])
+            )
+            for message in messages
+        ],
+        next_before=cursor
+    )
+
+@app.post("/api/conversations/{conversation_id}/turns", response_model=ChatResponse)
+async def append_turn(conversation_id: str, request: TurnRequest, http_request: Request):
+    """Pose une question dans la conversation ; l'échange y est enregistré."""
+    if get_conversation_store().get(conversation_id) is None:
+        raise HTTPException(status_code=404, detail="Conversation introuvable.")
+    return await chat(
+        ChatRequest(message=request.message, session_id=conversation_id, corpus=request.corpus,
+                    filters=request.filters),
+        http_request
+    )
+
+@app.delete("/api/conversations/{conversation_id}", status_code=204)
+def delete_conversation(conversation_id: str):
+    if not get_conversation_store().delete(conversation_id):
+        raise HTTPException(status_code=404, detail="Conversation introuvable.")
+
+@app.get("/api/corpora")
+async def list_corpora():
+    """Corpus déclarés (valeurs possibles du champ `corpus`) et état du pool des corpus ouverts."""
+    return {
+        "default": CORPUS_CONFIG["default"],
+        "corpora": sorted(CORPUS_CONFIG["corpora"]),
+        "pool": corpus_stats()
+    }
+
 @app.get("/api/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "worker": os.getpid(),
+        "load": admission.stats(),
+        "cache": answer_cache_stats(),
+        "upstream": upstream_stats(),
+        "corpora": corpus_stats()
+    }
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Métriques au format texte Prometheus (latences par étape, tokens, chunks, cache)."""
+    load = admission.stats()
+    extra = [
+        "# HELP rag_in_flight_requests Requêtes en cours de traitement",
+        "# TYPE rag_in_flight_requests gauge",
+        f"rag_in_flight_requests {load['in_flight']}",
+        "# HELP rag_waiting_requests Requêtes en file d'attente",
+        "# TYPE rag_waiting_requests gauge",
+        f"rag_waiting_requests {load['waiting']}",
+    ]
+    return PlainTextResponse(tracing.render_metrics(extra), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/ready")
+async def readiness_check():
+    """Sonde de disponibilité : 200 seulement quand le chatbot peut réellement répondre."""
+    state = readiness()
+    return JSONResponse(status_code=200 if state["status"] == "ready" else 503, content=state)
 
 if __name__ == "__main__":
-    uvicorn.run("api:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
+    # En production, préférer gunicorn (gunicorn -c gunicorn_conf.py api:app) : les
+    # workers sont créés par fork après le chargement de l'application. Avec --workers,
+    # uvicorn lance des processus neufs qui chargent chacun l'application.
+    parser = argparse.ArgumentParser(description="Lancement de l'API du chatbot")
+    parser.add_argument("--host", default=SERVER_CONFIG["host"])
+    parser.add_argument("--port", type=int, default=SERVER_CONFIG["port"])
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Nombre de processus (SERVER_CONFIG['workers'] en production)")
+    parser.add_argument("--reload", action="store_true", help="Rechargement automatique (développement)")
+    args = parser.parse_args()
+    if args.reload and args.workers > 1:
+        parser.error("--reload et --workers sont incompatibles")
+    # Lu par config.py dans chaque worker : les débits vers Gemini sont répartis entre eux
+    os.environ["RAG_SERVER_WORKERS"] = str(args.workers)
+    uvicorn.run("api:app", host=args.host, port=args.port, reload=args.reload, workers=args.workers,
+                timeout_graceful_shutdown=SERVER_CONFIG["graceful_timeout"])
@@ -0,0 +1,114 @@
+"""
+Passage d'un fichier de questions dans le chatbot (évaluations d'un nouvel index).
+
+Formats d'entrée :
+  - .jsonl : un objet par ligne, avec `question` (ou `message`) et un `id` facultatif ;
+  - .json  : une liste d'objets du même type (par exemple gold_questions.json) ;
+  - autre  : une question par ligne.
+
+Les réponses sont écrites en JSON Lines, dans l'ordre des questions, au fur et à
+mesure. Par défaut le pipeline tourne dans ce processus (chatbot.answer_batch) ;
+avec --url, les questions sont envoyées à /api/chat/batch d'un serveur lancé.
+
+Usage :
+    python batch.py gold_questions.json --output reponses.jsonl
+    python batch.py questions.jsonl --url http://localhost:8000 --chunk-size 200
+    python batch.py questions_livrable02.txt --corpus livrable02
+"""
+import argparse
+import json
+import sys
+import time
+import urllib.request
+
+
+def read_questions(path):
+    """Retourne la liste des questions sous la forme {"id", "message"}."""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".json"):
+            items = json.load(f)
+        elif path.endswith(".jsonl"):
+            items = [json.loads(line) for line in f if line.strip()]
+        else:
+            items = [{"question": line.strip()} for line in f if line.strip()]
+    questions = []
+    for position, item in enumerate(items):
+        message = item.get("question") or item.get("message")
+        if not message:
+            raise ValueError(f"Entrée {position} sans champ 'question' ni 'message'.")
+        identifier = item.get("id", item.get("request_id"))
+        questions.append({"id": None if identifier is None else str(identifier), "message": message})
+    return questions
+
+
+def run_local(questions, max_concurrency, corpus=None):
+    """Exécute le pipeline dans ce processus et produit les lignes de résultat."""
+    from api import build_sources
+    from chatbot import answer_batch
+
+    for position, response in answer_batch([q["message"] for q in questions], max_concurrency, corpus):
+        line = {"index": position, "id": questions[position]["id"]}
+        if isinstance(response, Exception):
+            line["error"] = str(response)
+            line["status"] = getattr(response, "status_code", 500)
+        else:
+            line["reponse"] = response["answer"]
+            line["sources"] = [source.model_dump() for source in build_sources(response["source_documents"])]
+        yield line
+
+
+def run_remote(questions, url, chunk_size, timeout, corpus=None):
+    """Envoie les questions à /api/chat/batch, par requêtes de `chunk_size` questions."""
+    for offset in range(0, len(questions), chunk_size):
+        body = json.dumps({
+            "questions": questions[offset:offset + chunk_size],
+            "corpus": corpus
+        }).encode("utf-8")
+        request = urllib.request.Request(
+            url.rstrip("/") + "/api/chat/batch",
+            data=body,
+            headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            for raw in response:
+                line = json.loads(raw)
+                if "index" in line:
+                    line["index"] += offset
+                yield line
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Réponses du chatbot à un fichier de questions")
+    parser.add_argument("questions", help="Fichier de questions (.jsonl, .json ou texte)")
+    parser.add_argument("--output", help="Fichier JSONL de sortie (par défaut la sortie standard)")
+    parser.add_argument("--corpus", help="Corpus interrogé (CORPUS_CONFIG), par défaut le corpus par défaut")
+    parser.add_argument("--url", help="URL de l'API ; sans URL, le pipeline tourne localement")
+    parser.add_argument("--concurrency", type=int, default=None, help="Générations simultanées (mode local)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Questions par requête (mode --url)")
+    parser.add_argument("--timeout", type=float, default=3600.0)
+    args = parser.parse_args()
+
+    questions = read_questions(args.questions)
+    if args.url:
+        lines = run_remote(questions, args.url, args.chunk_size, args.timeout, args.corpus)
+    else:
+        lines = run_local(questions, args.concurrency, args.corpus)
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    start = time.perf_counter()
+    errors = 0
+    try:
+        for line in lines:
+            errors += "error" in line
+            output.write(json.dumps(line, ensure_ascii=False) + "\n")
+            output.flush()
+    finally:
+        if args.output:
+            output.close()
+    elapsed = time.perf_counter() - start
+    print(f"{len(questions)} questions en {elapsed:.1f}s ({len(questions) / max(elapsed, 1e-9):.2f} q/s), "
+          f"{errors} erreurs.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Test de charge de /api/chat contre un modèle simulé.
+
+Le pipeline complet de chatbot.py tourne sur un index temporaire construit avec les
+embeddings locaux ; seul le modèle est simulé, avec un appel qui bloque pendant
+`--latency` secondes (comme un aller-retour Gemini synchrone). On mesure le débit
+obtenu pour différents nombres de clients concurrents, ainsi que la latence de
+/api/health pendant la charge.
+
+Usage :
+    python bench_api.py --latency 0.5 --requests 64 --clients 1,2,4,8,16
+"""
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+
+from local_models import OfflineResources, build_offline_index, install_offline_resources
+
+
+async def run_level(app, clients, total_requests):
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        queue = asyncio.Queue()
+        for i in range(total_requests):
+            queue.put_nowait(i)
+        statuses = {}
+
+        async def worker():
+            while not queue.empty():
+                i = queue.get_nowait()
+                response = await client.post("/api/chat", json={"message": f"question {i}"})
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        health_latencies = []
+
+        async def probe(stop):
+            while not stop.is_set():
+                start = time.perf_counter()
+                await client.get("/api/health")
+                health_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.05)
+
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(probe(stop))
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await probe_task
+
+    health_ms = max(health_latencies) * 1000 if health_latencies else 0.0
+    return elapsed, statuses, health_ms
+
+
+async def run_levels(app, levels, total_requests):
+    # Tous les paliers tournent dans la même boucle d'événements, comme sous uvicorn
+    baseline = None
+    for clients in levels:
+        elapsed, statuses, health_ms = await run_level(app, clients, total_requests)
+        throughput = total_requests / elapsed
+        baseline = baseline or throughput
+        print(f"{clients:>8} {elapsed:>10.2f} {throughput:>8.2f} {health_ms:>16.1f}  {statuses}"
+              f"  (x{throughput / baseline:.1f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge de l'API avec un LLM simulé")
+    parser.add_argument("--latency", type=float, default=0.5, help="Latence simulée du modèle (s)")
+    parser.add_argument("--requests", type=int, default=64, help="Nombre de requêtes par palier")
+    parser.add_argument("--clients", default="1,2,4,8,16", help="Paliers de clients concurrents")
+    parser.add_argument("--corpus", default="Livrable_01.json")
+    args = parser.parse_args()
+
+    logging.getLogger("rag.trace").setLevel(logging.WARNING)
+    index_directory = tempfile.TemporaryDirectory(prefix="bench_api_")
+    build_offline_index(args.corpus, index_directory.name)
+    install_offline_resources(OfflineResources(index_directory.name, llm_latency=args.latency))
+    import api
+
+    print(f"max_in_flight={api.admission.max_in_flight} max_queue={api.admission.max_queue} "
+          f"latence simulée={args.latency}s")
+    print(f"{'clients':>8} {'durée (s)':>10} {'req/s':>8} {'health max (ms)':>16}  statuts")
+    asyncio.run(run_levels(api.app, [int(c) for c in args.clients.split(",")], args.requests))
+    index_directory.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Banc d'essai des stratégies de découpage.
+
+Pour chaque configuration (stratégie + paramètres), le corpus est découpé, les chunks
+sont vectorisés et indexés dans un index exact en mémoire, puis les questions de
+référence (gold_questions.json) sont posées. On rapporte :
+  - le nombre de chunks et la taille de l'index (vecteurs + texte) ;
+  - le temps d'ingestion (découpage + embeddings) ;
+  - la latence de recherche (p50/p95) ;
+  - le taux de succès (la source attendue figure parmi les k premiers chunks) et le MRR.
+
+Usage :
+    python bench_chunking.py                      # embeddings Gemini
+    python bench_chunking.py --offline            # embeddings locaux déterministes
+    python bench_chunking.py --strategies paragraph --json resultats.json
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from config import GOOGLE_API_KEY
+from ingestion import iter_chunks
+
+# Configurations évaluées par défaut
+CONFIGURATIONS = [
+    ("character", {"chunk_size": 400, "chunk_overlap": 100}),
+    ("character", {"chunk_size": 600, "chunk_overlap": 150}),
+    ("character", {"chunk_size": 900, "chunk_overlap": 200}),
+    ("paragraph", {"chunk_size": 400, "chunk_overlap": 100}),
+    ("paragraph", {"chunk_size": 600, "chunk_overlap": 150}),
+    ("paragraph", {"chunk_size": 900, "chunk_overlap": 200}),
+    ("sentence_window", {"window": 3, "stride": 1}),
+    ("sentence_window", {"window": 4, "stride": 2}),
+    ("sentence_window", {"window": 6, "stride": 3}),
+]
+
+
+def get_embedding(offline):
+    if offline:
+        from local_models import HashingEmbeddings
+        return HashingEmbeddings()
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
+    return GoogleGenerativeAIEmbeddings(model="models/embedding-001", task_type="retrieval_document")
+
+
+def evaluate(corpus, strategy, params, embedding, questions, query_vectors, k, batch_size=64):
+    start = time.perf_counter()
+    chunks = list(iter_chunks(corpus, strategy, **params))
+    texts = [chunk.page_content for chunk in chunks]
+    vectors = []
+    for i in range(0, len(texts), batch_size):
+        vectors.extend(embedding.embed_documents(texts[i:i + batch_size]))
+    matrix = np.asarray(vectors, dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True).clip(min=1e-12)
+    ingest_time = time.perf_counter() - start
+
+    sources = [chunk.metadata["source"] for chunk in chunks]
+    latencies, hits, reciprocal_ranks = [], 0, []
+    for question, query_vector in zip(questions, query_vectors):
+        start = time.perf_counter()
+        scores = matrix @ query_vector
+        top = np.argpartition(-scores, min(k, len(scores) - 1))[:k]
+        top = top[np.argsort(-scores[top])]
+        latencies.append(time.perf_counter() - start)
+
+        ranked_sources = [sources[i] for i in top]
+        if question["source"] in ranked_sources:
+            hits += 1
+            reciprocal_ranks.append(1.0 / (ranked_sources.index(question["source"]) + 1))
+        else:
+            reciprocal_ranks.append(0.0)
+
+    return {
+        "strategy": strategy,
+        "params": params,
+        "chunks": len(chunks),
+        "index_bytes": int(matrix.nbytes + sum(len(t.encode("utf-8")) for t in texts)),
+        "ingest_s": round(ingest_time, 3),
+        "retrieval_p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+        "retrieval_p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 3),
+        "hit_rate": round(hits / len(questions), 3),
+        "mrr": round(float(np.mean(reciprocal_ranks)), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparaison des stratégies de découpage")
+    parser.add_argument("--corpus", default="Livrable_01.json")
+    parser.add_argument("--gold", default="gold_questions.json")
+    parser.add_argument("--k", type=int, default=5, help="Nombre de chunks retrouvés par question")
+    parser.add_argument("--strategies", default=None, help="Stratégies à évaluer (séparées par des virgules)")
+    parser.add_argument("--offline", action="store_true", help="Utiliser des embeddings locaux (sans API)")
+    parser.add_argument("--json", default=None, help="Écrire les résultats dans ce fichier JSON")
+    args = parser.parse_args()
+
+    with open(args.gold, "r", encoding="utf-8") as f:
+        questions = json.load(f)
+
+    embedding = get_embedding(args.offline)
+    query_vectors = np.asarray(embedding.embed_documents([q["question"] for q in questions]), dtype=np.float32)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True).clip(min=1e-12)
+
+    selected = set(args.strategies.split(",")) if args.strategies else None
+    results = []
+    print(f"{'stratégie':<16} {'paramètres':<42} {'chunks':>6} {'index (Ko)':>10} {'ingest (s)':>10} "
+          f"{'p50 (ms)':>9} {'p95 (ms)':>9} {'hit@k':>6} {'MRR':>6}")
+    for strategy, params in CONFIGURATIONS:
+        if selected and strategy not in selected:
+            continue
+        result = evaluate(args.corpus, strategy, params, embedding, questions, query_vectors, args.k)
+        results.append(result)
+        print(f"{strategy:<16} {json.dumps(params):<42} {result['chunks']:>6} "
+              f"{result['index_bytes'] / 1024:>10.1f} {result['ingest_s']:>10.2f} "
+              f"{result['retrieval_p50_ms']:>9.3f} {result['retrieval_p95_ms']:>9.3f} "
+              f"{result['hit_rate']:>6.2f} {result['mrr']:>6.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"k": args.k, "offline": args.offline, "results": results}, f, indent=4, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Banc d'essai de la reformulation des questions de suivi.
+
+Les conversations de rewrite_transcripts.json sont rejouées tour par tour à travers
+le pipeline de chatbot.py, avec des modèles simulés (latences configurables) et un
+index vectoriel temporaire construit sur le corpus avec des embeddings locaux. Chaque
+politique de reformulation est comparée sur :
+  - la latence par tour (p50/p95), sur tous les tours et sur les tours avec historique ;
+  - le nombre d'appels au modèle de reformulation ;
+  - le taux de réutilisation de la recherche spéculative.
+La justesse du détecteur de relances (rewrite.is_follow_up) est aussi mesurée sur
+les tours avec historique : un tour annoté `standalone` est une relance, les autres
+sont des questions autonomes (faux positif s'ils sont reformulés).
+
+Usage :
+    python bench_rewrite.py
+    python bench_rewrite.py --llm-latency 1.2 --rewrite-latency 0.3 --json resultats.json
+"""
+import argparse
+import json
+import logging
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+import chatbot
+import tracing
+from config import REWRITE_CONFIG
+from rewrite import is_follow_up
+from local_models import OfflineResources, build_offline_index, install_offline_resources
+
+# (nom, politique, modèle léger, recherche spéculative)
+POLICIES = [
+    ("always", "always", False, False),
+    ("always + modèle léger", "always", True, False),
+    ("heuristic + modèle léger", "heuristic", True, False),
+    ("heuristic + spéculative", "heuristic", True, True),
+    ("never", "never", True, False),
+]
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def run_policy(transcripts, resources, policy, speculative):
+    REWRITE_CONFIG.update(policy=policy, speculative_retrieval=speculative)
+    install_offline_resources(resources)
+    resources.rewrite_model.calls = 0
+    all_turns, follow_ups, speculation = [], [], []
+    for conversation in transcripts:
+        session_id = uuid.uuid4().hex
+        for position, turn in enumerate(conversation):
+            with tracing.trace(session_id, "bench") as current:
+                start = time.perf_counter()
+                chatbot.answer_question(turn["question"], session_id)
+                elapsed = time.perf_counter() - start
+            all_turns.append(elapsed)
+            if position:
+                follow_ups.append(elapsed)
+            if "speculation" in current.attributes:
+                speculation.append(current.attributes["speculation"] == "hit")
+    return {
+        "p50_s": round(percentile(all_turns, 50), 4),
+        "p95_s": round(percentile(all_turns, 95), 4),
+        "follow_up_p50_s": round(percentile(follow_ups, 50), 4),
+        "follow_up_p95_s": round(percentile(follow_ups, 95), 4),
+        "rewrite_calls": resources.rewrite_model.calls,
+        "speculation_hit_rate": round(sum(speculation) / len(speculation), 3) if speculation else None,
+    }
+
+
+def detector_accuracy(transcripts):
+    """Faux positifs et faux négatifs du détecteur de relances, sur les tours avec historique."""
+    turns = [turn for conversation in transcripts for turn in conversation[1:]]
+    follow_ups = [turn for turn in turns if "standalone" in turn]
+    standalone = [turn for turn in turns if "standalone" not in turn]
+    false_positives = [turn["question"] for turn in standalone if is_follow_up(turn["question"])]
+    false_negatives = [turn["question"] for turn in follow_ups if not is_follow_up(turn["question"])]
+    return {
+        "follow_ups": len(follow_ups),
+        "standalone": len(standalone),
+        "false_positives": false_positives,
+        "false_negatives": false_negatives,
+        "false_positive_rate": round(len(false_positives) / len(standalone), 3) if standalone else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latence des politiques de reformulation")
+    parser.add_argument("--corpus", default="Livrable_01.json")
+    parser.add_argument("--transcripts", default="rewrite_transcripts.json")
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="Latence simulée du modèle principal (s)")
+    parser.add_argument("--rewrite-latency", type=float, default=0.3, help="Latence simulée du modèle léger (s)")
+    parser.add_argument("--embed-latency", type=float, default=0.1, help="Latence simulée de l'embedding (s)")
+    parser.add_argument("--json", help="Écrit les résultats dans ce fichier")
+    args = parser.parse_args()
+
+    logging.getLogger("rag.trace").setLevel(logging.WARNING)
+    logging.getLogger("context").setLevel(logging.WARNING)
+
+    with open(args.transcripts, "r", encoding="utf-8") as f:
+        transcripts = json.load(f)
+    rewrites = {turn["question"]: turn["standalone"]
+                for conversation in transcripts for turn in conversation if "standalone" in turn}
+
+    print("Indexation du corpus (embeddings locaux)...")
+    with tempfile.TemporaryDirectory(prefix="bench_rewrite_") as index_directory:
+        build_offline_index(args.corpus, index_directory)
+        results = {}
+        for name, policy, light_model, speculative in POLICIES:
+            resources = OfflineResources(
+                index_directory,
+                llm_latency=args.llm_latency,
+                rewrite_latency=args.rewrite_latency if light_model else args.llm_latency,
+                embed_latency=args.embed_latency,
+                rewrites=rewrites
+            )
+            results[name] = run_policy(transcripts, resources, policy, speculative)
+
+    print(f"\n{'politique':<26} {'p50':>7} {'p95':>7} {'suivi p50':>10} {'suivi p95':>10} {'appels':>7} {'spéc.':>6}")
+    for name, r in results.items():
+        hit_rate = "-" if r["speculation_hit_rate"] is None else f"{r['speculation_hit_rate']:.0%}"
+        print(f"{name:<26} {r['p50_s']:>7.3f} {r['p95_s']:>7.3f} {r['follow_up_p50_s']:>10.3f} "
+              f"{r['follow_up_p95_s']:>10.3f} {r['rewrite_calls']:>7} {hit_rate:>6}")
+
+    accuracy = detector_accuracy(transcripts)
+    print(f"\nDétecteur de relances : {len(accuracy['false_positives'])}/{accuracy['standalone']} "
+          f"questions autonomes reformulées ({accuracy['false_positive_rate']:.0%}), "
+          f"{len(accuracy['false_negatives'])}/{accuracy['follow_ups']} relances manquées")
+    for question in accuracy["false_positives"]:
+        print(f"  faux positif : {question}")
+    for question in accuracy["false_negatives"]:
+        print(f"  faux négatif : {question}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"policies": results, "detector": accuracy}, f, ensure_ascii=False, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Mesure du temps de démarrage de l'API.
+
+Pour chaque essai, un serveur est lancé dans un processus neuf et l'on mesure :
+  - le temps d'import du module `api` (sans initialisation des ressources) ;
+  - le temps jusqu'à ce que /api/health réponde (serveur à l'écoute) ;
+  - le temps jusqu'à ce que /api/ready renvoie 200 (modèle, index et préchauffage prêts).
+
+Usage :
+    python bench_startup.py --runs 3
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def measure_import():
+    code = "import time; t = time.perf_counter(); import api; print(time.perf_counter() - t)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def measure_server(port, timeout):
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "api.py", "--port", str(port), "--host", "127.0.0.1"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    listening = ready = None
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                if listening is None:
+                    httpx.get(f"http://127.0.0.1:{port}/api/health", timeout=1).raise_for_status()
+                    listening = time.perf_counter() - start
+                response = httpx.get(f"http://127.0.0.1:{port}/api/ready", timeout=1)
+                if response.status_code == 200:
+                    ready = time.perf_counter() - start
+                    break
+                if response.json().get("status") == "error":
+                    print(f"Préchauffage en erreur : {response.json().get('error')}")
+                    break
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.05)
+    finally:
+        server.terminate()
+        server.wait()
+    return listening, ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Temps de démarrage et de disponibilité de l'API")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    imports, listens, readies = [], [], []
+    for run in range(args.runs):
+        imports.append(measure_import())
+        listening, ready = measure_server(args.port, args.timeout)
+        if listening is not None:
+            listens.append(listening)
+        if ready is not None:
+            readies.append(ready)
+        print(f"essai {run + 1} : import {imports[-1]:.2f}s, écoute "
+              f"{'-' if listening is None else f'{listening:.2f}s'}, prêt "
+              f"{'-' if ready is None else f'{ready:.2f}s'}")
+
+    def median(values):
+        return f"{statistics.median(values):.2f}s" if values else "n/a"
+
+    print(f"\nmédianes : import {median(imports)}, écoute {median(listens)}, prêt {median(readies)}")
+
+
+if __name__ == "__main__":
+    main()
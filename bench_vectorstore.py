@@ -0,0 +1,180 @@
+"""
+Comparaison des backends d'index vectoriel : mmap exact, mmap IVF et Chroma.
+
+Les chunks du corpus sont vectorisés une fois (embeddings locaux avec --offline),
+puis chaque backend est construit dans un répertoire temporaire avec les mêmes
+vecteurs. `--scale N` duplique le corpus N fois (vecteurs légèrement bruités) pour
+simuler un gros corpus. Chaque backend est ensuite ouvert dans un processus neuf,
+où l'on mesure :
+  - le temps de chargement (ouverture de l'index et première requête) ;
+  - la latence des requêtes (p50/p95) sur les questions de référence ;
+  - la mémoire résidente (RSS) du processus après chargement et après les requêtes ;
+  - pour IVF, le rappel@k par rapport à la recherche exacte.
+
+Usage :
+    python bench_vectorstore.py --offline
+    python bench_vectorstore.py --offline --scale 200 --backends mmap,ivf --json resultats.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from config import CHUNKING_CONFIG, GOOGLE_API_KEY
+from ingestion import iter_chunks
+from vector_index import normalize_rows, open_vector_index
+
+
+def rss_mb():
+    """Mémoire résidente du processus courant (Mo)."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except FileNotFoundError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def get_embedding(offline):
+    if offline:
+        from local_models import HashingEmbeddings
+        return HashingEmbeddings()
+    from embed import get_embedding as gemini_embedding
+    os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
+    return gemini_embedding()
+
+
+def build(backend, directory, ids, vectors, docs, batch_size=5000):
+    index = open_vector_index(directory, backend="chroma" if backend == "chroma" else "mmap",
+                              collection_name="bench", index_type="ivf" if backend == "ivf" else "flat")
+    start = time.perf_counter()
+    for i in range(0, len(ids), batch_size):
+        index.add(ids[i:i + batch_size], vectors[i:i + batch_size], docs[i:i + batch_size])
+    if backend == "ivf":
+        index.build_ivf()
+    return time.perf_counter() - start
+
+
+def directory_size(directory):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(directory) for name in names)
+
+
+def worker(backend, directory, queries_path, k, repeat):
+    """Exécuté dans un processus neuf : chargement, requêtes et mémoire."""
+    queries = np.load(queries_path)
+    base_rss = rss_mb()
+    start = time.perf_counter()
+    index = open_vector_index(directory, backend="chroma" if backend == "chroma" else "mmap",
+                              collection_name="bench", index_type="ivf" if backend == "ivf" else "flat")
+    index.search(queries[0], k)
+    load_time = time.perf_counter() - start
+    loaded_rss = rss_mb()
+
+    latencies, results = [], []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            hits = index.search(query, k)
+            latencies.append(time.perf_counter() - start)
+            results.append([doc.metadata["chunk_id"] for doc, _ in hits])
+    print(json.dumps({
+        "load_s": round(load_time, 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 3),
+        "rss_base_mb": round(base_rss, 1),
+        "rss_loaded_mb": round(loaded_rss, 1),
+        "rss_after_queries_mb": round(rss_mb(), 1),
+        "results": results[:len(queries)],
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparaison des backends d'index vectoriel")
+    parser.add_argument("--corpus", default="Livrable_01.json")
+    parser.add_argument("--questions", default="gold_questions.json")
+    parser.add_argument("--offline", action="store_true", help="Embeddings locaux déterministes")
+    parser.add_argument("--backends", default="mmap,ivf,chroma")
+    parser.add_argument("--scale", type=int, default=1, help="Nombre de copies (bruitées) du corpus")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20, help="Passes sur les questions")
+    parser.add_argument("--json", help="Écrit les résultats dans ce fichier")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--directory", help=argparse.SUPPRESS)
+    parser.add_argument("--queries", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.directory, args.queries, args.k, args.repeat)
+        return
+
+    embedding = get_embedding(args.offline)
+    chunks = list(iter_chunks(args.corpus, CHUNKING_CONFIG["strategy"], **CHUNKING_CONFIG["params"]))
+    base_vectors = normalize_rows(embedding.embed_documents([chunk.page_content for chunk in chunks]))
+    with open(args.questions, "r", encoding="utf-8") as f:
+        questions = [item["question"] for item in json.load(f)]
+    query_vectors = normalize_rows([embedding.embed_query(q) for q in questions])
+
+    rng = np.random.default_rng(0)
+    ids, docs, vectors = [], [], []
+    for copy in range(args.scale):
+        noise = 0 if copy == 0 else rng.normal(scale=0.01, size=base_vectors.shape).astype(np.float32)
+        vectors.append(normalize_rows(base_vectors + noise))
+        for i, chunk in enumerate(chunks):
+            chunk_id = f"{copy}-{i}"
+            ids.append(chunk_id)
+            docs.append(chunk.copy(update={"metadata": {**chunk.metadata, "chunk_id": chunk_id}}))
+    vectors = np.concatenate(vectors)
+    print(f"{len(ids)} vecteurs de dimension {vectors.shape[1]}")
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bench_vectorstore_") as workdir:
+        queries_path = os.path.join(workdir, "queries.npy")
+        np.save(queries_path, query_vectors)
+        for backend in args.backends.split(","):
+            directory = os.path.join(workdir, backend)
+            try:
+                build_time = build(backend, directory, ids, vectors, docs)
+            except ImportError as e:
+                print(f"{backend} : ignoré ({e})")
+                continue
+            output = subprocess.run(
+                [sys.executable, __file__, "--worker", backend, "--directory", directory,
+                 "--queries", queries_path, "--k", str(args.k), "--repeat", str(args.repeat)],
+                capture_output=True, text=True, check=True
+            )
+            result = json.loads(output.stdout.strip().splitlines()[-1])
+            result.update(build_s=round(build_time, 3), disk_mb=round(directory_size(directory) / 2**20, 2))
+            results[backend] = result
+
+    # Rappel de chaque backend par rapport à la recherche exacte (mmap)
+    exact = results.get("mmap", {}).get("results")
+    for result in results.values():
+        hits = result.pop("results")
+        if exact:
+            result["recall_at_k"] = round(float(np.mean([
+                len(set(a) & set(b)) / len(b) for a, b in zip(hits, exact)
+            ])), 3)
+
+    print(f"\n{'backend':<8} {'build':>8} {'load':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'RSS Mo':>8} {'disque':>8} {'rappel':>7}")
+    for backend, r in results.items():
+        print(f"{backend:<8} {r['build_s']:>8.3f} {r['load_s']:>8.3f} {r['p50_ms']:>8.3f} "
+              f"{r['p95_ms']:>8.3f} {r['rss_after_queries_mb']:>8.1f} {r['disk_mb']:>8.2f} "
+              f"{r.get('recall_at_k', '-'):>7}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
+
+
+if __name__ == "__main__":
+    main()
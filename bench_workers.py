@@ -0,0 +1,221 @@
+"""
+Montée en charge du déploiement multi-processus.
+
+Pour chaque nombre de workers, un vrai serveur est lancé (gunicorn avec
+gunicorn_conf.py s'il est installé, sinon `uvicorn --workers`) sur un index
+construit hors ligne, avec les modèles locaux de local_models.py. On mesure :
+  - le débit (requêtes/s) et la latence p50/p99 de /api/chat, en HTTP ;
+  - la mémoire de chaque worker : RSS, PSS (les pages partagées sont réparties
+    entre les processus qui les utilisent) et, parmi elles, celles des fichiers
+    de l'index projetés en mémoire.
+Si l'index est bien partagé, le PSS de l'index par worker baisse comme 1/N alors
+que son RSS reste constant.
+
+Usage :
+    python bench_workers.py --workers 1 2 4
+    python bench_workers.py --workers 1 2 4 8 --requests 2000 --clients 32 --llm-latency 0.05
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from local_models import OfflineResources, build_offline_index, install_offline_resources
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def create_app():
+    """Application chargée par les workers du banc : modèles locaux, index de BENCH_INDEX_DIR."""
+    import api
+
+    install_offline_resources(OfflineResources(
+        os.environ["BENCH_INDEX_DIR"],
+        llm_latency=float(os.environ.get("BENCH_LLM_LATENCY", "0"))
+    ))
+    return api.app
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers, port, index_dir, state_dir, llm_latency):
+    env = dict(
+        os.environ,
+        BENCH_INDEX_DIR=index_dir,
+        BENCH_LLM_LATENCY=str(llm_latency),
+        WEB_CONCURRENCY=str(workers),
+        RAG_SERVER_WORKERS=str(workers),
+        PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")]))
+    )
+    if importlib.util.find_spec("gunicorn") is not None:
+        command = [sys.executable, "-m", "gunicorn", "-c", os.path.join(ROOT, "gunicorn_conf.py"),
+                   "--bind", f"127.0.0.1:{port}", "bench_workers:create_app()"]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "bench_workers:create_app", "--factory",
+                   "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port)]
+    # Les fichiers SQLite (caches, sessions, conversations) sont créés dans `state_dir`
+    return subprocess.Popen(command, cwd=state_dir, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def worker_pids(server_pid):
+    """Processus fils du serveur qui servent des requêtes."""
+    pids = []
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as f:
+                parent = int(f.read().rsplit(")", 1)[1].split()[1])
+            with open(f"/proc/{name}/cmdline", "rb") as f:
+                cmdline = f.read()
+        except (OSError, IndexError, ValueError):
+            continue
+        if parent == server_pid and b"resource_tracker" not in cmdline:
+            pids.append(int(name))
+    return pids
+
+
+def memory_usage(pid, index_dir):
+    """RSS et PSS du processus, total et pour les fichiers de l'index (en Mo)."""
+    usage = {"rss": 0, "pss": 0, "index_rss": 0, "index_pss": 0}
+    in_index = False
+    with open(f"/proc/{pid}/smaps") as f:
+        for line in f:
+            fields = line.split()
+            if not fields[0].endswith(":"):
+                # En-tête d'une projection : adresse, droits, offset, périphérique, inode, chemin
+                in_index = len(fields) >= 6 and fields[5].startswith(index_dir)
+            elif fields[0] in ("Rss:", "Pss:"):
+                key = fields[0][:-1].lower()
+                usage[key] += int(fields[1])
+                if in_index:
+                    usage[f"index_{key}"] += int(fields[1])
+    return {key: round(value / 1024, 2) for key, value in usage.items()}
+
+
+def wait_ready(port, workers, timeout):
+    """Attend que /api/ready réponde 200 à une série de requêtes (tous les workers prêts)."""
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    successes = 0
+    while time.monotonic() < deadline:
+        try:
+            ready = httpx.get(f"http://127.0.0.1:{port}/api/ready", timeout=1).status_code == 200
+        except httpx.HTTPError:
+            ready = False
+        successes = successes + 1 if ready else 0
+        if successes >= 10 * workers:
+            return
+        time.sleep(0.05 if ready else 0.2)
+    raise TimeoutError(f"Serveur non prêt après {timeout}s")
+
+
+async def load(port, questions, total_requests, clients):
+    import httpx
+
+    latencies, errors = [], 0
+    queue = asyncio.Queue()
+    for i in range(total_requests):
+        queue.put_nowait(questions[i % len(questions)])
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None) as client:
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                question = queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.post("/api/chat", json={"message": question})
+                latencies.append(time.perf_counter() - start)
+                errors += response.status_code != 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "throughput_rps": round(total_requests / elapsed, 2),
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 2),
+        "errors": errors
+    }
+
+
+def run(workers, index_dir, questions, args):
+    port = free_port()
+    with tempfile.TemporaryDirectory(prefix="bench_workers_state_") as state_dir:
+        server = start_server(workers, port, index_dir, state_dir, args.llm_latency)
+        try:
+            wait_ready(port, workers, args.timeout)
+            # Passe de chauffe : chaque worker parcourt les pages de l'index
+            asyncio.run(load(port, questions, 4 * workers * len(questions), args.clients))
+            result = asyncio.run(load(port, questions, args.requests, args.clients))
+            # Un seul worker : uvicorn sert les requêtes dans le processus principal
+            pids = worker_pids(server.pid) or [server.pid]
+            memory = [memory_usage(pid, index_dir) for pid in pids]
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+    result["workers"] = workers
+    result["processes"] = len(memory)
+    for key in ("rss", "pss", "index_rss", "index_pss"):
+        result[f"{key}_mb_per_worker"] = round(sum(m[key] for m in memory) / max(1, len(memory)), 2)
+    result["pss_mb_total"] = round(sum(m["pss"] for m in memory), 2)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Débit et mémoire par worker du serveur multi-processus")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--corpus", default="Livrable_01.json")
+    parser.add_argument("--gold", default="gold_questions.json")
+    parser.add_argument("--requests", type=int, default=500, help="Requêtes mesurées par configuration")
+    parser.add_argument("--clients", type=int, default=16, help="Clients HTTP concurrents")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Latence simulée du modèle (s)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Attente maximale du démarrage (s)")
+    parser.add_argument("--output", help="Écrit les résultats dans ce fichier JSON")
+    args = parser.parse_args()
+
+    with open(args.gold, "r", encoding="utf-8") as f:
+        questions = [item["question"] for item in json.load(f)]
+
+    server = "gunicorn" if importlib.util.find_spec("gunicorn") is not None else "uvicorn"
+    print(f"🚀 Serveur : {server}, {os.cpu_count()} cœur(s)")
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_workers_index_") as index_dir:
+        index_dir = os.path.realpath(index_dir)
+        build_offline_index(args.corpus, index_dir)
+        for workers in args.workers:
+            print(f"⏳ {workers} worker(s)...")
+            results.append(run(workers, index_dir, questions, args))
+
+    header = (f"{'workers':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'erreurs':>7} "
+              f"{'RSS Mo':>8} {'PSS Mo':>8} {'index RSS':>9} {'index PSS':>9} {'PSS total':>9}")
+    print(header)
+    for r in results:
+        print(f"{r['workers']:>7} {r['throughput_rps']:>8} {r['p50_ms']:>8} {r['p99_ms']:>8} {r['errors']:>7} "
+              f"{r['rss_mb_per_worker']:>8} {r['pss_mb_per_worker']:>8} {r['index_rss_mb_per_worker']:>9} "
+              f"{r['index_pss_mb_per_worker']:>9} {r['pss_mb_total']:>9}")
+    print("(mémoire : moyenne par worker, en Mo)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"server": server, "cpus": os.cpu_count(), "results": results},
+                      f, ensure_ascii=False, indent=4)
+
+
+if __name__ == "__main__":
+    main()
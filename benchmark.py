@@ -0,0 +1,247 @@
+"""
+Banc d'essai hors ligne et détection de régressions.
+
+Le pipeline réel (ingestion, index mmap + BM25, recherche hybride, assemblage du
+contexte, API) tourne avec des modèles locaux déterministes (local_models.py) à la
+place de Gemini : aucun appel réseau, aucune clé nécessaire. On mesure :
+  - ingestion : découpage, embeddings et construction des index ;
+  - chargement : ouverture des index et première recherche ;
+  - recherche : latence p50/p99 de `chatbot.retrieve`, rappel@k et MRR par rapport
+    à la source attendue (gold_questions.json), et rappel après assemblage du contexte ;
+  - API : latence p50/p99 et débit de /api/chat de bout en bout.
+
+Les résultats sont écrits en JSON (--output). Avec --baseline, ils deviennent la
+référence ; avec --baseline et --check, ils sont comparés à la référence et le
+script sort en erreur (code 1) si une métrique de qualité baisse ou si une latence
+augmente au-delà des tolérances.
+
+Usage :
+    python benchmark.py --output resultats.json
+    python benchmark.py --baseline benchmark_baseline.json            # enregistre la référence
+    python benchmark.py --baseline benchmark_baseline.json --check    # compare à la référence
+    python benchmark.py --baseline benchmark_baseline.json --check --skip-latency   # qualité seule (CI)
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from config import CHUNKING_CONFIG, CONTEXT_CONFIG, RETRIEVAL_CONFIG, VECTORSTORE_CONFIG
+from local_models import OfflineResources, build_offline_index, install_offline_resources
+
+SCHEMA_VERSION = 1
+
+# Métriques comparées à la référence : plus haut = mieux, ou plus bas = mieux
+QUALITY_METRICS = ["recall_at_k", "mrr", "context_recall"]
+LATENCY_METRICS = ["ingest_s", "load_s", "retrieval_p50_ms", "retrieval_p99_ms", "api_p50_ms", "api_p99_ms"]
+
+
+def percentile_ms(values, q):
+    return round(float(np.percentile(values, q)) * 1000, 3) if values else 0.0
+
+
+def directory_size(directory):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(directory) for name in names)
+
+
+def measure_ingest(corpus, directory):
+    start = time.perf_counter()
+    result = build_offline_index(corpus, directory)
+    return {
+        "ingest_s": round(time.perf_counter() - start, 4),
+        "chunks": result["added"],
+        "index_bytes": directory_size(directory),
+    }
+
+
+def measure_load(directory, question):
+    import chatbot
+
+    start = time.perf_counter()
+    resources = OfflineResources(directory)
+    install_offline_resources(resources)
+    chatbot.retrieve(question)
+    return {"load_s": round(time.perf_counter() - start, 4)}, resources
+
+
+def evaluate_retrieval(gold, resources, k, repeat):
+    """Rappel@k, MRR et rappel du contexte final, puis latence de la recherche seule."""
+    import chatbot
+
+    query_vectors = [resources.embedding.embed_query(item["question"]) for item in gold]
+    hits, context_hits, reciprocal_ranks = 0, 0, []
+    for item, vector in zip(gold, query_vectors):
+        candidates = chatbot.retrieve(item["question"], vector)
+        sources = [doc.metadata.get("source") for doc, _ in candidates]
+        rank = sources.index(item["source"]) + 1 if item["source"] in sources else None
+        hits += rank is not None and rank <= k
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+        context = chatbot.select_context(candidates)
+        context_hits += any(doc.metadata.get("source") == item["source"] for doc in context)
+
+    latencies = []
+    for _ in range(repeat):
+        for item, vector in zip(gold, query_vectors):
+            start = time.perf_counter()
+            chatbot.retrieve(item["question"], vector)
+            latencies.append(time.perf_counter() - start)
+
+    return {
+        "recall_at_k": round(hits / len(gold), 4),
+        "mrr": round(float(np.mean(reciprocal_ranks)), 4),
+        "context_recall": round(context_hits / len(gold), 4),
+        "retrieval_p50_ms": percentile_ms(latencies, 50),
+        "retrieval_p99_ms": percentile_ms(latencies, 99),
+    }
+
+
+async def measure_api(questions, total_requests, clients):
+    """Latence de bout en bout de /api/chat (modèle simulé), avec `clients` clients concurrents."""
+    import httpx
+    import api
+
+    latencies, errors = [], 0
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        queue = asyncio.Queue()
+        for i in range(total_requests):
+            queue.put_nowait(questions[i % len(questions)])
+
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                question = queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.post("/api/chat", json={"message": question})
+                latencies.append(time.perf_counter() - start)
+                errors += response.status_code != 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "api_p50_ms": percentile_ms(latencies, 50),
+        "api_p99_ms": percentile_ms(latencies, 99),
+        "api_throughput_rps": round(total_requests / elapsed, 2),
+        "api_errors": errors,
+    }
+
+
+def compare(metrics, baseline, quality_tolerance, latency_tolerance, latency_floor_ms, check_latency=True):
+    """
+    Liste les régressions par rapport à la référence.
+
+    Une métrique de qualité régresse si elle baisse de plus de `quality_tolerance`
+    (valeur absolue). Une latence régresse si elle dépasse la référence de plus de
+    `latency_tolerance` (relatif) et de plus de `latency_floor_ms` (absolu, pour
+    ignorer le bruit des mesures très courtes). Avec `check_latency=False`, seules
+    la qualité et les erreurs sont comparées (référence mesurée sur une autre machine).
+    """
+    regressions = []
+    for name in QUALITY_METRICS:
+        if name in baseline and metrics[name] < baseline[name] - quality_tolerance:
+            regressions.append(f"{name} : {baseline[name]} -> {metrics[name]}")
+    for name in LATENCY_METRICS:
+        if not check_latency or name not in baseline:
+            continue
+        floor = latency_floor_ms / 1000 if name.endswith("_s") else latency_floor_ms
+        if (metrics[name] > baseline[name] * (1 + latency_tolerance)
+                and metrics[name] - baseline[name] > floor):
+            regressions.append(f"{name} : {baseline[name]} -> {metrics[name]}")
+    if metrics["api_errors"] > baseline.get("api_errors", 0):
+        regressions.append(f"api_errors : {baseline.get('api_errors', 0)} -> {metrics['api_errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc d'essai hors ligne et détection de régressions")
+    parser.add_argument("--corpus", default="Livrable_01.json")
+    parser.add_argument("--gold", default="gold_questions.json")
+    parser.add_argument("--k", type=int, default=VECTORSTORE_CONFIG["k_nearest_neighbors"])
+    parser.add_argument("--repeat", type=int, default=20, help="Passes de mesure de la latence de recherche")
+    parser.add_argument("--requests", type=int, default=96, help="Requêtes envoyées à /api/chat")
+    parser.add_argument("--clients", type=int, default=8, help="Clients concurrents sur /api/chat")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Latence simulée du modèle (s)")
+    parser.add_argument("--output", help="Écrit les résultats dans ce fichier JSON")
+    parser.add_argument("--baseline", help="Fichier de référence (écrit, ou lu avec --check)")
+    parser.add_argument("--check", action="store_true", help="Compare à --baseline au lieu de l'écrire")
+    parser.add_argument("--quality-tolerance", type=float, default=0.02)
+    parser.add_argument("--latency-tolerance", type=float, default=0.5)
+    parser.add_argument("--latency-floor-ms", type=float, default=5.0)
+    parser.add_argument("--skip-latency", action="store_true",
+                        help="Ne compare que la qualité et les erreurs (machine différente de la référence)")
+    args = parser.parse_args()
+    if args.check and not args.baseline:
+        parser.error("--check nécessite --baseline")
+
+    logging.getLogger("rag.trace").setLevel(logging.WARNING)
+    logging.getLogger("context").setLevel(logging.WARNING)
+
+    with open(args.gold, "r", encoding="utf-8") as f:
+        gold = json.load(f)
+
+    with tempfile.TemporaryDirectory(prefix="benchmark_") as directory:
+        metrics = measure_ingest(args.corpus, directory)
+        load, resources = measure_load(directory, gold[0]["question"])
+        metrics.update(load)
+        metrics.update(evaluate_retrieval(gold, resources, args.k, args.repeat))
+        resources.model.latency = args.llm_latency
+        metrics.update(asyncio.run(measure_api([item["question"] for item in gold], args.requests, args.clients)))
+
+    results = {
+        "schema_version": SCHEMA_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": {"python": platform.python_version(), "machine": platform.machine()},
+        "parameters": {
+            "corpus": args.corpus,
+            "gold_questions": len(gold),
+            "k": args.k,
+            "llm_latency_s": args.llm_latency,
+            "chunking": CHUNKING_CONFIG,
+            "retrieval": RETRIEVAL_CONFIG,
+            "context": CONTEXT_CONFIG,
+            "index_type": VECTORSTORE_CONFIG["index_type"],
+        },
+        "metrics": metrics,
+    }
+
+    for name, value in metrics.items():
+        print(f"{name:<22} {value}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
+
+    if not args.baseline:
+        return
+    if not args.check:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
+        print(f"\nRéférence enregistrée dans {args.baseline}")
+        return
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline["parameters"] != results["parameters"]:
+        print("\n⚠️  Paramètres différents de la référence : la comparaison peut être trompeuse.")
+    regressions = compare(metrics, baseline["metrics"], args.quality_tolerance,
+                          args.latency_tolerance, args.latency_floor_ms, not args.skip_latency)
+    if regressions:
+        print("\n❌ Régressions détectées :")
+        for regression in regressions:
+            print(f"  - {regression}")
+        sys.exit(1)
+    print("\n✅ Aucune régression par rapport à la référence.")
+
+
+if __name__ == "__main__":
+    main()
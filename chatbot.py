@@ -1,59 +1,282 @@
 import os
 import logging
+import threading
+import time
+import contextvars
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
-from langchain_community.vectorstores import Chroma
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.chains import ConversationalRetrievalChain
-from langchain.memory import ConversationBufferMemory
+from langchain.chains.conversational_retrieval.prompts import CONDENSE_QUESTION_PROMPT
 from langchain.prompts import PromptTemplate
 from config import (
     GOOGLE_API_KEY,
     MODEL_CONFIG,
+    EMBEDDING_CONFIG,
     VECTORSTORE_CONFIG,
+    MEMORY_CONFIG,
+    CACHE_CONFIG,
+    RETRIEVAL_CONFIG,
+    CONTEXT_CONFIG,
+    REWRITE_CONFIG,
+    BATCH_CONFIG,
+    CONVERSATION_CONFIG,
+    CORPUS_CONFIG,
+    server_workers,
     SYSTEM_PROMPT
 )
+from memory_store import SessionMemoryStore, SqliteSessionStore
+from conversation_store import ConversationStore
+from answer_cache import AnswerCache
+from embedding_cache import CachedEmbeddings
+from keyword_index import reciprocal_rank_fusion
+from corpus_registry import UnknownCorpus, open_corpus, registry_from_config
+from context import pack_context, estimate_tokens
+from rewrite import needs_rewrite, same_query
+from tracing import stage, record_stage, set_attribute
+from concurrency import RateLimiter
+from model_client import ScheduledChatModel, ScheduledEmbeddings
 
 # Configuration de la clé API Google
 os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
 
-# Initialisation du modèle
-logger.info("Initializing model...")
-model = ChatGoogleGenerativeAI(
-    model=MODEL_CONFIG["model_name"],
-    google_api_key=GOOGLE_API_KEY,
-    temperature=MODEL_CONFIG["temperature"],
-    max_output_tokens=MODEL_CONFIG["max_output_tokens"],
-    top_p=MODEL_CONFIG["top_p"],
-    convert_system_message_to_human=True
-)
-logger.info("Model initialized successfully!")
+class Resources:
+    """Objets coûteux à construire : modèles, embeddings et registre des corpus (index vectoriel et BM25)."""
 
-# Initialisation du vector store
-logger.info("Initializing vector store...")
+    def __init__(self):
+        # Import différé : le client Gemini est long à charger
+        from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
 
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        # Initialisation du modèle. Les appels passent par model_client (débit, délai,
+        # nouvelles tentatives) : les nouvelles tentatives internes du client sont désactivées.
+        logger.info("Initializing model...")
+        self.model = ScheduledChatModel(ChatGoogleGenerativeAI(
+            model=MODEL_CONFIG["model_name"],
+            google_api_key=GOOGLE_API_KEY,
+            temperature=MODEL_CONFIG["temperature"],
+            max_output_tokens=MODEL_CONFIG["max_output_tokens"],
+            top_p=MODEL_CONFIG["top_p"],
+            max_retries=1,
+            convert_system_message_to_human=True
+        ), MODEL_CONFIG["model_name"])
+        logger.info("Model initialized successfully!")
 
-# Initialisation des embeddings
-embedding = GoogleGenerativeAIEmbeddings(
-    model="models/embedding-001",
-    task_type="retrieval_document"
-)
+        # Modèle de reformulation : un modèle plus léger suffit pour réécrire une question
+        self.rewrite_model = self.model
+        if REWRITE_CONFIG["model_name"]:
+            self.rewrite_model = ScheduledChatModel(ChatGoogleGenerativeAI(
+                model=REWRITE_CONFIG["model_name"],
+                google_api_key=GOOGLE_API_KEY,
+                temperature=0,
+                max_output_tokens=REWRITE_CONFIG["max_output_tokens"],
+                max_retries=1,
+                convert_system_message_to_human=True
+            ), REWRITE_CONFIG["model_name"])
 
-# Configuration du vector store
-logger.info("Initializing vector store...")
-vectorstore = Chroma(
-    persist_directory="vectorstore_livrable01",
-    embedding_function=embedding,
-    collection_name="chatbot"
-)
-logger.info("Application initialized successfully!")
+        # Initialisation des embeddings (même modèle que pour l'indexation)
+        self.embedding = ScheduledEmbeddings(GoogleGenerativeAIEmbeddings(
+            model=EMBEDDING_CONFIG["model_name"],
+            task_type=EMBEDDING_CONFIG["task_type"]
+        ), EMBEDDING_CONFIG["model_name"])
+        # Embeddings des questions partagés par les workers : une question déjà posée
+        # ne consomme plus de quota d'embedding
+        if CACHE_CONFIG["embedding_db_path"]:
+            self.embedding = CachedEmbeddings(
+                self.embedding,
+                EMBEDDING_CONFIG["model_name"],
+                CACHE_CONFIG["embedding_db_path"],
+                max_entries=CACHE_CONFIG["embedding_max_entries"]
+            )
+
+        # Corpus : chaque index est ouvert à sa première question, puis gardé dans un pool LRU
+        self.corpora = registry_from_config(
+            lambda name, settings: open_corpus(name, settings, self.embedding)
+        )
+        logger.info("Application initialized successfully!")
+
+
+_resources = None
+_resources_lock = threading.Lock()
+# État de démarrage exposé par /api/ready
+_startup = {"status": "cold", "error": None, "seconds": None}
+
+def get_resources():
+    """
+    Retourne les ressources du chatbot, construites au premier appel seulement.
+
+    L'import de ce module reste ainsi rapide : rien n'est initialisé tant qu'aucune
+    question n'est posée ou que `warm_up` n'a pas été appelé.
+    """
+    global _resources
+    if _resources is None:
+        with _resources_lock:
+            if _resources is None:
+                _resources = Resources()
+                # Construction à la première question (sans préchauffage, ou après un
+                # préchauffage en échec) : le chatbot peut désormais répondre
+                if _startup["status"] != "warming":
+                    _startup.update(status="ready", error=None)
+    return _resources
+
+def warm_up(dummy_query=None):
+    """
+    Construit les ressources et, si demandé, exécute une recherche factice pour ouvrir
+    l'index et établir la connexion à l'API d'embedding avant la première vraie question.
+    """
+    _startup["status"] = "warming"
+    start = time.perf_counter()
+    try:
+        resources = get_resources()
+        resources.corpora.get()
+        if dummy_query:
+            retrieve(dummy_query)
+    except Exception as e:
+        _startup.update(status="error", error=str(e))
+        logger.error(f"Warm-up failed: {e}")
+        raise
+    _startup.update(status="ready", error=None, seconds=round(time.perf_counter() - start, 3))
+    logger.info(f"Warm-up done in {_startup['seconds']}s")
 
-# Configuration de la mémoire
-memory = ConversationBufferMemory(
-    memory_key="chat_history",
-    return_messages=True
+def get_corpus(name=None):
+    """Corpus désigné par la requête (le corpus par défaut si `name` est vide)."""
+    corpus = get_resources().corpora.get(name)
+    # Un préchauffage en échec (index absent au démarrage...) n'empêche pas de
+    # servir dès que le corpus s'ouvre
+    if _startup["status"] == "error":
+        _startup.update(status="ready", error=None)
+    return corpus
+
+def resolve_corpus(name=None):
+    """
+    Nom du corpus désigné par une requête, sans construire les ressources.
+
+    Raises:
+        UnknownCorpus: si le corpus n'est pas déclaré.
+    """
+    if _resources is not None:
+        return _resources.corpora.resolve(name)
+    name = name or CORPUS_CONFIG["default"]
+    if name not in CORPUS_CONFIG["corpora"]:
+        raise UnknownCorpus(f"Corpus inconnu : {name}")
+    return name
+
+def close_idle_corpora():
+    """Ferme les corpus inutilisés (appelé périodiquement par l'API)."""
+    if _resources is not None:
+        _resources.corpora.close_idle()
+
+def corpus_stats():
+    return _resources.corpora.stats() if _resources is not None else None
+
+def readiness():
+    """État de démarrage : `cold`, `warming`, `ready` ou `error`."""
+    return dict(_startup)
+
+def skip_warm_up():
+    """
+    Démarrage sans préchauffage : les ressources seront construites à la première
+    question, le chatbot est donc prêt à en recevoir.
+    """
+    if _startup["status"] == "cold":
+        _startup["status"] = "ready"
+
+# Configuration de la mémoire : une fenêtre bornée par session, dans SQLite pour que
+# tous les workers du serveur voient les mêmes sessions
+_memory_limits = dict(
+    max_turns=MEMORY_CONFIG["max_turns"],
+    max_chars=MEMORY_CONFIG["max_chars"],
+    max_sessions=MEMORY_CONFIG["max_sessions"],
+    max_total_chars=MEMORY_CONFIG["max_total_chars"],
+    ttl=MEMORY_CONFIG["ttl"]
 )
+if MEMORY_CONFIG["db_path"]:
+    session_memory = SqliteSessionStore(MEMORY_CONFIG["db_path"], **_memory_limits)
+else:
+    session_memory = SessionMemoryStore(**_memory_limits)
+
+# Conversations enregistrées : l'historique d'une session qui en porte l'identifiant
+# est lu dans le magasin plutôt que dans la mémoire de session
+conversation_store = None
+if CONVERSATION_CONFIG["enabled"]:
+    conversation_store = ConversationStore(
+        CONVERSATION_CONFIG["db_path"],
+        title_length=CONVERSATION_CONFIG["title_length"]
+    )
+
+# Cache des réponses, invalidé à chaque reconstruction de l'index. `answer_cache` est
+# celui du corpus par défaut ; les autres corpus ont le leur, créé à la première question.
+def _build_answer_cache(db_path):
+    return AnswerCache(
+        max_entries=CACHE_CONFIG["max_entries"],
+        ttl=CACHE_CONFIG["ttl"],
+        similarity_threshold=CACHE_CONFIG["similarity_threshold"],
+        db_path=db_path
+    )
+
+answer_cache = None
+if CACHE_CONFIG["enabled"]:
+    answer_cache = _build_answer_cache(CACHE_CONFIG["db_path"])
+_corpus_caches = {}
+_corpus_caches_lock = threading.Lock()
+
+def get_answer_cache(corpus):
+    """Cache des réponses du corpus (None si le cache est désactivé)."""
+    if answer_cache is None or corpus.name == CORPUS_CONFIG["default"]:
+        return answer_cache
+    with _corpus_caches_lock:
+        if corpus.name not in _corpus_caches:
+            db_path = CACHE_CONFIG["db_path"]
+            if db_path:
+                root, extension = os.path.splitext(db_path)
+                db_path = f"{root}.{corpus.name}{extension}"
+            _corpus_caches[corpus.name] = _build_answer_cache(db_path)
+        return _corpus_caches[corpus.name]
+
+def reopen_stores():
+    """
+    Rouvre les connexions SQLite des magasins partagés (mémoire de session,
+    conversations, caches). À appeler dans chaque worker créé par fork après le
+    chargement de l'application (gunicorn --preload) : une connexion ouverte dans
+    le processus maître ne doit pas être réutilisée par ses fils.
+    """
+    stores = [answer_cache, conversation_store, *_corpus_caches.values()]
+    if isinstance(session_memory, SqliteSessionStore):
+        stores.append(session_memory)
+    if _resources is not None and isinstance(_resources.embedding, CachedEmbeddings):
+        stores.append(_resources.embedding)
+    for store in stores:
+        if store is not None:
+            store.reopen()
+
+def answer_cache_stats():
+    """État des caches de réponses, par corpus (None si le cache est désactivé)."""
+    if answer_cache is None:
+        return None
+    with _corpus_caches_lock:
+        caches = {CORPUS_CONFIG["default"]: answer_cache, **_corpus_caches}
+    return {name: cache.stats() for name, cache in caches.items()}
+
+# Recherches spéculatives lancées pendant la reformulation
+_speculation_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="speculative")
+
+# Débit des générations lancées par answer_batch, partagé par tous les lots (et
+# réparti entre les workers du serveur) : créé au premier lot, dans le worker
+_batch_rate_limiter = None
+_batch_rate_limiter_lock = threading.Lock()
+
+def batch_rate_limiter():
+    global _batch_rate_limiter
+    with _batch_rate_limiter_lock:
+        if _batch_rate_limiter is None:
+            _batch_rate_limiter = RateLimiter(
+                rate=BATCH_CONFIG["requests_per_minute"] / 60 / server_workers(),
+                burst=BATCH_CONFIG["max_concurrency"]
+            )
+        return _batch_rate_limiter
+
+# Réponse d'une question dont le filtre `where` ne retient aucun chunk : le modèle
+# (appel limité en débit) n'est pas sollicité pour une réponse qui serait inventée
+NO_MATCH_ANSWER = "Aucun document ne correspond aux filtres de la recherche."
 
 # Configuration du prompt
 prompt = PromptTemplate(
@@ -61,20 +284,405 @@ prompt = PromptTemplate(
     input_variables=["context", "question", "chat_history"]
 )
 
-# Création de la chaîne de conversation
-qa_chain = ConversationalRetrievalChain.from_llm(
-    llm=model,
-    retriever=vectorstore.as_retriever(
-        search_kwargs={"k": VECTORSTORE_CONFIG["k_nearest_neighbors"]}
-    ),
-    memory=memory,
-    combine_docs_chain_kwargs={"prompt": prompt}
-)
+# Le pipeline reprend les étapes de ConversationalRetrievalChain (reformulation,
+# recherche, génération) de façon explicite, pour pouvoir streamer la génération.
+
+def format_chat_history(history):
+    """Sérialise l'historique (liste de tuples question/réponse) comme le fait LangChain."""
+    return "".join(f"\nHuman: {question}\nAssistant: {answer}" for question, answer in history)
+
+def condense_question(question, history):
+    """Reformule une question de suivi en question autonome à partir de l'historique."""
+    if not history:
+        return question
+    condense_prompt = CONDENSE_QUESTION_PROMPT.format(
+        question=question,
+        chat_history=format_chat_history(history)
+    )
+    with stage("condense_question"):
+        return get_resources().rewrite_model.invoke(condense_prompt).content
+
+def _speculate(question, corpus, where):
+    """Embedding et recherche sur la question brute (exécuté pendant la reformulation)."""
+    with stage("speculative_embed"):
+        query_vector = get_resources().embedding.embed_query(question)
+    return query_vector, retrieve(question, query_vector, corpus, where)
+
+def resolve_question(question, history, corpus=None, where=None):
+    """
+    Détermine la question autonome selon la politique de reformulation.
+
+    Une question sans historique, ou jugée autonome par l'heuristique, est utilisée
+    telle quelle : l'appel au modèle de reformulation est évité. Sinon, si la recherche
+    spéculative est activée, la question brute est recherchée en parallèle de la
+    reformulation ; le résultat est réutilisé quand la reformulation ne change pas
+    les termes de la requête.
+
+    Returns:
+        tuple: (question autonome, embedding ou None, chunks candidats ou None).
+    """
+    if not needs_rewrite(question, history, REWRITE_CONFIG["policy"]):
+        if history:
+            set_attribute("rewrite", "skipped")
+        return question, None, None
+    set_attribute("rewrite", "done")
+    if not REWRITE_CONFIG["speculative_retrieval"]:
+        return condense_question(question, history), None, None
+
+    # Copie du contexte pour que les étapes spéculatives soient tracées avec la requête
+    speculation = _speculation_pool.submit(contextvars.copy_context().run, _speculate, question, corpus, where)
+    standalone_question = condense_question(question, history)
+    if same_query(standalone_question, question):
+        try:
+            query_vector, candidates = speculation.result()
+        except Exception as e:
+            # La recherche spéculative n'est qu'une optimisation : en cas d'échec
+            # (quota, délai dépassé, index), la recherche normale prend le relais
+            logger.warning(f"Speculative retrieval failed: {e}")
+            set_attribute("speculation", "error")
+            return standalone_question, None, None
+        set_attribute("speculation", "hit")
+        return standalone_question, query_vector, candidates
+    speculation.cancel()
+    set_attribute("speculation", "miss")
+    return standalone_question, None, None
+
+
+def metadata_filter(documents=None, date_from=None, date_to=None, indice_rag=None):
+    """
+    Construit le filtre de métadonnées (`where`, voir vector_index) d'une requête.
+
+    Args:
+        documents (list, optional): Noms de fichiers (`source`) à interroger.
+        date_from, date_to (date ou datetime, optional): Période de modification
+            (`modifié`), bornes incluses. Une date sans heure couvre le jour entier
+            (de 00:00 à 23:59:59.999999 pour `date_to`) ; sans fuseau, elle est lue en UTC.
+        indice_rag (list, optional): Valeurs de `indice_rag` acceptées.
+
+    Returns:
+        dict: Le filtre, ou None si aucun critère n'est donné.
+    """
+    def timestamp(date, end_of_day=False):
+        if date is None:
+            return None
+        if not isinstance(date, datetime):
+            date = datetime(date.year, date.month, date.day)
+            if end_of_day:
+                date += timedelta(days=1, microseconds=-1)
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=timezone.utc)
+        return date.timestamp()
+
+    where = {}
+    if documents:
+        where["source"] = {"in": list(documents)}
+    if indice_rag:
+        where["indice_rag"] = {"in": list(indice_rag)}
+    if date_from is not None or date_to is not None:
+        where["modifié_ts"] = {"gte": timestamp(date_from), "lte": timestamp(date_to, end_of_day=True)}
+    return where or None
+
+def retrieve(question, query_vector=None, corpus=None, where=None):
+    """
+    Retourne les chunks candidats pour la question, avec leur pertinence, dans le
+    corpus désigné (par défaut CORPUS_CONFIG["default"]). Avec un filtre `where`,
+    seuls les chunks qui le satisfont sont recherchés, dans l'index vectoriel comme
+    dans l'index BM25.
+
+    En mode hybride, les résultats de la recherche vectorielle et de l'index BM25
+    (noms propres, chiffres, années...) sont fusionnés par rang réciproque.
+
+    Returns:
+        list: tuples (Document, pertinence vectorielle entre 0 et 1, ou None pour
+        un chunk trouvé uniquement par BM25), du plus au moins pertinent.
+    """
+    if query_vector is None:
+        with stage("embed_query"):
+            query_vector = get_resources().embedding.embed_query(question)
+    candidates = retrieve_many([question], [query_vector], corpus, where)[0]
+    set_attribute("retrieved_chunks", len(candidates))
+    return candidates
+
+def retrieve_many(questions, query_vectors, corpus=None, where=None):
+    """
+    Variante groupée de `retrieve` : la recherche vectorielle de toutes les questions
+    se fait en un seul passage sur l'index.
+
+    Returns:
+        list: pour chaque question, la liste renvoyée par `retrieve`.
+    """
+    corpus = get_corpus(corpus)
+    keyword_index = corpus.keyword_index
+    if where:
+        set_attribute("filters", sorted(where))
+    candidates = max(VECTORSTORE_CONFIG["k_nearest_neighbors"], RETRIEVAL_CONFIG["candidates"])
+    with stage("vector_search"):
+        vector_results = corpus.vector_index.search_many(query_vectors, k=candidates, where=where)
+    if keyword_index is None:
+        return vector_results
+
+    with stage("keyword_search"):
+        keyword_results = [
+            [(doc, None) for doc, _ in keyword_index.search(question, k=candidates, where=where)]
+            for question in questions
+        ]
+    return [
+        reciprocal_rank_fusion([vector_docs, keyword_docs], k=candidates, rrf_k=RETRIEVAL_CONFIG["rrf_k"])
+        for vector_docs, keyword_docs in zip(vector_results, keyword_results)
+    ]
+
+def select_context(scored_docs):
+    """Applique le seuil de pertinence, fusionne les recouvrements et remplit le budget de tokens."""
+    with stage("context_packing"):
+        docs = pack_context(
+            scored_docs,
+            max_tokens=CONTEXT_CONFIG["max_tokens"],
+            score_threshold=VECTORSTORE_CONFIG["score_threshold"],
+            use_mmr=CONTEXT_CONFIG["use_mmr"],
+            mmr_lambda=CONTEXT_CONFIG["mmr_lambda"],
+            baseline_k=VECTORSTORE_CONFIG["k_nearest_neighbors"],
+            min_chunks=CONTEXT_CONFIG["min_chunks"]
+        )
+    set_attribute("context_chunks", len(docs))
+    return docs
+
+def lookup_cache(standalone_question, query_vector=None, corpus=None, where=None):
+    """
+    Calcule l'embedding de la question (s'il n'est pas fourni) et consulte le cache des réponses.
+
+    Returns:
+        tuple: (réponse en cache ou None, embedding de la question, version du corpus,
+        cache du corpus ou None). L'embedding est réutilisé pour la recherche en cas
+        d'absence du cache. Une question filtrée (`where`) ne passe pas par le cache :
+        sa réponse dépend du filtre.
+    """
+    if query_vector is None:
+        with stage("embed_query"):
+            query_vector = get_resources().embedding.embed_query(standalone_question)
+    corpus = get_corpus(corpus)
+    version = corpus.version()
+    cache = get_answer_cache(corpus) if not where else None
+    cached = None
+    if cache is not None:
+        with stage("cache_lookup"):
+            cached, kind = cache.lookup(standalone_question, version, query_vector)
+        set_attribute("cache", kind)
+    return cached, query_vector, version, cache
+
+def build_prompt(question, docs):
+    """Construit le prompt final en concaténant les chunks retrouvés."""
+    context = "\n\n".join(doc.page_content for doc in docs)
+    return prompt.format(context=context, question=question, chat_history="")
+
+def generate(prompt_text):
+    """Appelle le modèle sur le prompt final."""
+    set_attribute("prompt_tokens", estimate_tokens(prompt_text))
+    with stage("generation"):
+        answer = get_resources().model.invoke(prompt_text).content
+    set_attribute("completion_tokens", estimate_tokens(answer))
+    return answer
+
+def load_history(session_id):
+    """
+    Derniers échanges de la session : ceux de la conversation enregistrée si
+    `session_id` en est une, sinon ceux de la mémoire de session.
+    """
+    if not session_id:
+        return []
+    if conversation_store is not None:
+        turns = conversation_store.recent_turns(
+            session_id, MEMORY_CONFIG["max_turns"], MEMORY_CONFIG["max_chars"]
+        )
+        if turns is not None:
+            return turns
+    return session_memory.history(session_id)
+
+def save_turn(session_id, question, answer, docs):
+    """Enregistre l'échange dans la conversation ou, à défaut, dans la mémoire de session."""
+    if not session_id:
+        return
+    if conversation_store is not None and conversation_store.append_turn(
+        session_id, question, answer, [doc.metadata for doc in docs]
+    ):
+        return
+    session_memory.append(session_id, question, answer)
+
+def answer_question(question, session_id=None, corpus=None, where=None):
+    """
+    Répond à une question en tenant compte de l'historique de la session.
+
+    Args:
+        question (str): La question posée.
+        session_id (str, optional): Identifiant de la session. Sans identifiant,
+            la question est traitée sans historique.
+        corpus (str, optional): Corpus interrogé (CORPUS_CONFIG), par défaut
+            CORPUS_CONFIG["default"].
+        where (dict, optional): Filtre de métadonnées (voir `metadata_filter`).
+
+    Returns:
+        dict: La réponse (`answer`) et les chunks utilisés (`source_documents`).
+    """
+    history = load_history(session_id)
+    standalone_question, query_vector, candidates = resolve_question(question, history, corpus, where)
+    cached, query_vector, version, cache = lookup_cache(standalone_question, query_vector, corpus, where)
+    if cached is not None:
+        answer, docs = cached["answer"], cached["source_documents"]
+    else:
+        if candidates is None:
+            candidates = retrieve(standalone_question, query_vector, corpus, where)
+        if where and not candidates:
+            set_attribute("no_match", True)
+            answer, docs = NO_MATCH_ANSWER, []
+        else:
+            docs = select_context(candidates)
+            answer = generate(build_prompt(standalone_question, docs))
+            if cache is not None:
+                cache.put(standalone_question, version,
+                          {"answer": answer, "source_documents": docs}, query_vector)
+    save_turn(session_id, question, answer, docs)
+    return {"question": question, "answer": answer, "source_documents": docs}
+
+def stream_answer(question, session_id=None, corpus=None, where=None):
+    """
+    Variante de `answer_question` qui produit la réponse au fil de la génération.
+
+    Yields:
+        tuple: des événements `("token", texte)` puis un dernier événement
+        `("end", réponse)` où `réponse` a la même forme que pour `answer_question`.
+        Fermer le générateur avant la fin interrompt la génération en amont et
+        n'enregistre pas l'échange dans l'historique.
+    """
+    history = load_history(session_id)
+    standalone_question, query_vector, candidates = resolve_question(question, history, corpus, where)
+    cached, query_vector, version, cache = lookup_cache(standalone_question, query_vector, corpus, where)
+    if cached is not None:
+        save_turn(session_id, question, cached["answer"], cached["source_documents"])
+        yield ("token", cached["answer"])
+        yield ("end", {"question": question, **cached})
+        return
+
+    if candidates is None:
+        candidates = retrieve(standalone_question, query_vector, corpus, where)
+    if where and not candidates:
+        set_attribute("no_match", True)
+        save_turn(session_id, question, NO_MATCH_ANSWER, [])
+        yield ("token", NO_MATCH_ANSWER)
+        yield ("end", {"question": question, "answer": NO_MATCH_ANSWER, "source_documents": []})
+        return
+    docs = select_context(candidates)
+    prompt_text = build_prompt(standalone_question, docs)
+    set_attribute("prompt_tokens", estimate_tokens(prompt_text))
+    parts = []
+    start = time.perf_counter()
+    stream = get_resources().model.stream(prompt_text)
+    try:
+        for chunk in stream:
+            if chunk.content:
+                if not parts:
+                    set_attribute("time_to_first_token_s", round(time.perf_counter() - start, 6))
+                parts.append(chunk.content)
+                yield ("token", chunk.content)
+    finally:
+        stream.close()
+        record_stage("generation", time.perf_counter() - start)
+
+    answer = "".join(parts)
+    set_attribute("completion_tokens", estimate_tokens(answer))
+    if cache is not None:
+        cache.put(standalone_question, version,
+                  {"answer": answer, "source_documents": docs}, query_vector)
+    save_turn(session_id, question, answer, docs)
+    yield ("end", {"question": question, "answer": answer, "source_documents": docs})
+
+def embed_questions(questions):
+    """Embeddings de plusieurs questions, par lots de BATCH_CONFIG["embedding_batch_size"]."""
+    embedding = get_resources().embedding
+    size = BATCH_CONFIG["embedding_batch_size"]
+    vectors = []
+    with stage("embed_query"):
+        for start in range(0, len(questions), size):
+            vectors.extend(embedding.embed_documents(questions[start:start + size]))
+    return vectors
+
+def answer_batch(questions, max_concurrency=None, corpus=None, where=None):
+    """
+    Répond à une série de questions indépendantes (sans historique), pour les
+    évaluations.
+
+    Les questions sont vectorisées par lots, le cache est consulté, puis la recherche
+    se fait en un seul passage pour toutes les questions restantes. Les générations
+    tournent en parallèle (au plus `max_concurrency` à la fois), sous le débit
+    maximal de BATCH_CONFIG, partagé par tous les lots en cours. Toutes les questions
+    portent sur le même `corpus`, avec le même filtre `where`.
+
+    Yields:
+        tuple: (position, réponse) dans l'ordre des questions, dès que la réponse et
+        toutes les précédentes sont prêtes. `réponse` a la même forme que pour
+        `answer_question`, ou est l'exception levée pour cette question.
+    """
+    questions = list(questions)
+    if not questions:
+        return
+    vectors = embed_questions(questions)
+    corpus = get_corpus(corpus)
+    version = corpus.version()
+    cache = get_answer_cache(corpus) if not where else None
+
+    results = [None] * len(questions)
+    pending = []
+    for position, (question, vector) in enumerate(zip(questions, vectors)):
+        if cache is not None:
+            cached, _ = cache.lookup(question, version, vector)
+            if cached is not None:
+                results[position] = {"question": question, **cached}
+                continue
+        pending.append(position)
+    set_attribute("cache_hits", len(questions) - len(pending))
+
+    contexts = {}
+    if pending:
+        retrieved = retrieve_many([questions[p] for p in pending], [vectors[p] for p in pending], corpus.name, where)
+        for position, candidates in zip(pending, retrieved):
+            if where and not candidates:
+                results[position] = {"question": questions[position], "answer": NO_MATCH_ANSWER,
+                                     "source_documents": []}
+                continue
+            docs = select_context(candidates)
+            contexts[position] = (docs, build_prompt(questions[position], docs))
+
+    def run(position):
+        docs, prompt_text = contexts[position]
+        batch_rate_limiter().acquire()
+        answer = generate(prompt_text)
+        if cache is not None:
+            cache.put(questions[position], version,
+                      {"answer": answer, "source_documents": docs}, vectors[position])
+        return {"question": questions[position], "answer": answer, "source_documents": docs}
+
+    next_position = 0
+    pool = ThreadPoolExecutor(max_workers=max_concurrency or BATCH_CONFIG["max_concurrency"],
+                              thread_name_prefix="batch")
+    futures = {pool.submit(contextvars.copy_context().run, run, p): p for p in contexts}
+    try:
+        done = iter(as_completed(futures))
+        while next_position < len(questions):
+            if results[next_position] is None:
+                future = next(done)
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    logger.error(f"Batch question {futures[future]} failed: {e}")
+                    results[futures[future]] = e
+                continue
+            yield next_position, results[next_position]
+            next_position += 1
+    finally:
+        # Interruption (client déconnecté) : les générations pas encore lancées sont annulées
+        pool.shutdown(wait=False, cancel_futures=True)
 
 def format_response(response):
     """Formate la réponse pour l'affichage."""
-    print(f"Structure de la réponse reçue: {type(response)}")
-    print(f"Contenu de la réponse: {response}")
+    logger.debug(f"Structure de la réponse reçue: {type(response)}")
     
     if isinstance(response, dict):
         if "answer" in response:
@@ -82,7 +690,7 @@ def format_response(response):
         elif "text" in response:
             return response["text"]
         else:
-            print(f"Clés disponibles dans la réponse: {response.keys()}")
+            logger.debug(f"Clés disponibles dans la réponse: {list(response.keys())}")
             return str(response)
     return str(response)
 
@@ -105,7 +713,7 @@ def chat_with_bot():
                 break
             
             # Génération de la réponse
-            response = qa_chain({"question": question})
+            response = answer_question(question, session_id="cli")
             
             # Formatage et affichage de la réponse
             formatted_response = format_response(response)
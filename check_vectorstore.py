@@ -1,38 +1,41 @@
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from config import VECTORSTORE_CONFIG
+from keyword_index import KeywordIndex
+from vector_index import open_vector_index
 
 def check_vectorstore(keywords=None):
-    # Initialisation des embeddings
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    # Les mots-clés sont cherchés dans l'index inversé construit par embed.py :
+    # seuls les chunks contenant les termes recherchés sont relus.
+    if not KeywordIndex.exists(VECTORSTORE_CONFIG["path"]):
+        print("\nIndex des mots-clés introuvable : lancez d'abord embed.py.")
+        return
+    keyword_index = KeywordIndex(VECTORSTORE_CONFIG["path"])
     
-    # Chargement de la base vectorielle
-    vectorstore = Chroma(
-        persist_directory=VECTORSTORE_CONFIG["path"],
-        embedding_function=embeddings
+    # Même index et même collection que chatbot.py (VECTORSTORE_CONFIG)
+    vector_index = open_vector_index(
+        VECTORSTORE_CONFIG["path"],
+        backend=VECTORSTORE_CONFIG["backend"],
+        collection_name=VECTORSTORE_CONFIG["collection_name"]
     )
     
-    # Récupération de tous les documents
-    collection = vectorstore.get()
-    
     print("\n=== Informations sur la base vectorielle ===")
-    print(f"Nombre de documents : {len(collection['ids'])}")
+    print(f"Backend : {VECTORSTORE_CONFIG['backend']}")
+    print(f"Nombre de vecteurs : {vector_index.count()}")
+    print(f"Nombre de documents : {keyword_index.count()}")
     
-    if len(collection['ids']) > 0:
+    if keyword_index.count() > 0:
         print("\n=== Recherche de mots-clés dans les documents ===")
         for keyword in keywords:
             keyword = keyword.strip()
             found = False
             count = 0
             print(f"\n--- Résultats pour le mot-clé : '{keyword}' ---")
-            for i, (doc_id, doc, metadata) in enumerate(zip(collection['ids'], collection['documents'], collection['metadatas'])):
-                if keyword.lower() in doc.lower():
-                    found = True
-                    count += 1
-                    print(f"\nDocument {i+1}:")
-                    print(f"ID: {doc_id}")
-                    print(f"Contenu: {doc[:200]}...")  # Affiche les 200 premiers caractères
-                    print(f"Métadonnées: {metadata}")
+            for i, (doc_id, doc) in enumerate(keyword_index.lookup(keyword)):
+                found = True
+                count += 1
+                print(f"\nDocument {i+1}:")
+                print(f"ID: {doc_id}")
+                print(f"Contenu: {doc.page_content[:200]}...")  # Affiche les 200 premiers caractères
+                print(f"Métadonnées: {doc.metadata}")
             if found:
                 print(f"\nNombre de chunks contenant '{keyword}' : {count}")
             else:
@@ -47,4 +50,4 @@ if __name__ == "__main__":
         keywords = [""]
     else:
         keywords = [k.strip() for k in keywords_input.split(",") if k.strip()]
-    check_vectorstore(keywords) 
\ No newline at end of file
+    check_vectorstore(keywords)
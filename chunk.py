@@ -1,37 +1,17 @@
-import json
-from langchain.schema import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import sys
+from config import CHUNKING_CONFIG
+from ingestion import iter_chunks
 
-# Charger le fichier JSON (structure: fichier -> dict avec paragraphes)
-with open("Livrable_01.json", "r", encoding="utf-8") as f:
-    data = json.load(f)
+# Corpus à découper : JSON (fichier -> dict avec paragraphes) ou JSONL produit par Script.py
+source = sys.argv[1] if len(sys.argv) > 1 else "Livrable_01.json"
+strategy = sys.argv[2] if len(sys.argv) > 2 else CHUNKING_CONFIG["strategy"]
+params = CHUNKING_CONFIG["params"] if strategy == CHUNKING_CONFIG["strategy"] else {}
 
-# Étape 1 : Transformer les paragraphes en documents LangChain
-documents = []
-for nom_fichier, contenu in data.items():
-    paragraphs = contenu.get("paragraphes", [])
-    texte_complet = "\n".join(paragraphs)
-    
-    doc = Document(
-        page_content=texte_complet,
-        metadata={
-            "source": nom_fichier,
-            "titre": contenu.get("titre", ""),
-            "modifié": contenu.get("modifié", ""),
-            "indice_rag": contenu.get("indice_rag", "")
-        }
-    )
-    documents.append(doc)
+# Lire les documents un par un et les découper selon la stratégie choisie
+chunks = list(iter_chunks(source, strategy, **params))
 
-print(f"Nombre de documents créés : {len(documents)}")
-
-# Étape 2 : Splitter les documents en chunks
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=600,
-    chunk_overlap=150
-)
-
-chunks = text_splitter.split_documents(documents)
+print(f"Stratégie de découpage : {strategy} {params}")
+print(f"Nombre de documents : {len({chunk.metadata['source'] for chunk in chunks})}")
 print(f"Nombre total de chunks générés : {len(chunks)}")
 
 # Optionnel : afficher un chunk exemple
@@ -0,0 +1,159 @@
+import asyncio
+import contextvars
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+
+
+class ServerBusy(Exception):
+    """
+    Levée lorsque le serveur refuse une requête pour se protéger de la surcharge.
+
+    Attributes:
+        status_code (int): Code HTTP à renvoyer au client (429 ou 503).
+        retry_after (int): Délai conseillé (en secondes) avant une nouvelle tentative.
+    """
+
+    def __init__(self, message, status_code=503, retry_after=1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Limite le nombre de requêtes traitées simultanément et la profondeur de la file d'attente.
+
+    Les appels au modèle sont bloquants : ils sont exécutés dans un pool de threads dédié
+    afin de ne jamais bloquer la boucle d'événements d'uvicorn. Au-delà de `max_in_flight`
+    requêtes en cours, les suivantes attendent dans une file bornée par `max_queue` ;
+    une fois la file pleine, les nouvelles requêtes sont rejetées immédiatement (429)
+    plutôt que de s'accumuler, et celles qui attendent plus de `queue_timeout`
+    secondes sont abandonnées (503).
+    """
+
+    def __init__(self, max_in_flight, max_queue, queue_timeout):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        # Le sémaphore est lié à la boucle d'événements qui l'utilise : il est créé
+        # à la première requête, et recréé si le contrôleur sert une nouvelle boucle
+        self._semaphore = None
+        self._loop = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_in_flight,
+            thread_name_prefix="rag-worker"
+        )
+
+    def _get_semaphore(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+            self._loop = loop
+            self.in_flight = self.waiting = 0
+        return self._semaphore
+
+    async def acquire(self):
+        """Réserve une place de traitement ou lève `ServerBusy`."""
+        semaphore = self._get_semaphore()
+        # Les requêtes en attente comptent dès leur arrivée, même si le sémaphore ne
+        # les a pas encore vues (plusieurs requêtes arrivées dans le même tour de boucle)
+        if self.in_flight + self.waiting >= self.max_in_flight + self.max_queue:
+            raise ServerBusy("File d'attente pleine, réessayez plus tard.", status_code=429)
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise ServerBusy("Délai d'attente dépassé, le serveur est surchargé.", status_code=503)
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+
+    def release(self):
+        """Libère une place réservée par `acquire`."""
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        """Réserve une place de traitement pour la durée du bloc."""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def execute(self, func, *args, **kwargs):
+        """Exécute une fonction bloquante dans le pool dédié, sans réserver de place."""
+        loop = asyncio.get_running_loop()
+        # Le contexte (trace de la requête) suit la fonction dans le thread
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, partial(context.run, func, *args, **kwargs))
+
+    async def run(self, func, *args, **kwargs):
+        """Exécute une fonction bloquante dans le pool dédié, sous contrôle d'admission."""
+        async with self.slot():
+            return await self.execute(func, *args, **kwargs)
+
+    def stats(self):
+        """Retourne l'état courant du contrôleur (utile pour le diagnostic)."""
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class RateLimiter:
+    """
+    Seau à jetons partagé entre threads : au plus `rate` appels par seconde en régime
+    établi, avec des rafales d'au plus `burst` appels.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """
+        Bloque jusqu'à ce qu'un jeton soit disponible, puis le consomme.
+
+        Returns:
+            float: Temps d'attente (s).
+
+        Raises:
+            ServerBusy: (429) si aucun jeton ne peut être obtenu avant `timeout` secondes.
+        """
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return now - start
+                wait = (1 - self._tokens) / self.rate
+            if timeout is not None and now + wait - start > timeout:
+                raise ServerBusy("Quota d'appels atteint, réessayez plus tard.",
+                                 status_code=429, retry_after=max(1, math.ceil(wait)))
+            time.sleep(wait)
+
+    def available(self):
+        """Jetons disponibles (approximation, pour le diagnostic)."""
+        with self._lock:
+            elapsed = time.monotonic() - self._updated
+            return round(min(self.burst, self._tokens + elapsed * self.rate), 2)
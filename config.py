@@ -17,11 +17,154 @@ MODEL_CONFIG = {
     "top_k": 40
 }
 
+# Modèle d'embedding, partagé par l'indexation (embed.py) et la recherche (chatbot.py)
+EMBEDDING_CONFIG = {
+    "model_name": "models/embedding-001",
+    "task_type": "retrieval_document"
+}
+
+# Limites d'appel aux API Gemini, par modèle (à ajuster selon le quota du projet)
+UPSTREAM_CONFIG = {
+    "requests_per_minute": {
+        "gemini-2.0-flash": 600,
+        "gemini-2.0-flash-lite": 1200,
+        "models/embedding-001": 1500
+    },
+    "default_requests_per_minute": 60,  # Modèles absents de la liste ci-dessus
+    "burst": 10,                # Appels autorisés en rafale
+    "max_concurrency": 16,      # Appels simultanés par modèle
+    "timeout": 60.0,            # Durée maximale d'un appel (s) ; en streaming, jusqu'au premier fragment
+    "max_queue_wait": 10.0,     # Attente maximale du limiteur avant de répondre 429 (s)
+    "max_retries": 3,           # Nouvelles tentatives sur quota dépassé, indisponibilité ou délai dépassé
+    "backoff_base": 0.5,        # Délai de base de l'attente exponentielle (s)
+    "backoff_max": 8.0          # Attente maximale entre deux tentatives (s)
+}
+
 # Configuration du vectorstore
 VECTORSTORE_CONFIG = {
     "path": "vectorstore_livrable01",
+    "backend": "mmap",          # "mmap" (index en processus, fichiers projetés en mémoire) ou "chroma"
+    "collection_name": "chatbot",  # Collection Chroma (backend "chroma")
+    "index_type": "flat",       # "flat" (recherche exacte) ou "ivf" (approchée, pour les gros corpus)
+    "ivf_lists": None,          # Nombre de listes IVF (None : 4·√N)
+    "ivf_probe": 8,             # Listes parcourues par requête en mode IVF
     "k_nearest_neighbors": 5,
-    "score_threshold": 0.6
+    "score_threshold": 0.6      # Similarité cosinus minimale d'un chunk (tous backends)
+}
+
+# Corpus servis par l'API : un index par livrable, ouvert à la première question qui le
+# désigne et gardé dans un pool LRU borné en nombre et en taille (index sur disque)
+CORPUS_CONFIG = {
+    "default": "livrable01",
+    "corpora": {
+        "livrable01": {
+            "path": VECTORSTORE_CONFIG["path"],
+            "source": "Livrable_01.json",
+            "collection_name": VECTORSTORE_CONFIG["collection_name"]
+        }
+    },
+    "max_open": 8,            # Corpus ouverts simultanément
+    "max_memory_mb": 2048,    # Taille cumulée des index ouverts avant éviction
+    "idle_timeout": 900       # Fermeture d'un corpus inutilisé depuis (s)
+}
+
+# Configuration de la recherche hybride (vectorielle + BM25, fusion par rang réciproque)
+RETRIEVAL_CONFIG = {
+    "mode": "hybrid",      # "hybrid" ou "vector"
+    "candidates": 10,      # Résultats demandés à chaque moteur avant fusion
+    "rrf_k": 60            # Constante de lissage de la fusion RRF
+}
+
+# Configuration de l'assemblage du contexte envoyé au modèle
+CONTEXT_CONFIG = {
+    "max_tokens": 1500,      # Budget de tokens du contexte (remplace un k fixe)
+    "use_mmr": False,        # Diversifier les chunks retenus (MMR)
+    "mmr_lambda": 0.7,       # Compromis pertinence / diversité pour le MMR
+    "min_chunks": 1          # Chunks les mieux classés gardés même sous le seuil
+}
+
+# Configuration du découpage en chunks (voir ingestion.CHUNKERS et bench_chunking.py)
+CHUNKING_CONFIG = {
+    "strategy": "character",  # "character", "paragraph" ou "sentence_window"
+    "params": {"chunk_size": 600, "chunk_overlap": 150}
+}
+
+# Configuration du cache des réponses
+CACHE_CONFIG = {
+    "enabled": True,
+    "max_entries": 1000,             # Nombre de réponses conservées (éviction LRU)
+    "ttl": 86400,                    # Durée de vie (s) d'une réponse en cache
+    "similarity_threshold": 0.95,    # Similarité cosinus minimale pour une question proche
+    "db_path": "answer_cache.sqlite3",  # Persistance SQLite (None pour un cache en mémoire)
+    "embedding_db_path": "embedding_cache.sqlite3",  # Embeddings des questions (None pour désactiver)
+    "embedding_max_entries": 100_000  # Embeddings conservés
+}
+
+# Configuration de la mémoire de conversation (par session)
+MEMORY_CONFIG = {
+    "max_turns": 5,              # Nombre d'échanges conservés par session
+    "max_chars": 4000,           # Taille maximale de l'historique d'une session
+    "max_sessions": 1000,        # Sessions conservées simultanément (éviction LRU)
+    "max_total_chars": 2_000_000,  # Plafond mémoire global de l'historique
+    "ttl": 3600,                 # Durée de vie (s) d'une session inactive
+    "db_path": "sessions.sqlite3"  # Partagée par les workers (None : mémoire du processus)
+}
+
+# Conversations enregistrées côté serveur (SQLite)
+CONVERSATION_CONFIG = {
+    "enabled": True,
+    "db_path": "conversations.sqlite3",
+    "page_size": 50,         # Éléments par page (liste des conversations, messages)
+    "max_page_size": 200,    # Taille de page maximale acceptée par l'API
+    "title_length": 60       # Titre par défaut : début de la première question
+}
+
+# Configuration du serveur API
+API_CONFIG = {
+    "max_in_flight": 8,      # Requêtes traitées simultanément (taille du pool de threads)
+    "max_queue": 32,         # Requêtes en attente au-delà desquelles on répond 429
+    "queue_timeout": 30.0    # Attente maximale (s) avant de répondre 503
+}
+
+# Déploiement multi-processus (gunicorn_conf.py, ou `python api.py --workers N`)
+SERVER_CONFIG = {
+    "host": "0.0.0.0",
+    "port": 8000,
+    "workers": int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+    "timeout": 120,          # Délai (s) avant le redémarrage d'un worker bloqué
+    "graceful_timeout": 30,  # Délai (s) laissé aux requêtes en cours à l'arrêt
+    "preload": True          # Charger l'application avant le fork (pages partagées)
+}
+
+def server_workers():
+    """
+    Nombre de workers du serveur en cours (RAG_SERVER_WORKERS, fixé par gunicorn_conf.py
+    ou api.py) : les débits vers Gemini (UPSTREAM_CONFIG, BATCH_CONFIG) sont des
+    plafonds globaux, répartis entre les workers. Lu à chaque appel, et non à l'import
+    de ce module, qui peut précéder le lancement du serveur.
+    """
+    return max(1, int(os.getenv("RAG_SERVER_WORKERS", "1")))
+
+# Configuration des traitements par lots (/api/chat/batch, batch.py)
+BATCH_CONFIG = {
+    "max_questions": 1000,          # Questions acceptées par requête
+    "embedding_batch_size": 100,    # Questions par appel d'embedding
+    "max_concurrency": 4,           # Générations simultanées
+    "requests_per_minute": 120      # Appels de génération par minute (tous lots confondus)
+}
+
+# Configuration du démarrage de l'API
+STARTUP_CONFIG = {
+    "warm_up": True,                          # Construire les ressources dès le démarrage
+    "dummy_query": "cyclisme africain"        # Recherche factice de préchauffage (None pour l'éviter)
+}
+
+# Configuration de la reformulation des questions de suivi
+REWRITE_CONFIG = {
+    "policy": "heuristic",                    # "always", "never" ou "heuristic" (questions de suivi seulement)
+    "model_name": "gemini-2.0-flash-lite",    # Modèle plus léger pour la reformulation (None : modèle principal)
+    "max_output_tokens": 128,                 # Une question reformulée reste courte
+    "speculative_retrieval": True             # Chercher sur la question brute pendant la reformulation
 }
 
 # Configuration du prompt système
@@ -0,0 +1,145 @@
+import logging
+
+from langchain.schema import Document
+
+from keyword_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text):
+    """Estimation du nombre de tokens d'un texte (environ 4 caractères par token)."""
+    return max(1, len(text) // 4)
+
+
+def _merge_overlap(first, second, min_overlap=20):
+    """
+    Fusionne deux textes qui se recouvrent (fin de `first` = début de `second`).
+
+    Returns:
+        str: Le texte fusionné, ou None si les deux textes ne se recouvrent pas.
+    """
+    if second in first:
+        return first
+    probe = second[:min_overlap]
+    if len(probe) < min_overlap:
+        return None
+    start = first.find(probe)
+    while start != -1:
+        if second.startswith(first[start:]):
+            return first + second[len(first) - start:]
+        start = first.find(probe, start + 1)
+    return None
+
+
+def _is_lower(score, other):
+    if score is None:
+        return True
+    if other is None:
+        return False
+    return score <= other
+
+
+def merge_chunks(scored_docs):
+    """
+    Regroupe les chunks d'une même source qui se recouvrent ou se contiennent.
+
+    Le chunk fusionné prend la place du mieux classé des deux et garde le meilleur score.
+
+    Args:
+        scored_docs (list): tuples (Document, score), triés par pertinence.
+
+    Returns:
+        list: tuples (Document, score) sans texte dupliqué.
+    """
+    merged = []
+    for doc, score in scored_docs:
+        for i, (kept, kept_score) in enumerate(merged):
+            if kept.metadata.get("source") != doc.metadata.get("source"):
+                continue
+            text = (_merge_overlap(kept.page_content, doc.page_content)
+                    or _merge_overlap(doc.page_content, kept.page_content))
+            if text is not None:
+                best = kept_score if _is_lower(score, kept_score) else score
+                merged[i] = (Document(page_content=text, metadata=kept.metadata), best)
+                break
+        else:
+            merged.append((doc, score))
+    return merged
+
+
+def mmr_order(scored_docs, lambda_mult=0.7):
+    """
+    Réordonne les chunks par pertinence marginale maximale (MMR).
+
+    La pertinence vient du rang de retrieval ; la redondance est mesurée par la
+    similarité de Jaccard entre les ensembles de termes des chunks, ce qui évite de
+    recalculer des embeddings.
+    """
+    remaining = list(range(len(scored_docs)))
+    terms = [set(tokenize(doc.page_content)) for doc, _ in scored_docs]
+    relevance = [1.0 / (rank + 1) for rank in range(len(scored_docs))]
+    selected = []
+    while remaining:
+        def mmr_score(i):
+            redundancy = max(
+                (len(terms[i] & terms[j]) / max(1, len(terms[i] | terms[j])) for j in selected),
+                default=0.0
+            )
+            return lambda_mult * relevance[i] - (1 - lambda_mult) * redundancy
+        best = max(remaining, key=mmr_score)
+        selected.append(best)
+        remaining.remove(best)
+    return [scored_docs[i] for i in selected]
+
+
+def pack_context(scored_docs, max_tokens, score_threshold=None, use_mmr=False,
+                 mmr_lambda=0.7, baseline_k=None, min_chunks=1):
+    """
+    Sélectionne les chunks envoyés au modèle dans la limite d'un budget de tokens.
+
+    Étapes : seuil de pertinence (les chunks sans score vectoriel, trouvés par BM25,
+    sont conservés, de même que les `min_chunks` mieux classés quel que soit leur
+    score), fusion des chunks qui se recouvrent, ordre MMR optionnel, puis
+    remplissage du budget dans l'ordre de pertinence.
+
+    Args:
+        scored_docs (list): tuples (Document, score de pertinence vectorielle ou None).
+        max_tokens (int): Budget de tokens du contexte.
+        score_threshold (float, optional): Similarité cosinus minimale d'un chunk.
+        use_mmr (bool): Diversifier les chunks retenus.
+        baseline_k (int, optional): Nombre de chunks de l'ancien contexte à k fixe,
+            pour journaliser les tokens économisés.
+        min_chunks (int): Chunks conservés en tête de classement même sous le seuil :
+            le contexte n'est jamais vide tant qu'il y a des candidats.
+
+    Returns:
+        list: Les `Document` retenus, dans l'ordre du contexte.
+    """
+    candidates = [
+        (doc, score) for rank, (doc, score) in enumerate(scored_docs)
+        if rank < min_chunks or score_threshold is None or score is None or score >= score_threshold
+    ]
+    candidates = merge_chunks(candidates)
+    if use_mmr:
+        candidates = mmr_order(candidates, mmr_lambda)
+
+    packed, used = [], 0
+    for doc, _ in candidates:
+        cost = estimate_tokens(doc.page_content)
+        if used + cost > max_tokens:
+            if packed:
+                continue
+            # Un seul chunk trop long : on le tronque plutôt que d'envoyer un contexte vide
+            doc = Document(page_content=doc.page_content[:max_tokens * 4], metadata=doc.metadata)
+            cost = estimate_tokens(doc.page_content)
+        packed.append(doc)
+        used += cost
+
+    if baseline_k is not None:
+        baseline = sum(estimate_tokens(doc.page_content) for doc, _ in scored_docs[:baseline_k])
+        logger.info(
+            "Context: %d/%d chunks, ~%d tokens (fixed top-%d: ~%d, saved ~%d)",
+            len(packed), len(scored_docs), used, baseline_k, baseline, baseline - used
+        )
+    return packed
@@ -0,0 +1,237 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+
+class ConversationStore:
+    """
+    Conversations enregistrées côté serveur, dans SQLite.
+
+    Chaque message est une ligne de `messages`, de clé (conversation, numéro d'ordre) :
+    ajouter un échange écrit deux lignes et met à jour le compteur de la conversation,
+    sans relire ni réécrire le reste. Les lectures passent par les index :
+      - la liste des conversations est paginée par date de mise à jour (curseur) ;
+      - les messages sont paginés par numéro d'ordre, du plus récent au plus ancien ;
+      - l'historique du prompt ne lit que les `max_turns` derniers échanges.
+    Le coût d'un message ne dépend donc ni de la longueur de la conversation ni du
+    nombre de conversations.
+    """
+
+    def __init__(self, db_path, title_length=60):
+        self.db_path = db_path
+        self.title_length = title_length
+        self._lock = threading.Lock()
+        self._connect()
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS conversations ("
+            " id TEXT PRIMARY KEY, title TEXT, created REAL, updated REAL,"
+            " message_count INTEGER NOT NULL DEFAULT 0, last_message TEXT);"
+            "CREATE INDEX IF NOT EXISTS conversations_updated ON conversations (updated, id);"
+            "CREATE TABLE IF NOT EXISTS messages ("
+            " conversation_id TEXT, seq INTEGER, role TEXT, content TEXT,"
+            " sources TEXT, created REAL,"
+            " PRIMARY KEY (conversation_id, seq)) WITHOUT ROWID;"
+        )
+        self._db.commit()
+
+    def _connect(self):
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+
+    def reopen(self):
+        """Nouvelle connexion, à appeler dans un processus créé par fork."""
+        with self._lock:
+            self._connect()
+
+    def create(self, title=None):
+        """Crée une conversation vide et la retourne."""
+        now = time.time()
+        conversation = {
+            "id": uuid.uuid4().hex,
+            "title": title,
+            "created": now,
+            "updated": now,
+            "message_count": 0,
+            "last_message": None
+        }
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO conversations VALUES (:id, :title, :created, :updated,"
+                " :message_count, :last_message)",
+                conversation
+            )
+            self._db.commit()
+        return conversation
+
+    def get(self, conversation_id):
+        """Retourne la conversation (sans ses messages) ou None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, title, created, updated, message_count, last_message"
+                " FROM conversations WHERE id = ?",
+                (conversation_id,)
+            ).fetchone()
+        return self._conversation(row) if row else None
+
+    def list(self, limit=50, before=None):
+        """
+        Liste les conversations, des plus récemment mises à jour aux plus anciennes.
+
+        Args:
+            limit (int): Nombre maximal de conversations.
+            before (str, optional): Curseur retourné par l'appel précédent.
+
+        Returns:
+            tuple: (conversations, curseur de la page suivante ou None).
+        """
+        query = ("SELECT id, title, created, updated, message_count, last_message"
+                 " FROM conversations")
+        params = []
+        if before:
+            updated, conversation_id = self._parse_cursor(before)
+            query += " WHERE updated < ? OR (updated = ? AND id < ?)"
+            params += [updated, updated, conversation_id]
+        query += " ORDER BY updated DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        conversations = [self._conversation(row) for row in rows[:limit]]
+        cursor = None
+        if len(rows) > limit:
+            last = conversations[-1]
+            cursor = f"{last['updated']!r}:{last['id']}"
+        return conversations, cursor
+
+    def messages(self, conversation_id, limit=50, before=None):
+        """
+        Page de messages d'une conversation, dans l'ordre chronologique.
+
+        Args:
+            limit (int): Nombre maximal de messages.
+            before (int, optional): Ne retourne que les messages de numéro inférieur
+                (pour remonter dans la conversation). Par défaut, les plus récents.
+
+        Returns:
+            tuple: (messages, numéro à passer en `before` pour la page précédente ou None).
+        """
+        query = ("SELECT seq, role, content, sources, created FROM messages"
+                 " WHERE conversation_id = ?")
+        params = [conversation_id]
+        if before is not None:
+            query += " AND seq < ?"
+            params.append(before)
+        query += " ORDER BY seq DESC LIMIT ?"
+        params.append(limit + 1)
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        page = [
+            {
+                "seq": seq,
+                "role": role,
+                "content": content,
+                "sources": json.loads(sources) if sources else [],
+                "created": created
+            }
+            for seq, role, content, sources, created in reversed(rows[:limit])
+        ]
+        cursor = page[0]["seq"] if len(rows) > limit else None
+        return page, cursor
+
+    def recent_turns(self, conversation_id, max_turns=5, max_chars=4000):
+        """
+        Derniers échanges (question, réponse) pour le prompt, du plus ancien au plus
+        récent, dans les mêmes limites que la mémoire de session.
+
+        Returns:
+            list: Les échanges, ou None si la conversation n'existe pas.
+        """
+        with self._lock:
+            exists = self._db.execute(
+                "SELECT 1 FROM conversations WHERE id = ?", (conversation_id,)
+            ).fetchone()
+            if not exists:
+                return None
+            rows = self._db.execute(
+                "SELECT role, content FROM messages WHERE conversation_id = ?"
+                " ORDER BY seq DESC LIMIT ?",
+                (conversation_id, 2 * max_turns)
+            ).fetchall()
+
+        turns = []
+        rows.reverse()
+        for (role, question), (next_role, answer) in zip(rows, rows[1:]):
+            if role == "user" and next_role == "assistant":
+                turns.append((question, answer))
+        turns = turns[-max_turns:]
+        chars = sum(len(q) + len(a) for q, a in turns)
+        while turns and chars > max_chars:
+            question, answer = turns.pop(0)
+            chars -= len(question) + len(answer)
+        return turns
+
+    def append_turn(self, conversation_id, question, answer, sources=()):
+        """
+        Ajoute un échange à la conversation, en une transaction.
+
+        Args:
+            sources (list): Métadonnées des chunks utilisés pour la réponse.
+
+        Returns:
+            bool: False si la conversation n'existe pas.
+        """
+        now = time.time()
+        with self._lock, self._db:
+            # Verrou d'écriture pris avant de lire le compteur : deux workers qui écrivent
+            # dans la même conversation ne peuvent pas obtenir les mêmes numéros d'ordre
+            self._db.execute("BEGIN IMMEDIATE")
+            row = self._db.execute(
+                "SELECT message_count, title FROM conversations WHERE id = ?", (conversation_id,)
+            ).fetchone()
+            if row is None:
+                return False
+            count, title = row
+            self._db.executemany(
+                "INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (conversation_id, count + 1, "user", question, None, now),
+                    (conversation_id, count + 2, "assistant", answer,
+                     json.dumps(list(sources), ensure_ascii=False), now)
+                ]
+            )
+            self._db.execute(
+                "UPDATE conversations SET message_count = ?, updated = ?, last_message = ?,"
+                " title = ? WHERE id = ?",
+                (count + 2, now, answer[:200], title or question[:self.title_length], conversation_id)
+            )
+        return True
+
+    def delete(self, conversation_id):
+        """Supprime une conversation et ses messages. Retourne False si elle n'existait pas."""
+        with self._lock, self._db:
+            deleted = self._db.execute(
+                "DELETE FROM conversations WHERE id = ?", (conversation_id,)
+            ).rowcount
+            self._db.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
+        return bool(deleted)
+
+    def stats(self):
+        with self._lock:
+            conversations, messages = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(message_count), 0) FROM conversations"
+            ).fetchone()
+        return {"conversations": conversations, "messages": messages}
+
+    @staticmethod
+    def _conversation(row):
+        keys = ("id", "title", "created", "updated", "message_count", "last_message")
+        return dict(zip(keys, row))
+
+    @staticmethod
+    def _parse_cursor(cursor):
+        try:
+            updated, conversation_id = cursor.split(":", 1)
+            return float(updated), conversation_id
+        except ValueError:
+            raise ValueError(f"Curseur invalide : {cursor}")
@@ -0,0 +1,188 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from config import CORPUS_CONFIG, RETRIEVAL_CONFIG, VECTORSTORE_CONFIG
+from index_version import read_version
+from keyword_index import KeywordIndex
+from vector_index import open_vector_index
+
+logger = logging.getLogger(__name__)
+
+
+class UnknownCorpus(LookupError):
+    """Le corpus demandé n'est pas déclaré dans CORPUS_CONFIG."""
+
+
+def directory_size(directory):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(directory) for name in names)
+
+
+class Corpus:
+    """Index ouverts d'un corpus : recherche vectorielle et, en mode hybride, BM25."""
+
+    def __init__(self, name, path, vector_index, keyword_index=None):
+        self.name = name
+        self.path = path
+        self.vector_index = vector_index
+        self.keyword_index = keyword_index
+        # Les fichiers de l'index sont projetés en mémoire : leur taille sur disque
+        # borne la mémoire qu'ils occupent une fois parcourus
+        self.size = directory_size(path)
+        self.last_used = time.monotonic()
+
+    def version(self):
+        return read_version(self.path)
+
+
+def open_corpus(name, settings, embedding=None):
+    """
+    Ouvre les index d'un corpus déclaré dans CORPUS_CONFIG.
+
+    Args:
+        settings (dict): `path`, et facultativement `backend` et `collection_name`
+            (par défaut ceux de VECTORSTORE_CONFIG).
+        embedding: Modèle d'embedding (collection Chroma).
+    """
+    path = settings["path"]
+    logger.info(f"Opening corpus '{name}' ({path})...")
+    vector_index = open_vector_index(
+        path,
+        backend=settings.get("backend", VECTORSTORE_CONFIG["backend"]),
+        collection_name=settings.get("collection_name", VECTORSTORE_CONFIG["collection_name"]),
+        embedding=embedding,
+        index_type=VECTORSTORE_CONFIG["index_type"],
+        nlist=VECTORSTORE_CONFIG["ivf_lists"],
+        nprobe=VECTORSTORE_CONFIG["ivf_probe"]
+    )
+    if not vector_index.count():
+        logger.warning(f"Vector index of corpus '{name}' is empty (run embed.py).")
+
+    keyword_index = None
+    if RETRIEVAL_CONFIG["mode"] == "hybrid":
+        if KeywordIndex.exists(path):
+            keyword_index = KeywordIndex(path)
+        else:
+            logger.warning(f"Keyword index of corpus '{name}' not found, "
+                           "falling back to vector-only retrieval (run embed.py).")
+    return Corpus(name, path, vector_index, keyword_index)
+
+
+class CorpusRegistry:
+    """
+    Pool des corpus ouverts.
+
+    Un corpus est ouvert à sa première utilisation (une seule ouverture même si
+    plusieurs requêtes le demandent en même temps), puis réutilisé tel quel. Au-delà
+    de `max_open` corpus ou de `max_bytes` d'index ouverts, les moins récemment
+    utilisés sont fermés ; ceux qui n'ont pas servi depuis `idle_timeout` secondes
+    aussi. Fermer un corpus le retire du pool : ses fichiers projetés et sa
+    connexion SQLite sont libérés dès que les requêtes qui l'utilisent encore
+    se terminent.
+    """
+
+    def __init__(self, corpora, default, opener, max_open=8, max_bytes=None, idle_timeout=None):
+        self.corpora = dict(corpora)
+        self.default = default
+        self.opener = opener
+        self.max_open = max_open
+        self.max_bytes = max_bytes
+        self.idle_timeout = idle_timeout
+        self.opens = 0
+        self.evictions = 0
+        self._open = OrderedDict()  # nom -> Corpus, du moins au plus récemment utilisé
+        self._opening = {}          # nom -> verrou d'ouverture
+        self._lock = threading.Lock()
+
+    def resolve(self, name=None):
+        """Nom du corpus à utiliser (le corpus par défaut si `name` est vide)."""
+        name = name or self.default
+        if name not in self.corpora:
+            raise UnknownCorpus(f"Corpus inconnu : {name}")
+        return name
+
+    def get(self, name=None):
+        """Retourne le corpus, ouvert au besoin."""
+        name = self.resolve(name)
+        now = time.monotonic()
+        with self._lock:
+            self._close_idle(now)
+            corpus = self._touch(name, now)
+            if corpus is not None:
+                return corpus
+            opening = self._opening.setdefault(name, threading.Lock())
+
+        # L'ouverture se fait hors du verrou global : les autres corpus restent servis
+        with opening:
+            with self._lock:
+                corpus = self._touch(name, now)
+            if corpus is not None:
+                return corpus
+            corpus = self.opener(name, self.corpora[name])
+            with self._lock:
+                self._open[name] = corpus
+                self.opens += 1
+                self._evict()
+        return corpus
+
+    def close_idle(self):
+        """Ferme les corpus inutilisés depuis plus de `idle_timeout` secondes."""
+        with self._lock:
+            self._close_idle(time.monotonic())
+
+    def close(self, name):
+        with self._lock:
+            return self._open.pop(name, None) is not None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "open": list(self._open),
+                "bytes": sum(corpus.size for corpus in self._open.values()),
+                "opens": self.opens,
+                "evictions": self.evictions
+            }
+
+    def _touch(self, name, now):
+        corpus = self._open.get(name)
+        if corpus is not None:
+            corpus.last_used = now
+            self._open.move_to_end(name)
+        return corpus
+
+    def _close_idle(self, now):
+        if self.idle_timeout is None:
+            return
+        # Le pool est ordonné par dernière utilisation : on s'arrête au premier actif
+        while self._open:
+            name, corpus = next(iter(self._open.items()))
+            if now - corpus.last_used <= self.idle_timeout:
+                break
+            self._open.popitem(last=False)
+            logger.info(f"Closing idle corpus '{name}'")
+
+    def _evict(self):
+        # Le corpus qui vient d'être ouvert est le plus récent : il n'est jamais évincé
+        while len(self._open) > 1 and (
+            len(self._open) > self.max_open
+            or (self.max_bytes is not None
+                and sum(corpus.size for corpus in self._open.values()) > self.max_bytes)
+        ):
+            name, _ = self._open.popitem(last=False)
+            self.evictions += 1
+            logger.info(f"Evicting corpus '{name}'")
+
+
+def registry_from_config(opener, corpora=None):
+    """Registre des corpus de CORPUS_CONFIG (ou de `corpora`), avec les limites du pool."""
+    return CorpusRegistry(
+        corpora if corpora is not None else CORPUS_CONFIG["corpora"],
+        CORPUS_CONFIG["default"],
+        opener,
+        max_open=CORPUS_CONFIG["max_open"],
+        max_bytes=CORPUS_CONFIG["max_memory_mb"] * 2**20,
+        idle_timeout=CORPUS_CONFIG["idle_timeout"]
+    )
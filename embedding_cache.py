@@ -0,0 +1,85 @@
+import hashlib
+import sqlite3
+import threading
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings des questions mis en cache dans SQLite.
+
+    Le fichier est partagé par les workers du serveur : une question déjà posée à
+    n'importe lequel d'entre eux ne repasse pas par l'API d'embedding (ni par son
+    quota). Seul `embed_query` est mis en cache ; `embed_documents` (indexation)
+    est transmis tel quel. La clé comprend le nom du modèle : changer de modèle
+    n'utilise jamais d'anciens vecteurs. Au-delà de `max_entries` lignes, les plus
+    anciennes sont supprimées.
+    """
+
+    # Nombre d'insertions entre deux purges de la table
+    _TRIM_EVERY = 100
+
+    def __init__(self, embedding, model_name, db_path, max_entries=100_000):
+        self.embedding = embedding
+        self.model_name = model_name
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._inserts = 0
+        self._lock = threading.Lock()
+        self._connect()
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)"
+        )
+        self._db.commit()
+
+    def _connect(self):
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+
+    def reopen(self):
+        """Nouvelle connexion, à appeler dans un processus créé par fork."""
+        with self._lock:
+            self._connect()
+
+    def _key(self, text):
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def embed_query(self, text):
+        key = self._key(text)
+        with self._lock:
+            row = self._db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self.hits += 1
+                return np.frombuffer(row[0], dtype=np.float32).tolist()
+            self.misses += 1
+
+        # L'appel au modèle se fait hors du verrou
+        vector = self.embedding.embed_query(text)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?)",
+                (key, np.asarray(vector, dtype=np.float32).tobytes())
+            )
+            self._inserts += 1
+            if self._inserts % self._TRIM_EVERY == 0:
+                self._db.execute(
+                    "DELETE FROM embeddings WHERE rowid <= (SELECT MAX(rowid) FROM embeddings) - ?",
+                    (self.max_entries,)
+                )
+            self._db.commit()
+        return vector
+
+    def embed_documents(self, texts):
+        return self.embedding.embed_documents(texts)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0
+        }
@@ -0,0 +1,43 @@
+"""
+Configuration gunicorn du déploiement multi-processus.
+
+Usage :
+    gunicorn -c gunicorn_conf.py api:app
+    WEB_CONCURRENCY=4 gunicorn -c gunicorn_conf.py api:app
+
+Le maître charge l'application une seule fois (`preload_app`), puis crée les
+workers par fork : le code Python et les bibliothèques importées sont partagés
+entre eux (copie à l'écriture). Les ressources lourdes restent construites dans
+chaque worker, au préchauffage :
+  - l'index vectoriel (backend mmap) est projeté en mémoire par chaque worker,
+    mais les pages des fichiers sont celles du cache du système : une seule copie
+    en mémoire quel que soit le nombre de workers ;
+  - le cache des réponses, le cache des embeddings, la mémoire de session et les
+    conversations sont dans des fichiers SQLite communs (mode WAL).
+Les débits vers Gemini sont répartis entre les workers (voir config.server_workers).
+"""
+import os
+
+from config import SERVER_CONFIG
+
+workers = SERVER_CONFIG["workers"]
+
+bind = f"{SERVER_CONFIG['host']}:{SERVER_CONFIG['port']}"
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = SERVER_CONFIG["preload"]
+timeout = SERVER_CONFIG["timeout"]
+graceful_timeout = SERVER_CONFIG["graceful_timeout"]
+
+
+def on_starting(server):
+    # Nombre effectif de workers (`-w` sur la ligne de commande l'emporte sur ce
+    # fichier), hérité par les workers : les quotas y sont calculés au premier appel
+    os.environ["RAG_SERVER_WORKERS"] = str(server.cfg.workers)
+
+
+def post_fork(server, worker):
+    # Les connexions SQLite ouvertes par le maître au chargement de l'application
+    # ne doivent pas être partagées avec les workers
+    if preload_app:
+        import chatbot
+        chatbot.reopen_stores()
@@ -0,0 +1,46 @@
+import json
+import os
+import time
+import uuid
+
+VERSION_FILE = "corpus_version.json"
+
+
+def read_version(persist_directory):
+    """
+    Retourne la version courante du corpus indexé dans `persist_directory`.
+
+    La version est écrite par embed.py à chaque reconstruction de l'index. À défaut,
+    on utilise une empreinte (date de modification et taille) de l'index mmap ou de
+    la base Chroma, qui change elle aussi à chaque écriture dans l'index.
+
+    Args:
+        persist_directory (str): Répertoire du vector store.
+
+    Returns:
+        str: Identifiant opaque de la version du corpus.
+    """
+    version_path = os.path.join(persist_directory, VERSION_FILE)
+    try:
+        with open(version_path, "r", encoding="utf-8") as f:
+            return json.load(f)["version"]
+    except (FileNotFoundError, KeyError, ValueError):
+        pass
+
+    # Header de l'index mmap, puis base Chroma
+    for path in (os.path.join("mmap_index", "header.json"), "chroma.sqlite3"):
+        try:
+            stat = os.stat(os.path.join(persist_directory, path))
+            return f"{stat.st_mtime_ns}-{stat.st_size}"
+        except FileNotFoundError:
+            pass
+    return "empty"
+
+
+def bump_version(persist_directory):
+    """Enregistre une nouvelle version du corpus (à appeler après chaque mise à jour de l'index)."""
+    version = uuid.uuid4().hex
+    os.makedirs(persist_directory, exist_ok=True)
+    with open(os.path.join(persist_directory, VERSION_FILE), "w", encoding="utf-8") as f:
+        json.dump({"version": version, "updated_at": time.time()}, f)
+    return version
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import re
+from datetime import datetime, timezone
+from langchain.schema import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+
+def chunk_id(source, content):
+    """Identifiant stable d'un chunk : dérivé de sa source et d'une empreinte de son contenu."""
+    return hashlib.sha1(f"{source}\x00{content}".encode("utf-8")).hexdigest()
+
+
+def parse_timestamp(value):
+    """
+    Convertit une date ISO 8601 (`modifié`) en horodatage Unix, pour les filtres par
+    période. Une date sans fuseau est lue en UTC ; une valeur illisible donne None.
+    """
+    if not value:
+        return None
+    try:
+        date = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date.timestamp()
+
+
+def iter_records(path):
+    """
+    Parcourt les documents d'un corpus, un par un.
+
+    Deux formats sont acceptés :
+      - `.jsonl` (sortie streaming de Script.py) : une ligne par document, lue à la demande,
+        sans jamais charger tout le corpus en mémoire ;
+      - `.json` (Livrable_01.json, Data.json) : un objet fichier -> document, chargé en entier.
+
+    Yields:
+        tuple: (nom du fichier, dictionnaire du document).
+    """
+    if path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield record["fichier"], record
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        yield from data.items()
+
+
+def record_fields(nom_fichier, contenu):
+    """
+    Extrait les paragraphes et les métadonnées d'un document du corpus.
+
+    Gère le format du livrable (`paragraphes`, `titre`, `modifié`) comme celui produit
+    par Script.py (`content.paragraphs`, `metadata.title`, `metadata.modified`).
+
+    La date de modification est aussi indexée sous forme numérique (`modifié_ts`),
+    pour les filtres par période ; la clé est omise si la date est illisible.
+
+    Returns:
+        tuple: (liste des paragraphes, métadonnées des chunks).
+    """
+    metadata = contenu.get("metadata", {})
+    paragraphs = contenu.get("paragraphes")
+    if paragraphs is None:
+        paragraphs = contenu.get("content", {}).get("paragraphs", [])
+
+    fields = {
+        "source": nom_fichier,
+        "titre": contenu.get("titre", metadata.get("title", "")),
+        "modifié": contenu.get("modifié", metadata.get("modified", "")),
+        "indice_rag": contenu.get("indice_rag", "")
+    }
+    timestamp = parse_timestamp(fields["modifié"])
+    if timestamp is not None:
+        fields["modifié_ts"] = timestamp
+    return paragraphs, fields
+
+
+def record_to_document(nom_fichier, contenu):
+    """Convertit un document du corpus en `Document` LangChain."""
+    paragraphs, metadata = record_fields(nom_fichier, contenu)
+    return Document(page_content="\n".join(paragraphs), metadata=metadata)
+
+
+def iter_documents(path):
+    """Produit paresseusement les `Document` LangChain d'un corpus JSON ou JSONL."""
+    for nom_fichier, contenu in iter_records(path):
+        yield record_to_document(nom_fichier, contenu)
+
+
+# --- Stratégies de découpage ---
+# Chaque stratégie reçoit les paragraphes d'un document et ses métadonnées,
+# et renvoie la liste des chunks (`Document`) à indexer.
+
+def character_chunker(paragraphs, metadata, chunk_size=600, chunk_overlap=150):
+    """Découpage historique : fenêtre de caractères sur le texte complet, sans tenir compte des paragraphes."""
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return text_splitter.split_documents([Document(page_content="\n".join(paragraphs), metadata=metadata)])
+
+
+def paragraph_chunker(paragraphs, metadata, chunk_size=600, chunk_overlap=150):
+    """
+    Regroupe des paragraphes entiers jusqu'à `chunk_size` caractères.
+
+    Un chunk ne coupe jamais un paragraphe, sauf si celui-ci dépasse à lui seul
+    `chunk_size` (il est alors découpé par le splitter de caractères). Le ou les
+    derniers paragraphes d'un chunk sont répétés en tête du suivant tant qu'ils
+    tiennent dans `chunk_overlap` caractères.
+    """
+    paragraphs = [p.strip() for p in paragraphs if p.strip()]
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunks = []
+    current = []
+
+    def flush():
+        if current:
+            chunks.append(Document(page_content="\n".join(current), metadata=dict(metadata)))
+
+    for paragraph in paragraphs:
+        if len(paragraph) > chunk_size:
+            flush()
+            current = []
+            chunks.extend(text_splitter.split_documents([Document(page_content=paragraph, metadata=metadata)]))
+            continue
+
+        if current and len("\n".join(current + [paragraph])) > chunk_size:
+            flush()
+            # Recouvrement : paragraphes de fin qui tiennent dans `chunk_overlap`
+            overlap = []
+            for previous in reversed(current):
+                if len("\n".join([previous] + overlap)) > chunk_overlap:
+                    break
+                overlap.insert(0, previous)
+            while overlap and len("\n".join(overlap + [paragraph])) > chunk_size:
+                overlap.pop(0)
+            current = overlap
+        current.append(paragraph)
+    flush()
+    return chunks
+
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+
+
+def sentence_window_chunker(paragraphs, metadata, window=4, stride=2):
+    """
+    Découpe en phrases puis forme des fenêtres glissantes de `window` phrases,
+    avancées de `stride` phrases (les fenêtres se recouvrent de `window - stride` phrases).
+    """
+    sentences = []
+    for paragraph in paragraphs:
+        sentences.extend(s.strip() for s in _SENTENCE_END.split(paragraph) if s.strip())
+
+    chunks = []
+    for start in range(0, max(len(sentences) - window + stride, 1), stride):
+        window_sentences = sentences[start:start + window]
+        if window_sentences:
+            chunks.append(Document(page_content=" ".join(window_sentences), metadata=dict(metadata)))
+    return chunks
+
+
+CHUNKERS = {
+    "character": character_chunker,
+    "paragraph": paragraph_chunker,
+    "sentence_window": sentence_window_chunker,
+}
+
+
+def iter_chunks(path, strategy="character", **params):
+    """
+    Lit un corpus document par document et produit ses chunks selon la stratégie choisie.
+
+    Args:
+        path (str): Corpus JSON ou JSONL.
+        strategy (str): Nom d'une stratégie de `CHUNKERS`.
+        **params: Paramètres de la stratégie (`chunk_size`, `chunk_overlap`, `window`, `stride`).
+    """
+    if strategy not in CHUNKERS:
+        raise ValueError(f"Stratégie de découpage inconnue : '{strategy}' (disponibles : {', '.join(CHUNKERS)})")
+    chunker = CHUNKERS[strategy]
+    for nom_fichier, contenu in iter_records(path):
+        paragraphs, metadata = record_fields(nom_fichier, contenu)
+        yield from chunker(paragraphs, metadata, **params)
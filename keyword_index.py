@@ -0,0 +1,276 @@
+import heapq
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter
+
+from langchain.schema import Document
+
+INDEX_FILE = "keyword_index.sqlite3"
+
+# Mots vides français (après suppression des accents)
+STOPWORDS = set("""
+a au aux avec ce ces cet cette dans de des du elle elles en entre est et etaient etait
+ete etre eux il ils je la le les leur leurs lui ma mais me meme mes moi mon ne nos notre
+nous on ou par pas pour qu que qui sa se ses son sont sur ta te tes toi ton tu un une vos
+votre vous y c d j l m n s t plus ont a sont comme aussi quel quelle quels quelles
+""".split())
+
+_ELISION = re.compile(r"\b[cdjlmnst]'|\bqu'|\bjusqu'|\blorsqu'|\bpuisqu'")
+
+
+def fold_accents(text):
+    """Met en minuscules et supprime les accents ("Égypte" -> "egypte")."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    """
+    Découpe un texte français en termes d'index.
+
+    Minuscules, suppression des accents et des élisions (l', d', qu'...), retrait des
+    mots vides et racinisation légère (pluriels en -s/-x), pour que « Égypte »,
+    « l'égypte » et « EGYPTE » tombent sur le même terme.
+    """
+    text = fold_accents(text).replace("’", "'")
+    text = _ELISION.sub(" ", text)
+    tokens = []
+    for token in re.findall(r"[a-z0-9]+", text):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token[-1] in "sx" and not token.isdigit():
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class KeywordIndex:
+    """
+    Index inversé BM25 persistant (SQLite), construit à côté de la collection Chroma.
+
+    La recherche d'un terme passe par l'index B-tree de la table des postings : son
+    coût dépend du nombre de chunks contenant le terme, pas de la taille du corpus.
+    """
+
+    def __init__(self, persist_directory, k1=1.5, b=0.75):
+        self.path = os.path.join(persist_directory, INDEX_FILE)
+        self.k1 = k1
+        self.b = b
+        os.makedirs(persist_directory, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._stats = None
+        self._stats_version = None
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                id TEXT PRIMARY KEY, source TEXT, text TEXT, metadata TEXT, length INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT, chunk_id TEXT, tf INTEGER, PRIMARY KEY (term, chunk_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_chunk ON postings (chunk_id);
+        """)
+        self._db.commit()
+
+    @staticmethod
+    def exists(persist_directory):
+        return os.path.exists(os.path.join(persist_directory, INDEX_FILE))
+
+    def ids(self):
+        with self._lock:
+            return {row[0] for row in self._db.execute("SELECT id FROM chunks")}
+
+    def count(self):
+        return self._corpus_stats()[0]
+
+    def add(self, ids, documents):
+        """Indexe des chunks (`Document`) sous les identifiants donnés."""
+        with self._lock:
+            for chunk_id, doc in zip(ids, documents):
+                terms = Counter(tokenize(doc.page_content))
+                self._db.execute(
+                    "INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, ?)",
+                    (chunk_id, doc.metadata.get("source", ""), doc.page_content,
+                     json.dumps(doc.metadata, ensure_ascii=False), sum(terms.values()))
+                )
+                self._db.execute("DELETE FROM postings WHERE chunk_id = ?", (chunk_id,))
+                self._db.executemany(
+                    "INSERT INTO postings VALUES (?, ?, ?)",
+                    [(term, chunk_id, tf) for term, tf in terms.items()]
+                )
+            self._db.commit()
+            self._stats = None
+
+    def delete(self, ids):
+        with self._lock:
+            for chunk_id in ids:
+                self._db.execute("DELETE FROM chunks WHERE id = ?", (chunk_id,))
+                self._db.execute("DELETE FROM postings WHERE chunk_id = ?", (chunk_id,))
+            self._db.commit()
+            self._stats = None
+
+    def metadata_keys(self):
+        with self._lock:
+            row = self._db.execute("SELECT metadata FROM chunks LIMIT 1").fetchone()
+        return set(json.loads(row[0])) if row else set()
+
+    def metadatas(self, ids):
+        """Métadonnées enregistrées des chunks demandés (identifiant -> dict)."""
+        return {chunk_id: doc.metadata for chunk_id, doc in self.get(list(ids)).items()}
+
+    def update_metadata(self, ids, documents):
+        """Remplace les métadonnées de chunks existants (les postings ne changent pas)."""
+        with self._lock:
+            self._db.executemany(
+                "UPDATE chunks SET source = ?, metadata = ? WHERE id = ?",
+                [(doc.metadata.get("source", ""), json.dumps(doc.metadata, ensure_ascii=False), chunk_id)
+                 for chunk_id, doc in zip(ids, documents)]
+            )
+            self._db.commit()
+
+    @staticmethod
+    def _where_clause(where):
+        """Filtre `where` (voir vector_index) traduit en conditions SQL sur la table des chunks."""
+        clauses, params = [], []
+        for name, condition in (where or {}).items():
+            if name == "source":
+                column, path = "c.source", []
+            else:
+                column, path = "json_extract(c.metadata, ?)", ['$."' + name.replace('"', '""') + '"']
+            if "in" in condition:
+                values = list(condition["in"])
+                clauses.append(f"{column} IN ({','.join('?' * len(values))})" if values else "0")
+                params += (path if values else []) + values
+            for operator, sql in (("gte", ">="), ("lte", "<=")):
+                if condition.get(operator) is not None:
+                    clauses.append(f"{column} {sql} ?")
+                    params += path + [condition[operator]]
+        return "".join(f" AND {clause}" for clause in clauses), params
+
+    def search(self, query, k=5, where=None):
+        """
+        Retourne les `k` chunks les mieux classés par BM25 (parmi ceux qui satisfont
+        le filtre `where`, appliqué dans la requête SQL des postings).
+
+        Returns:
+            list: tuples (Document, score BM25), du plus pertinent au moins pertinent.
+        """
+        n_docs, avg_length = self._corpus_stats()
+        if not n_docs:
+            return []
+
+        filter_sql, filter_params = self._where_clause(where)
+        scores = {}
+        with self._lock:
+            for term in set(tokenize(query)):
+                postings = self._db.execute(
+                    "SELECT p.chunk_id, p.tf, c.length FROM postings p"
+                    " JOIN chunks c ON c.id = p.chunk_id WHERE p.term = ?" + filter_sql,
+                    (term, *filter_params)
+                ).fetchall()
+                if not postings:
+                    continue
+                document_frequency = len(postings)
+                if filter_sql:
+                    # L'IDF reste celui du corpus entier : le filtre ne change pas les scores
+                    document_frequency = self._db.execute(
+                        "SELECT COUNT(*) FROM postings WHERE term = ?", (term,)
+                    ).fetchone()[0]
+                idf = math.log(1 + (n_docs - document_frequency + 0.5) / (document_frequency + 0.5))
+                for chunk_id, tf, length in postings:
+                    norm = tf + self.k1 * (1 - self.b + self.b * length / avg_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        documents = self.get([chunk_id for chunk_id, _ in best])
+        return [(documents[chunk_id], score) for chunk_id, score in best]
+
+    def lookup(self, keyword):
+        """
+        Retourne les chunks contenant tous les termes de `keyword` (puis l'expression exacte,
+        sans tenir compte des accents ni de la casse).
+
+        Seuls les chunks candidats issus des postings sont relus, jamais toute la collection.
+        """
+        terms = set(tokenize(keyword))
+        with self._lock:
+            if terms:
+                candidates = None
+                for term in terms:
+                    ids = {row[0] for row in self._db.execute(
+                        "SELECT chunk_id FROM postings WHERE term = ?", (term,))}
+                    candidates = ids if candidates is None else candidates & ids
+                    if not candidates:
+                        return []
+                candidate_ids = sorted(candidates)
+            else:
+                candidate_ids = [row[0] for row in self._db.execute("SELECT id FROM chunks ORDER BY id")]
+
+        folded = fold_accents(keyword)
+        documents = self.get(candidate_ids)
+        return [
+            (chunk_id, documents[chunk_id]) for chunk_id in candidate_ids
+            if folded in fold_accents(documents[chunk_id].page_content)
+        ]
+
+    def get(self, ids):
+        """Retourne les chunks demandés sous forme de dictionnaire identifiant -> Document."""
+        documents = {}
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT id, text, metadata FROM chunks WHERE id IN ({','.join('?' * len(batch))})",
+                    batch
+                )
+                for chunk_id, text, metadata in rows:
+                    documents[chunk_id] = Document(page_content=text, metadata=json.loads(metadata))
+        return documents
+
+    def _corpus_stats(self):
+        """
+        Nombre de chunks et longueur moyenne, pour BM25. `PRAGMA data_version` change
+        quand une autre connexion (embed.py, un autre worker) a modifié la base : les
+        statistiques sont alors recalculées ; les écritures de ce processus les
+        invalident directement.
+        """
+        with self._lock:
+            data_version = self._db.execute("PRAGMA data_version").fetchone()[0]
+            if self._stats is None or self._stats_version != data_version:
+                n_docs, avg_length = self._db.execute("SELECT COUNT(*), AVG(length) FROM chunks").fetchone()
+                self._stats = (n_docs, avg_length or 1.0)
+                self._stats_version = data_version
+            return self._stats
+
+
+def reciprocal_rank_fusion(result_lists, k, rrf_k=60):
+    """
+    Fusionne plusieurs classements de chunks (reciprocal rank fusion).
+
+    Chaque chunk reçoit la somme des 1 / (rrf_k + rang) sur les listes où il apparaît ;
+    les chunks sont identifiés par leur source et leur contenu.
+
+    Args:
+        result_lists (list): Listes de tuples (Document, score), chacune triée par
+            pertinence décroissante. Le score peut être None.
+        k (int): Nombre de chunks à retourner.
+
+    Returns:
+        list: Les `k` meilleurs tuples (Document, score) après fusion ; le score est
+        le premier score non nul fourni pour ce chunk, dans l'ordre des listes.
+    """
+    fused = {}
+    entries = {}
+    for results in result_lists:
+        for rank, (doc, score) in enumerate(results):
+            key = (doc.metadata.get("source", ""), doc.page_content)
+            if key not in entries or entries[key][1] is None:
+                entries[key] = (entries.get(key, (doc,))[0], score)
+            fused[key] = fused.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+    best = sorted(fused, key=fused.get, reverse=True)[:k]
+    return [entries[key] for key in best]
@@ -0,0 +1,128 @@
+import hashlib
+import re
+import time
+import unicodedata
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+
+def _tokens(text):
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.findall(r"[a-z0-9]+", text)
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Embeddings locaux et déterministes, sans appel réseau.
+
+    Chaque mot (et chaque paire de mots consécutifs) est projeté par hachage sur
+    une dimension du vecteur, avec un signe pseudo-aléatoire ; le vecteur est ensuite
+    normalisé. Les textes qui partagent du vocabulaire restent proches, ce qui suffit
+    pour comparer des stratégies de découpage ou mesurer des latences hors ligne.
+    Ne remplace pas un vrai modèle pour la qualité des réponses. `latency` simule
+    le temps d'un appel à l'API d'embedding.
+    """
+
+    def __init__(self, dimension=768, latency=0.0):
+        self.dimension = dimension
+        self.latency = latency
+
+    def _embed(self, text):
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        tokens = _tokens(text)
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for feature in features:
+            digest = hashlib.md5(feature.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimension
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        time.sleep(self.latency)
+        return self._embed(text)
+
+
+class StubChatModel:
+    """
+    Modèle de chat simulé, déterministe et sans appel réseau.
+
+    Expose `invoke` et `stream` comme les modèles LangChain. Les prompts de
+    reformulation (« Standalone question: ») reçoivent la réécriture fournie dans
+    `rewrites` (ou la question telle quelle) ; les autres reçoivent une réponse
+    construite à partir du début du contexte. `latency` simule le temps d'appel,
+    `token_latency` le délai entre deux tokens en streaming.
+    """
+
+    def __init__(self, latency=0.0, token_latency=0.0, rewrites=None):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.rewrites = rewrites or {}
+        self.calls = 0
+
+    def _respond(self, prompt):
+        self.calls += 1
+        follow_up = re.search(r"Follow Up Input: (.*)\nStandalone question:", prompt, re.S)
+        if follow_up:
+            question = follow_up.group(1).strip()
+            return self.rewrites.get(question, question)
+        context = re.search(r"Contexte : (.*?)\n\nQuestion :", prompt, re.S)
+        excerpt = " ".join((context.group(1) if context else "").split()[:40])
+        return f"D'après les documents : {excerpt}"
+
+    def invoke(self, prompt):
+        time.sleep(self.latency)
+        return AIMessage(content=self._respond(str(prompt)))
+
+    def stream(self, prompt):
+        time.sleep(self.latency)
+        for word in self._respond(str(prompt)).split(" "):
+            time.sleep(self.token_latency)
+            yield AIMessageChunk(content=word + " ")
+
+
+class OfflineResources:
+    """
+    Remplace `chatbot.Resources` pour les bancs d'essai : mêmes attributs, modèles
+    locaux (aucun appel réseau), index construit par `build_offline_index`.
+    """
+
+    def __init__(self, persist_directory, llm_latency=0.0, rewrite_latency=None, embed_latency=0.0,
+                 token_latency=0.0, rewrites=None, corpora=None):
+        from config import CORPUS_CONFIG
+        from corpus_registry import open_corpus, registry_from_config
+
+        self.embedding = HashingEmbeddings(latency=embed_latency)
+        self.model = StubChatModel(latency=llm_latency, token_latency=token_latency, rewrites=rewrites)
+        self.rewrite_model = StubChatModel(
+            latency=llm_latency if rewrite_latency is None else rewrite_latency,
+            rewrites=rewrites
+        )
+        # Corpus par défaut dans `persist_directory` ; `corpora` en ajoute d'autres (nom -> répertoire)
+        directories = {CORPUS_CONFIG["default"]: persist_directory, **(corpora or {})}
+        self.corpora = registry_from_config(
+            lambda name, settings: open_corpus(name, settings, self.embedding),
+            {name: {"path": path, "backend": "mmap"} for name, path in directories.items()}
+        )
+
+
+def build_offline_index(corpus, persist_directory):
+    """Construit l'index (mmap + BM25) du corpus avec les embeddings locaux."""
+    from embed import build_index
+    return build_index(corpus, persist_directory, None, backend="mmap", embedding=HashingEmbeddings())
+
+
+def install_offline_resources(resources):
+    """Fait utiliser `resources` par chatbot.py, sans cache de réponses."""
+    import chatbot
+    chatbot._resources = resources
+    chatbot.answer_cache = None
+    chatbot._startup.update(status="ready", error=None)
+    return chatbot
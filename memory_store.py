@@ -0,0 +1,251 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class SessionMemoryStore:
+    """
+    Mémoire de conversation indexée par identifiant de session.
+
+    Chaque session ne conserve qu'une fenêtre glissante de ses derniers échanges
+    (`max_turns` tours et au plus `max_chars` caractères), de sorte que la question
+    reformulée et le prompt gardent une taille constante quelle que soit la durée
+    de la conversation. Le magasin lui-même est borné : les sessions inactives depuis
+    plus de `ttl` secondes sont supprimées, et au-delà de `max_sessions` sessions ou
+    de `max_total_chars` caractères stockés, les moins récemment utilisées sont évincées.
+    """
+
+    def __init__(self, max_turns=5, max_chars=4000, max_sessions=1000,
+                 max_total_chars=2_000_000, ttl=3600):
+        self.max_turns = max_turns
+        self.max_chars = max_chars
+        self.max_sessions = max_sessions
+        self.max_total_chars = max_total_chars
+        self.ttl = ttl
+        self._sessions = OrderedDict()  # session_id -> {"turns", "chars", "last_access"}
+        self._total_chars = 0
+        self._lock = threading.Lock()
+
+    def history(self, session_id):
+        """
+        Retourne l'historique d'une session sous forme de liste de tuples (question, réponse).
+
+        Args:
+            session_id (str): Identifiant de la session.
+
+        Returns:
+            list: Les derniers échanges de la session, du plus ancien au plus récent.
+        """
+        with self._lock:
+            self._expire(time.monotonic())
+            session = self._sessions.get(session_id)
+            if session is None:
+                return []
+            session["last_access"] = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            return list(session["turns"])
+
+    def append(self, session_id, question, answer):
+        """Ajoute un échange à la session en respectant la fenêtre et les limites globales."""
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = {"turns": deque(), "chars": 0, "last_access": now}
+                self._sessions[session_id] = session
+
+            turn = (question, answer)
+            size = len(question) + len(answer)
+            session["turns"].append(turn)
+            session["chars"] += size
+            self._total_chars += size
+
+            # Fenêtre glissante : nombre de tours puis volume de texte
+            while session["turns"] and (
+                len(session["turns"]) > self.max_turns or session["chars"] > self.max_chars
+            ):
+                old_question, old_answer = session["turns"].popleft()
+                removed = len(old_question) + len(old_answer)
+                session["chars"] -= removed
+                self._total_chars -= removed
+
+            session["last_access"] = now
+            self._sessions.move_to_end(session_id)
+            self._expire(now)
+            self._evict()
+
+    def clear(self, session_id):
+        """Oublie une session."""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self._total_chars -= session["chars"]
+
+    def stats(self):
+        with self._lock:
+            return {"sessions": len(self._sessions), "chars": self._total_chars}
+
+    def _expire(self, now):
+        # Les sessions sont ordonnées par dernier accès : on s'arrête à la première valide
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session["last_access"] <= self.ttl:
+                break
+            self._sessions.popitem(last=False)
+            self._total_chars -= session["chars"]
+
+    def _evict(self):
+        while self._sessions and (
+            len(self._sessions) > self.max_sessions or self._total_chars > self.max_total_chars
+        ):
+            _, session = self._sessions.popitem(last=False)
+            self._total_chars -= session["chars"]
+
+
+class SqliteSessionStore:
+    """
+    Mémoire de session partagée par les processus d'un même serveur (SQLite).
+
+    Même interface et mêmes limites que `SessionMemoryStore`, mais l'état vit dans
+    un fichier : une session ouverte par un worker est lue par tous les autres, et
+    survit au redémarrage d'un worker. Les limites globales (`max_sessions`,
+    `max_total_chars`, `ttl`) s'appliquent à l'ensemble des workers.
+    """
+
+    def __init__(self, db_path, max_turns=5, max_chars=4000, max_sessions=1000,
+                 max_total_chars=2_000_000, ttl=3600):
+        self.db_path = db_path
+        self.max_turns = max_turns
+        self.max_chars = max_chars
+        self.max_sessions = max_sessions
+        self.max_total_chars = max_total_chars
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._connect()
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY, last_access REAL, chars INTEGER, next_seq INTEGER);"
+            "CREATE INDEX IF NOT EXISTS sessions_last_access ON sessions (last_access);"
+            "CREATE TABLE IF NOT EXISTS turns ("
+            " session_id TEXT, seq INTEGER, question TEXT, answer TEXT,"
+            " PRIMARY KEY (session_id, seq)) WITHOUT ROWID;"
+        )
+        self._db.commit()
+
+    def _connect(self):
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+
+    def reopen(self):
+        """
+        Nouvelle connexion, à appeler dans un processus créé par fork : une connexion
+        SQLite ouverte avant le fork ne doit pas être utilisée par le processus fils.
+        """
+        with self._lock:
+            self._connect()
+
+    def history(self, session_id):
+        """
+        Retourne l'historique d'une session sous forme de liste de tuples (question, réponse).
+
+        Args:
+            session_id (str): Identifiant de la session.
+
+        Returns:
+            list: Les derniers échanges de la session, du plus ancien au plus récent.
+        """
+        now = time.time()
+        with self._lock, self._db:
+            touched = self._db.execute(
+                "UPDATE sessions SET last_access = ? WHERE session_id = ? AND last_access >= ?",
+                (now, session_id, now - self.ttl)
+            ).rowcount
+            if not touched:
+                return []
+            rows = self._db.execute(
+                "SELECT question, answer FROM turns WHERE session_id = ? ORDER BY seq",
+                (session_id,)
+            ).fetchall()
+        return [tuple(row) for row in rows]
+
+    def append(self, session_id, question, answer):
+        """Ajoute un échange à la session en respectant la fenêtre et les limites globales."""
+        now = time.time()
+        with self._lock, self._db:
+            # Verrou d'écriture pris avant de lire next_seq : deux workers qui complètent
+            # la même session ne peuvent pas obtenir le même numéro d'ordre
+            self._db.execute("BEGIN IMMEDIATE")
+            # Une session expirée repart de zéro, comme dans la mémoire d'un processus
+            self._expire(now)
+            row = self._db.execute(
+                "SELECT next_seq FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            seq = row[0] if row else 0
+            self._db.execute(
+                "INSERT INTO turns VALUES (?, ?, ?, ?)", (session_id, seq, question, answer)
+            )
+
+            # Fenêtre glissante : nombre de tours puis volume de texte
+            rows = self._db.execute(
+                "SELECT seq, LENGTH(question) + LENGTH(answer) FROM turns"
+                " WHERE session_id = ? ORDER BY seq DESC",
+                (session_id,)
+            ).fetchall()
+            kept, chars = 0, 0
+            for _, size in rows:
+                if kept == self.max_turns or chars + size > self.max_chars:
+                    break
+                kept += 1
+                chars += size
+            if kept < len(rows):
+                self._db.execute(
+                    "DELETE FROM turns WHERE session_id = ? AND seq <= ?",
+                    (session_id, rows[kept][0])
+                )
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?)",
+                (session_id, now, chars, seq + 1)
+            )
+            self._evict()
+
+    def clear(self, session_id):
+        """Oublie une session."""
+        with self._lock, self._db:
+            self._delete([session_id])
+
+    def stats(self):
+        with self._lock:
+            sessions, chars = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(chars), 0) FROM sessions"
+            ).fetchone()
+        return {"sessions": sessions, "chars": chars}
+
+    def _delete(self, session_ids):
+        for session_id in session_ids:
+            self._db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._db.execute("DELETE FROM turns WHERE session_id = ?", (session_id,))
+
+    def _expire(self, now):
+        expired = self._db.execute(
+            "SELECT session_id FROM sessions WHERE last_access < ?", (now - self.ttl,)
+        ).fetchall()
+        self._delete([session_id for session_id, in expired])
+
+    def _evict(self):
+        sessions, chars = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(chars), 0) FROM sessions"
+        ).fetchone()
+        if sessions <= self.max_sessions and chars <= self.max_total_chars:
+            return
+        # Les moins récemment utilisées d'abord, jusqu'à revenir sous les deux plafonds
+        evicted = []
+        for session_id, size in self._db.execute(
+            "SELECT session_id, chars FROM sessions ORDER BY last_access"
+        ).fetchall():
+            if sessions <= self.max_sessions and chars <= self.max_total_chars:
+                break
+            evicted.append(session_id)
+            sessions -= 1
+            chars -= size
+        self._delete(evicted)
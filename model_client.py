@@ -0,0 +1,279 @@
+"""
+Couche d'appel partagée pour les modèles Gemini (chat et embeddings).
+
+Chaque modèle a son `ModelScheduler`, partagé par tous les objets qui l'utilisent :
+  - limitation de débit par seau à jetons (au-delà de `max_queue_wait`, 429) ;
+  - délai maximal par appel ; un appel qui dépasse le délai continue d'occuper sa
+    place (`max_concurrency`) jusqu'à ce qu'il se termine réellement, si bien que des
+    appels bloqués en amont produisent des 503 plutôt qu'une file sans fin ;
+  - nouvelles tentatives avec attente exponentielle et gigue sur les erreurs
+    transitoires (quota dépassé, service indisponible, délai dépassé) ;
+  - dédoublonnage « single-flight » : des appels identiques simultanés partagent un
+    seul appel en amont.
+
+L'attente du limiteur et les nouvelles tentatives sont exposées dans /api/metrics
+et dans la trace de chaque requête.
+"""
+import math
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from langchain_core.embeddings import Embeddings
+
+from concurrency import RateLimiter, ServerBusy
+from config import UPSTREAM_CONFIG, server_workers
+from tracing import (
+    UPSTREAM_CALLS, UPSTREAM_QUEUE_WAIT, UPSTREAM_RETRIES, increment_attribute, record_stage
+)
+
+# Erreurs de google.api_core reconnues par leur nom (pas d'import du client Gemini ici)
+QUOTA_ERRORS = {"ResourceExhausted", "TooManyRequests"}
+TRANSIENT_ERRORS = {"ServiceUnavailable", "InternalServerError", "DeadlineExceeded", "GatewayTimeout"}
+
+
+class UpstreamTimeout(ServerBusy):
+    """Le modèle n'a pas répondu dans le délai, même après les nouvelles tentatives."""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message, status_code=504, retry_after=retry_after)
+
+
+def classify_error(error):
+    """
+    Retourne le motif de nouvelle tentative d'une erreur : "quota", "transient",
+    "timeout", ou None si l'erreur n'est pas transitoire.
+    """
+    if isinstance(error, (FutureTimeout, TimeoutError)):
+        return "timeout"
+    name = type(error).__name__
+    code = getattr(error, "code", None)
+    if name in QUOTA_ERRORS or code == 429 or "quota" in str(error).lower():
+        return "quota"
+    if name in TRANSIENT_ERRORS or code in (500, 502, 503, 504):
+        return "transient"
+    return None
+
+
+class ModelScheduler:
+    """Ordonnanceur des appels à un modèle : débit, délai, nouvelles tentatives et single-flight."""
+
+    def __init__(self, name, requests_per_minute, burst=10, max_concurrency=16, timeout=60.0,
+                 max_queue_wait=10.0, max_retries=3, backoff_base=0.5, backoff_max=8.0):
+        self.name = name
+        self.limiter = RateLimiter(rate=requests_per_minute / 60, burst=burst)
+        self.timeout = timeout
+        self.max_queue_wait = max_queue_wait
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="upstream")
+        # Places d'appel : libérées quand le thread termine, pas quand l'attente expire
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.calls_in_progress = 0
+        self.abandoned_calls = 0  # Appels hors délai dont le thread tourne encore
+
+    def deadline(self):
+        """Durée maximale d'un appel, nouvelles tentatives comprises (s)."""
+        return ((self.max_retries + 1) * (self.max_queue_wait + self.timeout)
+                + self.max_retries * self.backoff_max)
+
+    def call(self, key, func, *args):
+        """
+        Appelle `func(*args)` sous le contrôle de l'ordonnanceur.
+
+        Args:
+            key: Clé de dédoublonnage (hachable) : un appel de même clé déjà en cours
+                est partagé. None désactive le dédoublonnage (streaming).
+        """
+        if key is None:
+            return self._call_with_retries(func, *args)
+
+        with self._lock:
+            shared = self._in_flight.get(key)
+            if shared is None:
+                shared = self._in_flight[key] = Future()
+                leader = True
+            else:
+                leader = False
+        if not leader:
+            UPSTREAM_CALLS.inc(model=self.name, outcome="coalesced")
+            increment_attribute("upstream_coalesced")
+            try:
+                return shared.result(timeout=self.deadline())
+            except FutureTimeout:
+                raise UpstreamTimeout(f"Le modèle {self.name} n'a pas répondu dans le délai.",
+                                      retry_after=max(1, math.ceil(self.backoff_max))) from None
+
+        try:
+            result = self._call_with_retries(func, *args)
+            shared.set_result(result)
+            return result
+        except BaseException as e:
+            shared.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def _backoff(self, attempt):
+        # Attente exponentielle avec gigue complète
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _call_with_retries(self, func, *args):
+        reason, error = None, None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                UPSTREAM_RETRIES.inc(model=self.name, reason=reason)
+                increment_attribute("upstream_retries")
+                time.sleep(self._backoff(attempt - 1))
+
+            waited = self.limiter.acquire(timeout=self.max_queue_wait)
+            UPSTREAM_QUEUE_WAIT.observe(waited, model=self.name)
+            record_stage("upstream_queue_wait", waited)
+
+            future = self._submit(func, *args)
+            try:
+                result = future.result(timeout=self.timeout)
+                UPSTREAM_CALLS.inc(model=self.name, outcome="ok")
+                return result
+            except Exception as e:
+                reason, error = classify_error(e), e
+                if reason is None:
+                    UPSTREAM_CALLS.inc(model=self.name, outcome="error")
+                    raise
+            if reason == "timeout" and not future.cancel():
+                # Déjà en cours : le thread ne peut pas être interrompu, sa place
+                # reste occupée jusqu'à la fin réelle de l'appel
+                with self._lock:
+                    if not future.done():
+                        future.abandoned = True
+                        self.abandoned_calls += 1
+
+        UPSTREAM_CALLS.inc(model=self.name, outcome=reason)
+        retry_after = max(1, math.ceil(self.backoff_max))
+        if reason == "quota":
+            raise ServerBusy(f"Quota du modèle {self.name} dépassé, réessayez plus tard.",
+                             status_code=429, retry_after=retry_after) from error
+        if reason == "timeout":
+            raise UpstreamTimeout(f"Le modèle {self.name} n'a pas répondu dans le délai.",
+                                  retry_after=retry_after) from error
+        raise error
+
+    def _submit(self, func, *args):
+        """Réserve une place d'appel et lance `func` dans le pool."""
+        if not self._slots.acquire(timeout=self.max_queue_wait):
+            UPSTREAM_CALLS.inc(model=self.name, outcome="saturated")
+            raise ServerBusy(f"Trop d'appels en cours vers le modèle {self.name}, réessayez plus tard.",
+                             status_code=503, retry_after=max(1, math.ceil(self.timeout)))
+        with self._lock:
+            self.calls_in_progress += 1
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future):
+        with self._lock:
+            self.calls_in_progress -= 1
+            if getattr(future, "abandoned", False):
+                self.abandoned_calls -= 1
+        self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls_in_progress": self.calls_in_progress,
+                "abandoned_calls": self.abandoned_calls,
+                "coalescing_keys": len(self._in_flight),
+                "tokens_available": self.limiter.available()
+            }
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(model_name):
+    """
+    Ordonnanceur du modèle, créé au premier appel avec les limites d'UPSTREAM_CONFIG.
+    Le quota est celui du projet Gemini : chaque worker du serveur en a une part égale.
+    """
+    with _schedulers_lock:
+        if model_name not in _schedulers:
+            _schedulers[model_name] = ModelScheduler(
+                model_name,
+                requests_per_minute=UPSTREAM_CONFIG["requests_per_minute"].get(
+                    model_name, UPSTREAM_CONFIG["default_requests_per_minute"]
+                ) / server_workers(),
+                burst=UPSTREAM_CONFIG["burst"],
+                max_concurrency=UPSTREAM_CONFIG["max_concurrency"],
+                timeout=UPSTREAM_CONFIG["timeout"],
+                max_queue_wait=UPSTREAM_CONFIG["max_queue_wait"],
+                max_retries=UPSTREAM_CONFIG["max_retries"],
+                backoff_base=UPSTREAM_CONFIG["backoff_base"],
+                backoff_max=UPSTREAM_CONFIG["backoff_max"]
+            )
+        return _schedulers[model_name]
+
+
+def upstream_stats():
+    """État des ordonnanceurs, par modèle (pour /api/health)."""
+    with _schedulers_lock:
+        schedulers = dict(_schedulers)
+    return {name: scheduler.stats() for name, scheduler in schedulers.items()}
+
+
+class ScheduledChatModel:
+    """Modèle de chat dont les appels passent par l'ordonnanceur de son modèle."""
+
+    def __init__(self, model, model_name):
+        self.model = model
+        self.scheduler = get_scheduler(model_name)
+
+    def invoke(self, prompt):
+        return self.scheduler.call(("invoke", str(prompt)), self.model.invoke, prompt)
+
+    def stream(self, prompt):
+        """
+        Le démarrage du flux (jusqu'au premier fragment) passe par l'ordonnanceur :
+        débit, délai et nouvelles tentatives. Les fragments suivants sont relayés tels
+        quels. Les flux ne sont pas dédoublonnés.
+        """
+        def start():
+            chunks = iter(self.model.stream(prompt))
+            return chunks, next(chunks, None)
+
+        chunks, first = self.scheduler.call(None, start)
+
+        def relay():
+            try:
+                if first is not None:
+                    yield first
+                yield from chunks
+            finally:
+                if hasattr(chunks, "close"):
+                    chunks.close()
+
+        return relay()
+
+
+class ScheduledEmbeddings(Embeddings):
+    """Modèle d'embedding dont les appels passent par l'ordonnanceur de son modèle."""
+
+    def __init__(self, embedding, model_name):
+        self.embedding = embedding
+        self.scheduler = get_scheduler(model_name)
+
+    def embed_query(self, text):
+        return self.scheduler.call(("embed_query", text), self.embedding.embed_query, text)
+
+    def embed_documents(self, texts):
+        return self.scheduler.call(("embed_documents", tuple(texts)), self.embedding.embed_documents, texts)
@@ -0,0 +1,78 @@
+import re
+
+from keyword_index import fold_accents, tokenize
+
+# Pronoms qui renvoient à un élément déjà cité dans la conversation. Les déterminants
+# (« ce », « cette », « son », « leur »...) n'en font pas partie : ils introduisent le
+# plus souvent un nom complet (« ce coureur », « leur classement ») et se trouvent dans
+# la plupart des questions autonomes.
+_ANAPHORS = set("il elle ils elles lui eux cela ca ceci y".split())
+
+# Tournures impersonnelles : le pronom ne renvoie à rien (« il y a », « faut-il »)
+_IMPERSONAL = re.compile(r"\b(il y a|y a-t-il|y a t il|il existe|il faut|il s'agit|s'agit-il|faut-il)\b")
+
+# Débuts de question typiques d'une relance ("Et en 2020 ?", "Mais pourquoi ?")
+_FOLLOW_UP_START = re.compile(r"^(et|mais|alors|donc|aussi|comment ca|ou ca)\b")
+
+# Sujet inversé précédé d'un nom (« Steve Davis a-t-il... ») : le pronom reprend ce nom
+_INVERTED_SUBJECT = re.compile(r"-(t-)?(il|elle|ils|elles)\b")
+
+# Inversion simple après un mot interrogatif (« Pourquoi est-elle... ») : le sujet
+# n'est que le pronom, il renvoie donc à la conversation
+_PRONOUN_SUBJECT = re.compile(
+    r"^(pourquoi|comment|ou|quand|combien|que|qu'|quel|quelle|quels|quelles)\s+\w+-(t-)?(il|elle|ils|elles)\b"
+)
+
+# Renvois explicites : « ce dernier », « celui-ci », « ce pays-là »...
+_EXPLICIT_REFERENCE = re.compile(
+    r"\b((ce|cette|ces) derni(er|ere|ers|eres)|(celui|celle|ceux|celles)-(ci|la)|(ce|cet|cette|ces) \w+-(ci|la))\b"
+)
+
+# Déterminant démonstratif dans une question courte (« Comment expliquer cet écart ? »)
+_DEMONSTRATIVE = set("ce cet cette ces".split())
+
+
+def is_follow_up(question, max_short_words=4, max_demonstrative_words=6):
+    """
+    Devine si une question dépend de l'historique de la conversation.
+
+    Heuristique : question très courte (ellipse, « Et en 2020 ? »), début de relance
+    (« et », « mais », « alors »...), pronom renvoyant à un élément déjà cité (« il »,
+    « elle », « y »...), renvoi explicite (« ce dernier », « celui-ci ») ou
+    démonstratif dans une question courte (« Comment expliquer cet écart ? »).
+    """
+    folded = fold_accents(question).lower().replace("’", "'").strip()
+    if _PRONOUN_SUBJECT.match(folded) or _EXPLICIT_REFERENCE.search(folded):
+        return True
+    folded = _IMPERSONAL.sub("", folded)
+    folded = _INVERTED_SUBJECT.sub("", folded)
+    words = re.findall(r"[a-z0-9]+", folded)
+    if len(tokenize(question)) <= max_short_words - 2 or len(words) <= max_short_words:
+        return True
+    if _FOLLOW_UP_START.match(folded):
+        return True
+    if len(words) <= max_demonstrative_words and any(word in _DEMONSTRATIVE for word in words):
+        return True
+    return any(word in _ANAPHORS for word in words)
+
+
+def needs_rewrite(question, history, policy="heuristic"):
+    """
+    Indique si la question doit être reformulée avant la recherche.
+
+    Args:
+        question (str): La question posée.
+        history (list): Échanges précédents de la session.
+        policy (str): "always" (comportement de ConversationalRetrievalChain),
+            "never" ou "heuristic" (seulement pour les questions de suivi).
+    """
+    if not history or policy == "never":
+        return False
+    if policy == "always":
+        return True
+    return is_follow_up(question)
+
+
+def same_query(first, second):
+    """Deux formulations donnent-elles la même requête (mêmes termes d'index) ?"""
+    return set(tokenize(first)) == set(tokenize(second))
@@ -0,0 +1,22 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config  # noqa: E402
+
+# chatbot.py ouvre ses fichiers SQLite (caches, sessions, conversations) à l'import :
+# pendant les tests, ils sont créés dans un répertoire temporaire
+_state = tempfile.mkdtemp(prefix="rag_tests_")
+config.CACHE_CONFIG.update(
+    db_path=os.path.join(_state, "answer_cache.sqlite3"),
+    embedding_db_path=os.path.join(_state, "embedding_cache.sqlite3")
+)
+config.MEMORY_CONFIG["db_path"] = os.path.join(_state, "sessions.sqlite3")
+config.CONVERSATION_CONFIG["db_path"] = os.path.join(_state, "conversations.sqlite3")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: banc d'essai complet (ingestion, API), à sauter avec -m 'not slow'")
@@ -0,0 +1,57 @@
+from langchain.schema import Document
+
+from answer_cache import AnswerCache
+
+
+def payload(answer):
+    return {"answer": answer, "source_documents": [Document(page_content="extrait", metadata={"source": "a.docx"})]}
+
+
+def test_exact_hit_ignores_case_spaces_and_final_punctuation():
+    cache = AnswerCache()
+    cache.put("Quel est le délai ?", "v1", payload("deux semaines"))
+    answer, level = cache.lookup("  quel est   le DÉLAI", "v1")
+    assert level == "exact"
+    assert answer["answer"] == "deux semaines"
+    assert cache.get("Quel est le budget ?", "v1") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_semantic_hit_above_the_similarity_threshold():
+    cache = AnswerCache(similarity_threshold=0.95)
+    cache.put("Quel est le délai ?", "v1", payload("deux semaines"), vector=[1.0, 0.0])
+    assert cache.lookup("Quel délai ?", "v1", vector=[0.99, 0.05])[1] == "semantic"
+    assert cache.lookup("Quel budget ?", "v1", vector=[0.0, 1.0])[1] == "miss"
+
+
+def test_a_new_corpus_version_invalidates_everything():
+    cache = AnswerCache()
+    cache.put("question", "v1", payload("ancienne"))
+    assert cache.get("question", "v2") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_eviction_and_ttl():
+    cache = AnswerCache(max_entries=2)
+    cache.put("a", "v1", payload("a"))
+    cache.put("b", "v1", payload("b"))
+    cache.get("a", "v1")
+    cache.put("c", "v1", payload("c"))
+    assert cache.get("b", "v1") is None
+    assert cache.get("a", "v1") is not None
+
+    expired = AnswerCache(ttl=-1)
+    expired.put("a", "v1", payload("a"))
+    assert expired.get("a", "v1") is None
+
+
+def test_entries_are_shared_through_sqlite(tmp_path):
+    db_path = str(tmp_path / "answers.sqlite3")
+    first, second = AnswerCache(db_path=db_path), AnswerCache(db_path=db_path)
+    assert second.get("question", "v1") is None
+    first.put("question", "v1", payload("réponse"))
+    # L'autre processus lit la réponse à sa recherche suivante, sources comprises
+    shared = second.get("question", "v1")
+    assert shared["answer"] == "réponse"
+    assert shared["source_documents"][0].metadata == {"source": "a.docx"}
+    assert AnswerCache(db_path=db_path).get("question", "v1")["answer"] == "réponse"
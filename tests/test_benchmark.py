@@ -0,0 +1,27 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.slow
+def test_offline_benchmark_has_no_regression_against_the_baseline(tmp_path):
+    # Processus séparé, lancé dans un répertoire temporaire (fichiers SQLite) avec les
+    # mêmes paramètres que la référence. Qualité comparée avec la tolérance par défaut ;
+    # latences avec une marge large, et pas du tout en CI (machines partagées, autre
+    # matériel que celui de la référence). `pytest -m "not slow"` saute ce test.
+    for name in ("Livrable_01.json", "gold_questions.json"):
+        shutil.copy(os.path.join(ROOT, name), tmp_path)
+    command = [sys.executable, os.path.join(ROOT, "benchmark.py"),
+               "--baseline", os.path.join(ROOT, "benchmark_baseline.json"), "--check",
+               "--latency-tolerance", "4", "--latency-floor-ms", "50"]
+    if os.environ.get("CI"):
+        command.append("--skip-latency")
+    result = subprocess.run(command, cwd=tmp_path, capture_output=True, text=True, timeout=600)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "Aucune régression" in result.stdout
+    assert "Paramètres différents" not in result.stdout
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+import time
+
+from concurrency import AdmissionController, ServerBusy
+
+
+def run_concurrently(controller, calls, duration=0.05):
+    """Lance `calls` appels bloquants sous contrôle d'admission ; retourne (résultats, pic de concurrence)."""
+    active, peak = 0, 0
+    lock = threading.Lock()
+
+    def work():
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(duration)
+        with lock:
+            active -= 1
+        return "ok"
+
+    async def main():
+        return await asyncio.gather(*(controller.run(work) for _ in range(calls)), return_exceptions=True)
+
+    return asyncio.run(main()), peak
+
+
+def test_admission_bounds_concurrency():
+    controller = AdmissionController(max_in_flight=2, max_queue=10, queue_timeout=5)
+    results, peak = run_concurrently(controller, 6)
+    assert results == ["ok"] * 6
+    assert peak == 2
+    assert controller.stats()["in_flight"] == 0
+
+
+def test_admission_survives_a_new_event_loop():
+    # Chaque asyncio.run crée une boucle : le sémaphore ne doit pas rester lié à la précédente
+    controller = AdmissionController(max_in_flight=1, max_queue=10, queue_timeout=5)
+    for _ in range(3):
+        results, peak = run_concurrently(controller, 4, duration=0.01)
+        assert results == ["ok"] * 4
+        assert peak == 1
+
+
+def test_full_queue_is_rejected_with_429():
+    controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=5)
+    results, _ = run_concurrently(controller, 3)
+    errors = [r for r in results if isinstance(r, ServerBusy)]
+    assert len(errors) == 1 and errors[0].status_code == 429
+    assert results.count("ok") == 2
+
+
+def test_queue_timeout_returns_503():
+    controller = AdmissionController(max_in_flight=1, max_queue=10, queue_timeout=0.01)
+    results, _ = run_concurrently(controller, 2, duration=0.2)
+    assert results.count("ok") == 1
+    error = next(r for r in results if isinstance(r, Exception))
+    assert isinstance(error, ServerBusy) and error.status_code == 503
+
@@ -0,0 +1,40 @@
+from langchain.schema import Document
+
+from context import estimate_tokens, merge_chunks, pack_context
+
+
+def doc(text, source="a.docx"):
+    return Document(page_content=text, metadata={"source": source})
+
+
+def test_threshold_keeps_the_best_chunk_when_all_are_below():
+    scored = [(doc("premier chunk"), 0.3), (doc("second chunk", "b.docx"), 0.2)]
+    packed = pack_context(scored, max_tokens=1000, score_threshold=0.6)
+    assert [d.page_content for d in packed] == ["premier chunk"]
+
+
+def test_threshold_filters_vector_scores_but_keeps_keyword_hits():
+    scored = [(doc("haut"), 0.9), (doc("bas", "b.docx"), 0.1), (doc("bm25", "c.docx"), None)]
+    packed = pack_context(scored, max_tokens=1000, score_threshold=0.6)
+    assert [d.page_content for d in packed] == ["haut", "bm25"]
+
+
+def test_min_chunks_zero_allows_an_empty_context():
+    packed = pack_context([(doc("bas"), 0.1)], max_tokens=1000, score_threshold=0.6, min_chunks=0)
+    assert packed == []
+
+
+def test_budget_is_respected_and_a_single_long_chunk_is_truncated():
+    long_text = "x" * 4000
+    packed = pack_context([(doc(long_text), 0.9), (doc("y" * 40, "b.docx"), 0.8)], max_tokens=100)
+    assert len(packed) == 1
+    assert estimate_tokens(packed[0].page_content) <= 100
+
+
+def test_overlapping_chunks_of_a_source_are_merged():
+    first = "Le Tour du Rwanda se court en février chaque année depuis 2009."
+    second = "se court en février chaque année depuis 2009. Il compte huit étapes."
+    merged = merge_chunks([(doc(first), 0.9), (doc(second), 0.8)])
+    assert len(merged) == 1
+    assert merged[0][0].page_content.endswith("Il compte huit étapes.")
+    assert merged[0][1] == 0.9
@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from embed import build_index
+from index_version import read_version
+from keyword_index import KeywordIndex
+from local_models import HashingEmbeddings
+from vector_index import MmapVectorIndex
+
+
+def write_corpus(path, modified, title="Planning"):
+    corpus = {"planning.docx": {
+        "titre": title,
+        "modifié": modified,
+        "paragraphes": ["Le livrable du projet est attendu fin mai.", "La recette suit en juin."]
+    }}
+    path.write_text(json.dumps(corpus, ensure_ascii=False), encoding="utf-8")
+
+
+def stored_metadata(directory):
+    vector = MmapVectorIndex(str(directory))
+    keyword = KeywordIndex(str(directory))
+    ids = sorted(vector.ids())
+    return list(vector.metadatas(ids).values()), list(keyword.metadatas(ids).values())
+
+
+def test_changed_document_metadata_is_refreshed_without_new_embeddings(tmp_path):
+    corpus, directory = tmp_path / "corpus.json", tmp_path / "index"
+    write_corpus(corpus, "2025-05-01T10:00:00+00:00")
+    assert build_index(str(corpus), str(directory), None, backend="mmap", embedding=HashingEmbeddings())["added"]
+
+    # Même texte, seule la date de modification change : les chunks gardent leur identifiant
+    write_corpus(corpus, "2025-05-26T10:00:00+00:00", title="Planning révisé")
+    result = build_index(str(corpus), str(directory), None, backend="mmap", embedding=HashingEmbeddings())
+    assert result["added"] == 0 and result["deleted"] == 0
+
+    for metadatas in stored_metadata(directory):
+        assert metadatas
+        for metadata in metadatas:
+            assert metadata["modifié"] == "2025-05-26T10:00:00+00:00"
+            assert metadata["titre"] == "Planning révisé"
+            assert metadata["modifié_ts"] == 1748253600.0
+
+
+def test_unchanged_corpus_rewrites_nothing(tmp_path, capsys):
+    corpus, directory = tmp_path / "corpus.json", tmp_path / "index"
+    write_corpus(corpus, "2025-05-01T10:00:00+00:00")
+    build_index(str(corpus), str(directory), None, backend="mmap", embedding=HashingEmbeddings())
+    capsys.readouterr()
+    build_index(str(corpus), str(directory), None, backend="mmap", embedding=HashingEmbeddings())
+    assert "Métadonnées" not in capsys.readouterr().out
+
+
+def test_an_interrupted_update_has_already_changed_the_corpus_version(tmp_path, monkeypatch):
+    corpus, directory = tmp_path / "corpus.json", tmp_path / "index"
+    write_corpus(corpus, "2025-05-01T10:00:00+00:00")
+    build_index(str(corpus), str(directory), None, backend="mmap", embedding=HashingEmbeddings())
+    version = read_version(str(directory))
+
+    corpus.write_text(json.dumps({"budget.docx": {"paragraphes": ["Le budget est validé."]}}), encoding="utf-8")
+
+    def crash(self, ids, documents):
+        raise RuntimeError("interruption")
+
+    monkeypatch.setattr(KeywordIndex, "add", crash)
+    with pytest.raises(RuntimeError):
+        build_index(str(corpus), str(directory), None, backend="mmap", embedding=HashingEmbeddings())
+    # Les réponses en cache, calculées sur l'ancien corpus, ne seront plus servies
+    assert read_version(str(directory)) != version
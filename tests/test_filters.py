@@ -0,0 +1,77 @@
+import os
+from datetime import date, datetime, timezone
+
+import pytest
+
+import chatbot
+from api import ChatFilters
+from chatbot import NO_MATCH_ANSWER, metadata_filter
+from local_models import OfflineResources, build_offline_index
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def ts(*args):
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+def test_date_only_bounds_cover_the_whole_day():
+    bounds = metadata_filter(date_from=date(2025, 5, 26), date_to=date(2025, 5, 26))["modifié_ts"]
+    assert bounds["gte"] == ts(2025, 5, 26)
+    assert bounds["gte"] <= ts(2025, 5, 26, 15, 0) <= bounds["lte"]
+    assert bounds["lte"] < ts(2025, 5, 27)
+
+
+def test_datetime_bounds_are_kept_as_given():
+    bounds = metadata_filter(date_to=datetime(2025, 5, 26, 10, 30))["modifié_ts"]
+    assert bounds == {"gte": None, "lte": ts(2025, 5, 26, 10, 30)}
+
+
+def test_request_dates_without_time_are_parsed_as_days():
+    filters = ChatFilters(date_from="2025-05-01", date_to="2025-05-26")
+    assert filters.date_to == date(2025, 5, 26)
+    assert filters.where()["modifié_ts"]["lte"] > ts(2025, 5, 26, 23, 59)
+
+    filters = ChatFilters(date_to="2025-05-26T00:00:00Z")
+    assert filters.where()["modifié_ts"]["lte"] == ts(2025, 5, 26)
+
+
+@pytest.fixture(scope="module")
+def offline_index(tmp_path_factory):
+    directory = str(tmp_path_factory.mktemp("index"))
+    build_offline_index(os.path.join(ROOT, "Livrable_01.json"), directory)
+    return directory
+
+
+@pytest.fixture
+def offline_chatbot(offline_index, monkeypatch):
+    resources = OfflineResources(offline_index)
+    monkeypatch.setattr(chatbot, "_resources", resources)
+    monkeypatch.setattr(chatbot, "answer_cache", None)
+    monkeypatch.setitem(chatbot._startup, "status", "ready")
+    return resources
+
+
+def test_a_date_only_date_to_keeps_documents_modified_later_that_day(offline_chatbot):
+    # Les documents du livrable sont modifiés le 2025-05-26 vers 12:20 UTC
+    where = ChatFilters(date_to="2025-05-26").where()
+    response = chatbot.answer_question("Qui est Daryl Impey ?", where=where)
+    assert response["source_documents"]
+
+
+def test_no_upstream_call_when_the_filters_match_nothing(offline_chatbot):
+    where = ChatFilters(documents=["absent.docx"]).where()
+    calls = offline_chatbot.model.calls
+
+    response = chatbot.answer_question("Qui est Daryl Impey ?", where=where)
+    assert response["answer"] == NO_MATCH_ANSWER
+    assert response["source_documents"] == []
+
+    events = list(chatbot.stream_answer("Qui est Daryl Impey ?", where=where))
+    assert events[-1] == ("end", {"question": "Qui est Daryl Impey ?", "answer": NO_MATCH_ANSWER,
+                                  "source_documents": []})
+
+    batch = [response for _, response in chatbot.answer_batch(["Qui est Daryl Impey ?", "Et Moolman ?"],
+                                                              where=where)]
+    assert [response["answer"] for response in batch] == [NO_MATCH_ANSWER, NO_MATCH_ANSWER]
+    assert offline_chatbot.model.calls == calls
@@ -0,0 +1,62 @@
+from langchain.schema import Document
+
+from keyword_index import KeywordIndex, reciprocal_rank_fusion
+
+
+def doc(text, source="a.docx", **metadata):
+    return Document(page_content=text, metadata={"source": source, **metadata})
+
+
+def test_fusion_ranks_chunks_found_by_both_retrievers_first():
+    vector = [(doc("commun"), 0.8), (doc("vecteur seul", "b.docx"), 0.7)]
+    keyword = [(doc("mot-clé seul", "c.docx"), None), (doc("commun"), None)]
+    fused = reciprocal_rank_fusion([vector, keyword], k=3)
+    assert [d.page_content for d, _ in fused] == ["commun", "mot-clé seul", "vecteur seul"]
+    # Le score retenu est le premier score non nul, ici celui de la recherche vectorielle
+    assert fused[0][1] == 0.8
+    assert fused[1][1] is None
+
+
+def test_fusion_keeps_k_chunks_and_tells_sources_apart():
+    results = [[(doc("même texte", "a.docx"), None), (doc("même texte", "b.docx"), None)]]
+    assert len(reciprocal_rank_fusion(results, k=5)) == 2
+    assert len(reciprocal_rank_fusion(results, k=1)) == 1
+
+
+def test_where_clause_translates_each_condition():
+    sql, params = KeywordIndex._where_clause({
+        "source": {"in": ["a.docx", "b.docx"]},
+        "modifié_ts": {"gte": 10.0, "lte": None},
+    })
+    assert sql == " AND c.source IN (?,?) AND json_extract(c.metadata, ?) >= ?"
+    assert params == ["a.docx", "b.docx", '$."modifié_ts"', 10.0]
+
+
+def test_where_clause_with_an_empty_list_matches_nothing():
+    assert KeywordIndex._where_clause({"indice_rag": {"in": []}}) == (" AND 0", [])
+    assert KeywordIndex._where_clause(None) == ("", [])
+
+
+def test_filtered_search_only_returns_matching_chunks(tmp_path):
+    index = KeywordIndex(str(tmp_path))
+    index.add(["1", "2", "3"], [
+        doc("livrable du projet", "a.docx", modifié_ts=100.0),
+        doc("livrable de la phase", "b.docx", modifié_ts=200.0),
+        doc("planning général", "a.docx", modifié_ts=300.0),
+    ])
+    assert {d.metadata["source"] for d, _ in index.search("livrable")} == {"a.docx", "b.docx"}
+    results = index.search("livrable", where={"modifié_ts": {"gte": 150.0, "lte": 250.0}})
+    assert [d.page_content for d, _ in results] == ["livrable de la phase"]
+    assert index.search("livrable", where={"source": {"in": ["c.docx"]}}) == []
+
+
+def test_statistics_follow_writes_from_another_connection(tmp_path):
+    reader = KeywordIndex(str(tmp_path))
+    writer = KeywordIndex(str(tmp_path))
+    writer.add(["1"], [doc("livrable du projet")])
+    assert reader.count() == 1
+    # Mise à jour par un autre processus (embed.py) : le worker relit le nombre de chunks
+    writer.add(["2", "3"], [doc("livrable de la phase", "b.docx"), doc("planning", "c.docx")])
+    assert reader.count() == 3
+    writer.delete(["3"])
+    assert reader.count() == 2
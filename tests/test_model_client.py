@@ -0,0 +1,87 @@
+import threading
+import time
+
+import pytest
+
+from concurrency import ServerBusy
+from model_client import ModelScheduler, UpstreamTimeout, classify_error
+
+
+def scheduler(**overrides):
+    settings = dict(requests_per_minute=60_000, burst=100, max_concurrency=2, timeout=0.05,
+                    max_queue_wait=0.1, max_retries=0, backoff_base=0.01, backoff_max=0.01)
+    settings.update(overrides)
+    return ModelScheduler("test", **settings)
+
+
+def test_hung_calls_keep_their_slot_until_they_finish():
+    release = threading.Event()
+    model = scheduler()
+    for _ in range(2):
+        with pytest.raises(UpstreamTimeout):
+            model.call(None, release.wait)
+    assert model.stats()["abandoned_calls"] == 2
+
+    # Les deux places sont occupées par les appels bloqués : refus rapide plutôt qu'une file
+    start = time.monotonic()
+    with pytest.raises(ServerBusy) as error:
+        model.call(None, lambda: "ok")
+    assert error.value.status_code == 503
+    assert time.monotonic() - start < 1
+
+    release.set()
+    time.sleep(0.05)
+    assert model.call(None, lambda: "ok") == "ok"
+    assert model.stats()["calls_in_progress"] == 0
+    assert model.stats()["abandoned_calls"] == 0
+
+
+def test_followers_wait_no_longer_than_the_deadline():
+    release = threading.Event()
+    model = scheduler(max_concurrency=4)
+    results = []
+
+    def leader():
+        try:
+            model.call("same", release.wait)
+        except UpstreamTimeout as e:
+            results.append(e)
+
+    thread = threading.Thread(target=leader)
+    thread.start()
+    time.sleep(0.01)
+    # Le meneur ne rend jamais la main avant le délai : le suiveur abandonne aussi
+    model.deadline = lambda: 0.02
+    with pytest.raises(UpstreamTimeout):
+        model.call("same", release.wait)
+    thread.join()
+    release.set()
+    assert len(results) == 1
+
+
+def test_identical_concurrent_calls_are_coalesced():
+    model = scheduler(max_concurrency=4, timeout=1)
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.05)
+        return "réponse"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(model.call("key", slow))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["réponse"] * 4
+    assert len(calls) == 1
+
+
+def test_classify_error():
+    class ResourceExhausted(Exception):
+        pass
+
+    assert classify_error(ResourceExhausted("429")) == "quota"
+    assert classify_error(TimeoutError()) == "timeout"
+    assert classify_error(ValueError("bad request")) is None
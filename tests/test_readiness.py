@@ -0,0 +1,60 @@
+import asyncio
+
+import httpx
+import pytest
+
+import api
+import chatbot
+from concurrency import AdmissionController
+
+
+class FakeCorpora:
+    def get(self, name=None):
+        return object()
+
+
+class FakeResources:
+    def __init__(self):
+        self.corpora = FakeCorpora()
+
+
+@pytest.fixture
+def cold_chatbot(monkeypatch):
+    monkeypatch.setattr(chatbot, "Resources", FakeResources)
+    monkeypatch.setattr(chatbot, "_resources", None)
+    monkeypatch.setattr(chatbot, "_startup", {"status": "cold", "error": None, "seconds": None})
+    return chatbot
+
+
+def test_lazy_build_marks_ready(cold_chatbot):
+    cold_chatbot.get_resources()
+    assert cold_chatbot.readiness()["status"] == "ready"
+
+
+def test_lazy_build_after_failed_warm_up_marks_ready(cold_chatbot):
+    cold_chatbot._startup.update(status="error", error="boom")
+    cold_chatbot.get_resources()
+    assert cold_chatbot.readiness() == {"status": "ready", "error": None, "seconds": None}
+
+
+def test_corpus_opened_after_failed_warm_up_marks_ready(cold_chatbot):
+    cold_chatbot.get_resources()
+    cold_chatbot._startup.update(status="error", error="index absent")
+    cold_chatbot.get_corpus()
+    assert cold_chatbot.readiness()["status"] == "ready"
+
+
+def test_ready_without_warm_up(cold_chatbot, monkeypatch):
+    monkeypatch.setitem(api.STARTUP_CONFIG, "warm_up", False)
+    # L'arrêt de l'application ferme le pool du contrôleur : on en prête un jetable
+    monkeypatch.setattr(api, "admission", AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=1))
+
+    async def probe():
+        async with api.lifespan(api.app):
+            transport = httpx.ASGITransport(app=api.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.get("/api/ready")
+
+    response = asyncio.run(probe())
+    assert response.status_code == 200
+    assert chatbot._resources is None
@@ -0,0 +1,66 @@
+import json
+import os
+
+import pytest
+
+from rewrite import is_follow_up, needs_rewrite, same_query
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HISTORY = [("Quels pays dominent le cyclisme africain ?", "L'Afrique du Sud, l'Érythrée...")]
+
+
+@pytest.mark.parametrize("question", [
+    "Et en 2020 ?",
+    "Quel rôle y joue Daryl Impey ?",
+    "Pourquoi est-elle si populaire ?",
+    "Comment expliquer cet écart ?",
+    "Quel est le palmarès de ce dernier aux Mondiaux ?",
+    "Combien de courses celui-ci a-t-il remportées en 2019 ?",
+    "Mais qu'en est-il des équipes féminines africaines ?",
+])
+def test_follow_ups_are_rewritten(question):
+    assert needs_rewrite(question, HISTORY)
+
+
+@pytest.mark.parametrize("question", [
+    "Quel est le classement de ce coureur éthiopien aux Mondiaux Route 2021 ?",
+    "Quelle est la part de ses coureurs dans le peloton mondial en 2021 ?",
+    "Pourquoi les cyclistes féminines africaines peinent-elles à atteindre l'égalité avec les hommes ?",
+    "De combien le financement des équipes féminines est-il inférieur à celui des équipes masculines ?",
+    "Combien de coureurs africains y a-t-il dans les équipes World Tour en 2021 ?",
+])
+def test_standalone_questions_are_not_rewritten(question):
+    assert not needs_rewrite(question, HISTORY)
+
+
+def test_policies():
+    assert not needs_rewrite("Et en 2020 ?", [])
+    assert not needs_rewrite("Et en 2020 ?", HISTORY, policy="never")
+    assert needs_rewrite("Quel est le classement moyen de l'Inde en 2021 ?", HISTORY, policy="always")
+
+
+def test_no_false_positive_on_recorded_transcripts():
+    with open(os.path.join(ROOT, "rewrite_transcripts.json"), encoding="utf-8") as f:
+        transcripts = json.load(f)
+    for conversation in transcripts:
+        for turn in conversation[1:]:
+            assert is_follow_up(turn["question"]) == ("standalone" in turn), turn["question"]
+
+
+def test_same_query_ignores_form():
+    assert same_query("Quel est le classement de l'Égypte ?", "classement EGYPTE")
+    assert not same_query("classement de l'Égypte", "classement de l'Inde")
+
+
+def test_failed_speculative_retrieval_falls_back_to_the_normal_path(monkeypatch):
+    import chatbot
+
+    def failing_speculation(question, corpus, where):
+        raise TimeoutError("quota d'embedding épuisé")
+
+    monkeypatch.setitem(chatbot.REWRITE_CONFIG, "speculative_retrieval", True)
+    monkeypatch.setattr(chatbot, "_speculate", failing_speculation)
+    monkeypatch.setattr(chatbot, "condense_question", lambda question, history: question)
+    question = "Et en 2020 ?"
+    assert chatbot.resolve_question(question, HISTORY) == (question, None, None)
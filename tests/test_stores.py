@@ -0,0 +1,63 @@
+import multiprocessing
+
+from conversation_store import ConversationStore
+from memory_store import SqliteSessionStore
+
+PROCESSES = 4
+TURNS = 25
+
+
+def append_session_turns(db_path, worker):
+    store = SqliteSessionStore(db_path, max_turns=PROCESSES * TURNS, max_chars=10**6)
+    for i in range(TURNS):
+        store.append("partagée", f"q{worker}-{i}", "r")
+
+
+def append_conversation_turns(db_path, conversation_id, worker):
+    store = ConversationStore(db_path)
+    for i in range(TURNS):
+        assert store.append_turn(conversation_id, f"q{worker}-{i}", "r")
+
+
+def run_processes(target, *args):
+    # Comme les workers gunicorn : des processus créés par fork, chacun avec sa connexion
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=target, args=(*args, worker)) for worker in range(PROCESSES)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=120)
+    assert [process.exitcode for process in processes] == [0] * PROCESSES
+
+
+def test_session_turns_from_several_processes_are_all_kept(tmp_path):
+    db_path = str(tmp_path / "sessions.sqlite3")
+    store = SqliteSessionStore(db_path, max_turns=PROCESSES * TURNS, max_chars=10**6)
+    run_processes(append_session_turns, db_path)
+
+    questions = [question for question, _ in store.history("partagée")]
+    assert sorted(questions) == sorted(f"q{w}-{i}" for w in range(PROCESSES) for i in range(TURNS))
+    # L'ordre d'écriture de chaque processus est conservé
+    for worker in range(PROCESSES):
+        own = [q for q in questions if q.startswith(f"q{worker}-")]
+        assert own == [f"q{worker}-{i}" for i in range(TURNS)]
+
+
+def test_conversation_turns_from_several_processes_are_all_kept(tmp_path):
+    db_path = str(tmp_path / "conversations.sqlite3")
+    store = ConversationStore(db_path)
+    conversation_id = store.create()["id"]
+    run_processes(append_conversation_turns, db_path, conversation_id)
+
+    assert store.get(conversation_id)["message_count"] == 2 * PROCESSES * TURNS
+    turns = store.recent_turns(conversation_id, max_turns=PROCESSES * TURNS, max_chars=10**6)
+    assert len(turns) == PROCESSES * TURNS
+
+
+def test_session_window_and_clear():
+    store = SqliteSessionStore(":memory:", max_turns=2, max_chars=1000)
+    for i in range(3):
+        store.append("s", f"q{i}", "r")
+    assert store.history("s") == [("q1", "r"), ("q2", "r")]
+    store.clear("s")
+    assert store.history("s") == []
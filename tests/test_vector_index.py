@@ -0,0 +1,107 @@
+import os
+
+import numpy as np
+import pytest
+from langchain.schema import Document
+
+from vector_index import MmapVectorIndex
+
+
+def make_index(directory, count=40, dimension=8, index_type="flat"):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(count, dimension)).astype(np.float32)
+    documents = [Document(page_content=f"chunk {i}", metadata={"source": f"doc{i % 4}.docx"})
+                 for i in range(count)]
+    index = MmapVectorIndex(str(directory), index_type=index_type, nlist=4, nprobe=1)
+    index.add([f"id{i}" for i in range(count)], vectors, documents)
+    return index, vectors
+
+
+def test_exact_search_returns_the_nearest_chunk(tmp_path):
+    index, vectors = make_index(tmp_path)
+    results = index.search(vectors[7], k=3)
+    assert results[0][0].page_content == "chunk 7"
+    assert results[0][1] == pytest.approx(1.0, abs=1e-5)
+    assert [score for _, score in results] == sorted((score for _, score in results), reverse=True)
+
+
+def test_ivf_with_empty_probed_lists_returns_nothing(tmp_path):
+    index, vectors = make_index(tmp_path, index_type="ivf")
+    assert index.build_ivf()
+    assert index.search(vectors[0], k=3)
+    # Une seule liste IVF, vide : aucune ligne candidate
+    index._ivf = (vectors[:1] / np.linalg.norm(vectors[0]), np.array([0, 0]))
+    assert index.search(vectors[0], k=3) == []
+
+
+def make_filtered_index(directory):
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(12, 8)).astype(np.float32)
+    documents = [Document(page_content=f"chunk {i}", metadata={
+        "source": f"doc{i % 3}.docx", "modifié_ts": float(i * 100), "indice_rag": "A" if i < 6 else "B"
+    }) for i in range(12)]
+    index = MmapVectorIndex(str(directory))
+    index.add([f"id{i}" for i in range(12)], vectors, documents)
+    return index, vectors
+
+
+def found(results):
+    return sorted(int(doc.page_content.split()[1]) for doc, _ in results)
+
+
+def test_filter_on_a_list_of_values(tmp_path):
+    index, vectors = make_filtered_index(tmp_path)
+    results = index.search(vectors[0], k=12, where={"source": {"in": ["doc1.docx", "doc2.docx"]}})
+    assert found(results) == [i for i in range(12) if i % 3]
+
+
+def test_filter_on_a_closed_range_and_a_single_bound(tmp_path):
+    index, vectors = make_filtered_index(tmp_path)
+    assert found(index.search(vectors[0], k=12, where={"modifié_ts": {"gte": 300.0, "lte": 500.0}})) == [3, 4, 5]
+    assert found(index.search(vectors[0], k=12, where={"modifié_ts": {"gte": 900.0}})) == [9, 10, 11]
+    assert found(index.search(vectors[0], k=12, where={"modifié_ts": {"lte": 0.0}})) == [0]
+
+
+def test_conditions_are_combined_and_unknown_columns_match_nothing(tmp_path):
+    index, vectors = make_filtered_index(tmp_path)
+    where = {"indice_rag": {"in": ["B"]}, "source": {"in": ["doc0.docx"]}}
+    assert found(index.search(vectors[0], k=12, where=where)) == [6, 9]
+    assert index.search(vectors[0], k=12, where={"inconnue": {"in": ["x"]}}) == []
+    # Le filtre restreint les lignes comparées : le plus proche parmi elles reste le premier
+    assert index.search(vectors[4], k=1, where={"indice_rag": {"in": ["A"]}})[0][0].page_content == "chunk 4"
+
+
+def test_rewrites_use_new_files_and_other_readers_follow_the_header(tmp_path):
+    writer, vectors = make_index(tmp_path)
+    reader = MmapVectorIndex(str(tmp_path))
+    assert reader.count() == 40
+
+    writer.delete([f"id{i}" for i in range(10)])
+    # Seuls les fichiers du header en place subsistent
+    files = set(writer.header["files"].values())
+    assert files | {"header.json"} == set(os.listdir(writer.directory))
+
+    # L'autre processus bascule d'un bloc sur la nouvelle version : ids et vecteurs alignés
+    results = reader.search(vectors[25], k=1)
+    assert reader.count() == 30
+    assert results[0][0].page_content == "chunk 25"
+    assert reader.search(vectors[3], k=30)[0][0].page_content != "chunk 3"
+
+
+def test_a_reader_that_lost_the_race_reloads_the_new_header(tmp_path, monkeypatch):
+    writer, vectors = make_index(tmp_path)
+    reader = MmapVectorIndex(str(tmp_path))
+    load_files = MmapVectorIndex._load_files
+    attempts = []
+
+    def racing_load(self):
+        # Premier essai : le header lu décrit des fichiers supprimés entre-temps
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise FileNotFoundError("vectors.1.f32")
+        return load_files(self)
+
+    writer.delete(["id0"])
+    monkeypatch.setattr(MmapVectorIndex, "_load_files", racing_load)
+    assert reader.count() == 39
+    assert len(attempts) == 2
@@ -0,0 +1,208 @@
+import contextvars
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("rag.trace")
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 10, 15, 20)
+
+
+class Histogram:
+    """Histogramme cumulatif au format Prometheus, avec étiquettes."""
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}  # étiquettes -> [compteurs par seuil, somme, total]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{_labels(key, le=bound)} {bucket_count}")
+                lines.append(f"{self.name}_bucket{_labels(key, le='+Inf')} {count}")
+                lines.append(f"{self.name}_sum{_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_labels(key)} {count}")
+        return lines
+
+
+class Counter:
+    """Compteur au format Prometheus, avec étiquettes."""
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._series.items()):
+                lines.append(f"{self.name}{_labels(key)} {value}")
+        return lines
+
+
+def _labels(key, **extra):
+    items = list(key) + [(name, value) for name, value in extra.items()]
+    if not items:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in items) + "}"
+
+
+REQUEST_DURATION = Histogram("rag_request_duration_seconds", "Durée totale des requêtes", DURATION_BUCKETS)
+STAGE_DURATION = Histogram("rag_stage_duration_seconds", "Durée de chaque étape du pipeline RAG", DURATION_BUCKETS)
+PROMPT_TOKENS = Histogram("rag_prompt_tokens", "Tokens envoyés au modèle (estimation)", TOKEN_BUCKETS)
+COMPLETION_TOKENS = Histogram("rag_completion_tokens", "Tokens générés par le modèle (estimation)", TOKEN_BUCKETS)
+RETRIEVED_CHUNKS = Histogram("rag_retrieved_chunks", "Chunks retrouvés puis retenus dans le contexte", COUNT_BUCKETS)
+CACHE_LOOKUPS = Counter("rag_cache_lookups_total", "Consultations du cache des réponses par résultat")
+REQUESTS = Counter("rag_requests_total", "Requêtes traitées par point d'entrée et statut")
+UPSTREAM_QUEUE_WAIT = Histogram("rag_upstream_queue_wait_seconds",
+                                "Attente du limiteur de débit avant un appel aux modèles", DURATION_BUCKETS)
+UPSTREAM_CALLS = Counter("rag_upstream_calls_total", "Appels aux modèles par modèle et résultat")
+UPSTREAM_RETRIES = Counter("rag_upstream_retries_total", "Nouvelles tentatives d'appel par modèle et motif")
+
+
+class Trace:
+    """
+    Trace d'une requête : durée de chaque étape et attributs (tokens, chunks, cache).
+
+    Un même objet est partagé entre la boucle d'événements et le thread qui exécute le
+    pipeline (le contexte est copié par `AdmissionController.execute`).
+    """
+
+    def __init__(self, request_id, endpoint):
+        self.request_id = request_id
+        self.endpoint = endpoint
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.attributes = {}
+        self.finished = False
+
+    def add_stage(self, name, seconds):
+        self.stages[name] = round(self.stages.get(name, 0.0) + seconds, 6)
+        STAGE_DURATION.observe(seconds, stage=name)
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def finish(self, status="ok"):
+        """Clôt la trace : alimente les histogrammes et journalise la trace en JSON."""
+        if self.finished:
+            return
+        self.finished = True
+        duration = time.perf_counter() - self.start
+        REQUEST_DURATION.observe(duration, endpoint=self.endpoint, status=status)
+        REQUESTS.inc(endpoint=self.endpoint, status=status)
+        if "prompt_tokens" in self.attributes:
+            PROMPT_TOKENS.observe(self.attributes["prompt_tokens"])
+        if "completion_tokens" in self.attributes:
+            COMPLETION_TOKENS.observe(self.attributes["completion_tokens"])
+        if "retrieved_chunks" in self.attributes:
+            RETRIEVED_CHUNKS.observe(self.attributes["retrieved_chunks"], step="retrieved")
+        if "context_chunks" in self.attributes:
+            RETRIEVED_CHUNKS.observe(self.attributes["context_chunks"], step="context")
+        if "cache" in self.attributes:
+            CACHE_LOOKUPS.inc(result=self.attributes["cache"])
+        logger.info(json.dumps({
+            "request_id": self.request_id,
+            "endpoint": self.endpoint,
+            "status": status,
+            "duration_s": round(duration, 6),
+            "stages": self.stages,
+            **self.attributes
+        }, ensure_ascii=False))
+
+
+@contextmanager
+def trace(request_id, endpoint):
+    """Ouvre une trace pour la durée du bloc et la clôt (statut `error` si une exception survient)."""
+    current = begin(request_id, endpoint)
+    try:
+        yield current
+    except Exception:
+        current.finish(status="error")
+        raise
+    finally:
+        current.finish()
+        _current_trace.set(None)
+
+
+def begin(request_id, endpoint):
+    """Ouvre une trace et en fait la trace courante ; c'est à l'appelant de la clore."""
+    current = Trace(request_id, endpoint)
+    _current_trace.set(current)
+    return current
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextmanager
+def stage(name):
+    """Mesure la durée d'une étape du pipeline dans la trace courante (sans effet hors trace)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        current = _current_trace.get()
+        if current is not None:
+            current.add_stage(name, time.perf_counter() - start)
+
+
+def record_stage(name, seconds):
+    """Enregistre une durée mesurée à la main (par exemple une génération en streaming)."""
+    current = _current_trace.get()
+    if current is not None:
+        current.add_stage(name, seconds)
+
+
+def set_attribute(key, value):
+    """Ajoute un attribut à la trace courante (sans effet hors trace)."""
+    current = _current_trace.get()
+    if current is not None:
+        current.set(key, value)
+
+
+def increment_attribute(key, amount=1):
+    """Incrémente un attribut numérique de la trace courante (sans effet hors trace)."""
+    current = _current_trace.get()
+    if current is not None:
+        current.set(key, current.attributes.get(key, 0) + amount)
+
+
+def render_metrics(extra_lines=()):
+    """Exporte toutes les métriques au format texte Prometheus."""
+    lines = []
+    for metric in (REQUEST_DURATION, STAGE_DURATION, PROMPT_TOKENS, COMPLETION_TOKENS,
+                   RETRIEVED_CHUNKS, CACHE_LOOKUPS, REQUESTS,
+                   UPSTREAM_QUEUE_WAIT, UPSTREAM_CALLS, UPSTREAM_RETRIES):
+        lines.extend(metric.render())
+    lines.extend(extra_lines)
+    return "\n".join(lines) + "\n"
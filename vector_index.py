@@ -0,0 +1,625 @@
+"""
+Couche d'accès aux index vectoriels.
+
+Deux implémentations partagent la même interface (`count`, `ids`, `add`, `delete`,
+`metadata_keys`, `update_metadata`, `search`, `search_many`) :
+  - `MmapVectorIndex` : index en processus, sans serveur ni dépendance. Les vecteurs
+    normalisés sont stockés dans une matrice float32 projetée en mémoire (mmap) et
+    la recherche exacte est un seul produit matriciel. Un mode IVF optionnel
+    (k-moyennes sur les vecteurs) ne parcourt que les listes les plus proches de la
+    requête, pour les gros corpus. Les métadonnées sont rangées par colonne dans un
+    fichier à part, et les textes dans un fichier lu à la demande.
+  - `ChromaVectorIndex` : la collection Chroma utilisée jusqu'ici.
+
+Les embeddings sont toujours calculés par l'appelant (embed.py, chatbot.py) avec le
+même modèle : l'index ne fait que stocker et comparer des vecteurs.
+
+Filtres (`where`) : un dictionnaire colonne de métadonnées -> condition, toutes les
+conditions devant être vraies :
+  - {"in": [valeurs]} : la valeur de la colonne est l'une de celles-ci ;
+  - {"gte": borne, "lte": borne} : intervalle fermé (une seule borne possible).
+La recherche ne porte alors que sur les chunks retenus.
+"""
+import json
+import os
+import re
+import threading
+import time
+
+import numpy as np
+from langchain.schema import Document
+
+MMAP_DIRECTORY = "mmap_index"
+HEADER_FILE = "header.json"
+VECTORS_FILE = "vectors.f32"
+COLUMNS_FILE = "columns.npz"
+TEXTS_FILE = "texts.bin"
+IVF_FILE = "ivf.npz"
+DATA_FILES = {"vectors": VECTORS_FILE, "columns": COLUMNS_FILE, "texts": TEXTS_FILE, "ivf": IVF_FILE}
+DATA_FILE_PATTERN = re.compile(r"(vectors|columns|texts|ivf)(\.\d+)?\.(f32|npz|bin)")
+LOAD_RETRIES = 5
+QUERY_BLOCK = 256
+
+
+def normalize_rows(vectors):
+    """Normalise chaque ligne (similarité cosinus = produit scalaire)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True).clip(min=1e-12)
+
+
+def _column_array(values):
+    """
+    Convertit une colonne de métadonnées en tableau numpy typé : entier, réel (valeur
+    manquante = NaN) ou texte (valeur manquante = chaîne vide).
+    """
+    present = [value for value in values if value is not None]
+    if present and len(present) == len(values) and all(
+            isinstance(v, (int, np.integer)) and not isinstance(v, bool) for v in present):
+        return np.array(values, dtype=np.int64)
+    if present and all(isinstance(v, (int, float, np.number)) and not isinstance(v, bool) for v in present):
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    return np.array(["" if v is None else str(v) for v in values], dtype=str)
+
+
+def chroma_where(where):
+    """Traduit un filtre `where` dans la syntaxe des filtres de métadonnées de Chroma."""
+    clauses = []
+    for name, condition in (where or {}).items():
+        if "in" in condition:
+            clauses.append({name: {"$in": list(condition["in"])}})
+        for operator in ("gte", "lte"):
+            if condition.get(operator) is not None:
+                clauses.append({name: {f"${operator}": condition[operator]}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def _replace(path, write):
+    """Écrit un fichier dans un fichier temporaire puis le substitue atomiquement."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def _truncate(path, size):
+    """Ramène un fichier à `size` octets (reste d'un ajout interrompu)."""
+    if os.path.exists(path) and os.path.getsize(path) > size:
+        with open(path, "r+b") as f:
+            f.truncate(size)
+
+
+def kmeans(vectors, n_clusters, iterations=10, sample_size=50_000, seed=0):
+    """
+    k-moyennes sphériques (vecteurs normalisés, affectation par produit scalaire).
+
+    L'apprentissage se fait sur un échantillon d'au plus `sample_size` vecteurs.
+
+    Returns:
+        np.ndarray: centroïdes normalisés, de forme (n_clusters, dimension).
+    """
+    rng = np.random.default_rng(seed)
+    sample = vectors
+    if len(vectors) > sample_size:
+        sample = vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))]
+    sample = np.asarray(sample, dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        for cluster in range(n_clusters):
+            members = sample[assignments == cluster]
+            if len(members):
+                centroids[cluster] = members.sum(axis=0)
+            else:
+                # Liste vide : on la relance sur un vecteur au hasard
+                centroids[cluster] = sample[rng.integers(len(sample))]
+        centroids = normalize_rows(centroids)
+    return centroids
+
+
+def assign(vectors, centroids, batch_size=65_536):
+    """Affecte chaque vecteur à son centroïde le plus proche, par blocs."""
+    return np.concatenate([
+        np.argmax(vectors[i:i + batch_size] @ centroids.T, axis=1)
+        for i in range(0, len(vectors), batch_size)
+    ]) if len(vectors) else np.zeros(0, dtype=np.int64)
+
+
+class MmapVectorIndex:
+    """
+    Index vectoriel en fichiers projetés en mémoire, dans `<persist_directory>/mmap_index/`.
+
+    Fichiers :
+      - header.json : dimension, nombre de vecteurs, colonnes, état de l'index IVF
+        et noms des fichiers de données ci-dessous ;
+      - vectors.<g>.f32 : matrice (N, dimension) des vecteurs normalisés, en float32 ;
+      - columns.<g>.npz : identifiants, métadonnées (une colonne typée par clé) et
+        positions des textes ;
+      - texts.<g>.bin : textes des chunks concaténés (UTF-8) ;
+      - ivf.<g>.npz : centroïdes et bornes des listes (mode IVF, lignes triées par liste).
+
+    Le header est écrit en dernier : c'est lui qui fait foi. Toute réécriture crée
+    ses fichiers sous un nouveau numéro de génération `<g>`, sans toucher à ceux que
+    décrit le header en place ; le remplacement atomique du header est le seul point
+    de bascule. Un processus qui lit l'index voit la nouvelle version dès que le
+    header change, et jamais un header associé aux fichiers d'une autre version.
+    (Un ajout prolonge les fichiers des vecteurs et des textes en place : les octets
+    au-delà de ce que décrit l'ancien header ne sont pas lus.)
+    """
+
+    def __init__(self, persist_directory, index_type="flat", nlist=None, nprobe=8):
+        self.directory = os.path.join(persist_directory, MMAP_DIRECTORY)
+        self.index_type = index_type
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._load()
+
+    @staticmethod
+    def exists(persist_directory):
+        return os.path.exists(os.path.join(persist_directory, MMAP_DIRECTORY, HEADER_FILE))
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _header_stamp(self):
+        try:
+            return os.stat(self._path(HEADER_FILE)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _file(self, kind):
+        """Fichier de données `kind` du header (nom fixe pour un index antérieur aux générations)."""
+        return self.header.get("files", {}).get(kind, DATA_FILES[kind])
+
+    def _load(self):
+        """
+        (Re)projette les fichiers de l'index en mémoire. Si le header lu a été remplacé
+        et ses fichiers supprimés avant leur ouverture, on relit le nouveau header.
+        """
+        for attempt in range(LOAD_RETRIES):
+            try:
+                return self._load_files()
+            except FileNotFoundError:
+                if attempt == LOAD_RETRIES - 1:
+                    raise
+                time.sleep(0.01 * (attempt + 1))
+
+    def _load_files(self):
+        self._stamp = self._header_stamp()
+        self.header = {"dimension": None, "count": 0, "columns": [], "ivf": False}
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._ids = np.zeros(0, dtype=str)
+        self._columns = {}
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._texts = b""
+        self._ivf = None
+        self._orders = {}
+        self._sorted = {}
+        if self._stamp is None:
+            return
+
+        with open(self._path(HEADER_FILE), "r", encoding="utf-8") as f:
+            self.header = json.load(f)
+        count, dimension = self.header["count"], self.header["dimension"]
+        if count:
+            self._vectors = np.memmap(self._path(self._file("vectors")), dtype=np.float32, mode="r",
+                                      shape=(count, dimension))
+        with np.load(self._path(self._file("columns"))) as columns:
+            self._ids = columns["ids"]
+            self._offsets = columns["text_offsets"]
+            self._columns = {name: columns[f"c{i}"] for i, name in enumerate(self.header["columns"])}
+            self._orders = {name: columns[f"o{i}"] for i, name in enumerate(self.header["columns"])
+                            if f"o{i}" in columns.files}
+        if self._offsets[-1]:
+            self._texts = np.memmap(self._path(self._file("texts")), dtype=np.uint8, mode="r",
+                                    shape=(int(self._offsets[-1]),))
+        if self.header.get("ivf"):
+            with np.load(self._path(self._file("ivf"))) as ivf:
+                self._ivf = (ivf["centroids"], ivf["list_offsets"])
+
+    def _refresh(self):
+        """Recharge l'index s'il a été réécrit (par embed.py ou un autre processus)."""
+        if self._header_stamp() != self._stamp:
+            self._load()
+
+    def count(self):
+        with self._lock:
+            self._refresh()
+            return self.header["count"]
+
+    def ids(self):
+        with self._lock:
+            self._refresh()
+            return set(self._ids.tolist())
+
+    def _document(self, row):
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        text = bytes(self._texts[start:end]).decode("utf-8")
+        metadata = {name: column[row].item() for name, column in self._columns.items()}
+        return Document(page_content=text, metadata=metadata)
+
+    # --- Écriture ---
+
+    def _generation_file(self, kind, generation):
+        stem, extension = os.path.splitext(DATA_FILES[kind])
+        return f"{stem}.{generation}{extension}"
+
+    def _write(self, ids, vectors, columns, texts, ivf=None):
+        """Réécrit entièrement l'index (suppression, tri des listes IVF)."""
+        os.makedirs(self.directory, exist_ok=True)
+        generation = self.header.get("generation", 0) + 1
+        files = {kind: self._generation_file(kind, generation) for kind in ("vectors", "texts")}
+        encoded = [text.encode("utf-8") for text in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(data) for data in encoded])
+        _replace(self._path(files["vectors"]),
+                 lambda f: f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes()))
+        _replace(self._path(files["texts"]), lambda f: f.write(b"".join(encoded)))
+        if ivf is not None:
+            files["ivf"] = self._generation_file("ivf", generation)
+            _replace(self._path(files["ivf"]), lambda f: np.savez(f, centroids=ivf[0], list_offsets=ivf[1]))
+        files["columns"] = self._write_columns(ids, columns, offsets, generation)
+        self._write_header(len(ids), vectors.shape[1] if len(ids) else self.header["dimension"],
+                           list(columns), ivf is not None, generation, files)
+
+    def _write_columns(self, ids, columns, offsets, generation):
+        arrays = {}
+        for i, values in enumerate(columns.values()):
+            arrays[f"c{i}"] = _column_array(values)
+            # Permutation qui trie la colonne : index des métadonnées pour les filtres
+            arrays[f"o{i}"] = np.argsort(arrays[f"c{i}"], kind="stable")
+        name = self._generation_file("columns", generation)
+        _replace(self._path(name), lambda f: np.savez(
+            f, ids=np.array(ids, dtype=str), text_offsets=offsets, **arrays
+        ))
+        return name
+
+    def _write_header(self, count, dimension, columns, ivf, generation, files):
+        header = {"dimension": dimension, "count": count, "columns": columns, "ivf": ivf,
+                  "metric": "cosine", "generation": generation, "files": files}
+        _replace(self._path(HEADER_FILE), lambda f: f.write(json.dumps(header, ensure_ascii=False).encode("utf-8")))
+        # Fichiers des générations précédentes : un processus qui les a déjà projetés
+        # garde ses pages, un processus qui ne les a pas encore ouverts relit le header
+        for name in os.listdir(self.directory):
+            if DATA_FILE_PATTERN.fullmatch(name) and name not in files.values():
+                os.remove(self._path(name))
+
+    def _kept_files(self, *kinds):
+        """Fichiers de la version en place repris tels quels par la prochaine génération."""
+        return {kind: self._file(kind) for kind in kinds}
+
+    def _current_columns(self):
+        return {name: column.tolist() for name, column in self._columns.items()}
+
+    def add(self, ids, vectors, documents):
+        """
+        Ajoute des chunks et leurs vecteurs en fin d'index.
+
+        Les vecteurs et les textes sont ajoutés aux fichiers existants ; seuls les
+        métadonnées et le header sont réécrits. L'index IVF éventuel devient caduc
+        (la recherche redevient exacte) jusqu'au prochain `build_ivf`.
+        """
+        if not ids:
+            return
+        vectors = normalize_rows(vectors)
+        with self._lock:
+            self._refresh()
+            count, dimension = self.header["count"], self.header["dimension"]
+            if dimension is not None and count and vectors.shape[1] != dimension:
+                raise ValueError(f"Dimension {vectors.shape[1]} incompatible avec l'index ({dimension}).")
+            os.makedirs(self.directory, exist_ok=True)
+
+            # Un ajout interrompu a pu laisser des octets au-delà de ce que décrit le header
+            files = self._kept_files("vectors", "texts")
+            _truncate(self._path(files["vectors"]), count * (dimension or 0) * 4)
+            _truncate(self._path(files["texts"]), int(self._offsets[-1]))
+            encoded = [doc.page_content.encode("utf-8") for doc in documents]
+            with open(self._path(files["vectors"]), "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self._path(files["texts"]), "ab") as f:
+                f.write(b"".join(encoded))
+
+            columns = self._current_columns()
+            for doc in documents:
+                for name in doc.metadata:
+                    columns.setdefault(name, [None] * count)
+            for name, values in columns.items():
+                values.extend(doc.metadata.get(name) for doc in documents)
+            offsets = np.concatenate([
+                self._offsets, self._offsets[-1] + np.cumsum([len(data) for data in encoded])
+            ])
+            generation = self.header.get("generation", 0) + 1
+            files["columns"] = self._write_columns(self._ids.tolist() + list(ids), columns, offsets, generation)
+            self._write_header(count + len(ids), vectors.shape[1], list(columns), False, generation, files)
+            self._load()
+
+    def _rewrite(self, rows, ivf=None):
+        vectors = np.asarray(self._vectors[rows], dtype=np.float32)
+        columns = {name: column[rows].tolist() for name, column in self._columns.items()}
+        texts = [self._document(row).page_content for row in rows]
+        vectors = vectors.reshape(len(rows), self.header["dimension"])
+        self._write(self._ids[rows].tolist(), vectors, columns, texts, ivf)
+        self._load()
+
+    def delete(self, ids):
+        """Supprime des chunks ; l'index est compacté (et l'IVF reconstruit s'il existait)."""
+        if not ids:
+            return
+        with self._lock:
+            self._refresh()
+            rows = np.flatnonzero(~np.isin(self._ids, list(ids)))
+            had_ivf = self._ivf is not None
+            self._rewrite(rows)
+        if had_ivf:
+            self.build_ivf()
+
+    def metadata_keys(self):
+        with self._lock:
+            self._refresh()
+            return set(self.header["columns"])
+
+    def metadatas(self, ids):
+        """Métadonnées enregistrées des chunks demandés (identifiant -> dict)."""
+        with self._lock:
+            self._refresh()
+            wanted = set(ids)
+            return {chunk_id: {name: column[row].item() for name, column in self._columns.items()}
+                    for row, chunk_id in enumerate(self._ids.tolist()) if chunk_id in wanted}
+
+    def update_metadata(self, ids, documents):
+        """
+        Remplace les métadonnées de chunks existants, sans toucher aux vecteurs ni
+        aux textes (seuls les colonnes et le header sont réécrits).
+        """
+        if not ids:
+            return
+        with self._lock:
+            self._refresh()
+            positions = {chunk_id: row for row, chunk_id in enumerate(self._ids.tolist())}
+            count = self.header["count"]
+            columns = self._current_columns()
+            for doc in documents:
+                for name in doc.metadata:
+                    columns.setdefault(name, [None] * count)
+            for chunk_id, doc in zip(ids, documents):
+                row = positions.get(chunk_id)
+                if row is None:
+                    continue
+                for name, values in columns.items():
+                    values[row] = doc.metadata.get(name)
+            files = self._kept_files("vectors", "texts", *(["ivf"] if self.header["ivf"] else []))
+            generation = self.header.get("generation", 0) + 1
+            files["columns"] = self._write_columns(self._ids.tolist(), columns, self._offsets, generation)
+            self._write_header(count, self.header["dimension"], list(columns), self.header["ivf"],
+                               generation, files)
+            self._load()
+
+    def build_ivf(self, nlist=None):
+        """
+        Construit l'index IVF : k-moyennes, puis tri des lignes par liste pour que
+        chaque liste soit un bloc contigu de la matrice.
+        """
+        with self._lock:
+            self._refresh()
+            count = self.header["count"]
+            nlist = nlist or self.nlist or max(1, int(4 * np.sqrt(count)))
+            if count < 2 * nlist:
+                return False
+            centroids = kmeans(self._vectors, nlist)
+            assignments = assign(self._vectors, centroids)
+            rows = np.argsort(assignments, kind="stable")
+            list_offsets = np.searchsorted(assignments[rows], np.arange(nlist + 1))
+            self._rewrite(rows, ivf=(centroids, list_offsets))
+            return True
+
+    # --- Recherche ---
+
+    def _candidate_rows(self, query):
+        """Lignes des `nprobe` listes IVF les plus proches de la requête."""
+        centroids, list_offsets = self._ivf
+        probes = np.argsort(-(centroids @ query))[:self.nprobe]
+        return np.concatenate([np.arange(list_offsets[p], list_offsets[p + 1]) for p in probes])
+
+    def _sorted_column(self, name):
+        if name not in self._sorted:
+            column = self._columns[name]
+            order = self._orders.get(name)
+            if order is None:
+                # Index écrit avant l'ajout des permutations : calculée au premier filtre
+                order = np.argsort(column, kind="stable")
+            self._sorted[name] = (order, column[order])
+        return self._sorted[name]
+
+    def _filter_rows(self, where):
+        """
+        Lignes qui satisfont le filtre, par ordre croissant. Chaque condition est
+        résolue par dichotomie dans la colonne triée : le coût dépend du nombre de
+        lignes retenues, pas de la taille de l'index.
+        """
+        rows = None
+        for name, condition in where.items():
+            if name not in self._columns:
+                return np.zeros(0, dtype=np.int64)
+            order, values = self._sorted_column(name)
+            kind = values.dtype.type
+            matched = []
+            if "in" in condition:
+                for value in condition["in"]:
+                    value = str(value) if kind is np.str_ else value
+                    lo, hi = np.searchsorted(values, value, "left"), np.searchsorted(values, value, "right")
+                    matched.append(order[lo:hi])
+                matched = np.concatenate(matched) if matched else np.zeros(0, dtype=np.int64)
+            else:
+                lo, hi = 0, len(values)
+                if kind is not np.str_:
+                    # Les valeurs manquantes (NaN) sont rangées en fin de colonne
+                    hi = int(np.searchsorted(values, np.inf, "right"))
+                if condition.get("gte") is not None:
+                    lo = int(np.searchsorted(values, condition["gte"], "left"))
+                if condition.get("lte") is not None:
+                    hi = min(hi, int(np.searchsorted(values, condition["lte"], "right")))
+                matched = order[lo:max(lo, hi)]
+            matched = np.unique(matched)
+            rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+            if not len(rows):
+                break
+        return rows
+
+    def search(self, query_vector, k=5, where=None):
+        """
+        Retourne les `k` chunks les plus proches du vecteur de requête (parmi ceux
+        qui satisfont `where`, s'il est fourni).
+
+        Returns:
+            list: tuples (Document, similarité cosinus ramenée entre 0 et 1), du plus
+            au moins pertinent.
+        """
+        return self.search_many([query_vector], k, where)[0]
+
+    def _top_k(self, scores, k, rows=None):
+        k = min(k, len(scores))
+        if k <= 0:
+            # Listes IVF sondées vides, ou filtre qui ne retient aucune ligne
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        positions = top if rows is None else rows[top]
+        return [(self._document(int(row)), max(0.0, float(score)))
+                for row, score in zip(positions, scores[top])]
+
+    def search_many(self, query_vectors, k=5, where=None):
+        """
+        Recherche groupée : en mode exact, toutes les requêtes sont comparées à l'index
+        par un seul produit matriciel (N, d) x (d, B). Avec un filtre, seules les
+        lignes retenues sont lues et comparées (recherche exacte, même en mode IVF).
+
+        Returns:
+            list: pour chaque requête, la liste de `search`.
+        """
+        queries = normalize_rows(query_vectors)
+        with self._lock:
+            self._refresh()
+            if not self.header["count"]:
+                return [[] for _ in queries]
+            if where:
+                rows = self._filter_rows(where)
+                if rows is None or not len(rows):
+                    return [[] for _ in queries]
+                vectors = self._vectors[rows]
+                results = []
+                for start in range(0, len(queries), QUERY_BLOCK):
+                    scores = vectors @ queries[start:start + QUERY_BLOCK].T
+                    results.extend(self._top_k(scores[:, i], k, rows) for i in range(scores.shape[1]))
+                return results
+            if self._ivf is None or self.index_type != "ivf":
+                # Par blocs de requêtes pour borner la taille de la matrice des scores
+                results = []
+                for start in range(0, len(queries), QUERY_BLOCK):
+                    scores = self._vectors @ queries[start:start + QUERY_BLOCK].T
+                    results.extend(self._top_k(scores[:, i], k) for i in range(scores.shape[1]))
+                return results
+            results = []
+            for query in queries:
+                rows = self._candidate_rows(query)
+                results.append(self._top_k(self._vectors[rows] @ query, k, rows))
+            return results
+
+
+class ChromaVectorIndex:
+    """Collection Chroma derrière la même interface que `MmapVectorIndex`."""
+
+    def __init__(self, persist_directory, collection_name, embedding=None):
+        # Import différé : chromadb est long à charger
+        from langchain_community.vectorstores import Chroma
+        self.vectorstore = Chroma(
+            persist_directory=persist_directory,
+            embedding_function=embedding,
+            collection_name=collection_name
+        )
+        # Les distances de Chroma dépendent de la métrique de la collection : elles
+        # sont ramenées à la similarité cosinus, comme pour le backend mmap, pour que
+        # VECTORSTORE_CONFIG["score_threshold"] ait le même sens pour les deux
+        self._space = (self.vectorstore._collection.metadata or {}).get("hnsw:space", "l2")
+
+    def count(self):
+        return self.vectorstore._collection.count()
+
+    def ids(self):
+        return set(self.vectorstore.get(include=[])["ids"])
+
+    def add(self, ids, vectors, documents):
+        if ids:
+            self.vectorstore._collection.add(
+                ids=list(ids),
+                embeddings=[[float(x) for x in vector] for vector in vectors],
+                metadatas=[doc.metadata for doc in documents],
+                documents=[doc.page_content for doc in documents]
+            )
+
+    def delete(self, ids):
+        if ids:
+            self.vectorstore.delete(ids=list(ids))
+
+    def metadata_keys(self):
+        sample = self.vectorstore.get(limit=1, include=["metadatas"])["metadatas"]
+        return set(sample[0]) if sample and sample[0] else set()
+
+    def metadatas(self, ids):
+        if not ids:
+            return {}
+        stored = self.vectorstore.get(ids=list(ids), include=["metadatas"])
+        return {chunk_id: metadata or {} for chunk_id, metadata in zip(stored["ids"], stored["metadatas"])}
+
+    def update_metadata(self, ids, documents):
+        if ids:
+            self.vectorstore._collection.update(
+                ids=list(ids), metadatas=[doc.metadata for doc in documents]
+            )
+
+    def _similarity(self, distance):
+        # Distance L2 au carré entre vecteurs normalisés : 2 - 2·cos ;
+        # distances "cosine" et "ip" : 1 - cos
+        similarity = 1.0 - distance / 2 if self._space == "l2" else 1.0 - distance
+        return min(1.0, max(0.0, similarity))
+
+    def search(self, query_vector, k=5, where=None):
+        return self.search_many([query_vector], k, where)[0]
+
+    def search_many(self, query_vectors, k=5, where=None):
+        # Une seule requête Chroma pour toutes les questions, filtre appliqué par Chroma
+        results = self.vectorstore._collection.query(
+            query_embeddings=[[float(x) for x in vector] for vector in query_vectors],
+            n_results=k,
+            where=chroma_where(where),
+            include=["documents", "metadatas", "distances"]
+        )
+        return [
+            [(Document(page_content=text, metadata=metadata or {}), self._similarity(distance))
+             for text, metadata, distance in zip(texts, metadatas, distances)]
+            for texts, metadatas, distances in zip(
+                results["documents"], results["metadatas"], results["distances"]
+            )
+        ]
+
+
+def open_vector_index(persist_directory, backend="mmap", collection_name=None, embedding=None,
+                      index_type="flat", nlist=None, nprobe=8):
+    """
+    Ouvre l'index vectoriel configuré.
+
+    Args:
+        backend (str): "mmap" (index en processus) ou "chroma".
+        collection_name (str): Collection Chroma (backend "chroma").
+        embedding: Modèle d'embedding de la collection Chroma.
+        index_type (str): "flat" (recherche exacte) ou "ivf" (backend "mmap").
+    """
+    if backend == "mmap":
+        return MmapVectorIndex(persist_directory, index_type=index_type, nlist=nlist, nprobe=nprobe)
+    if backend == "chroma":
+        return ChromaVectorIndex(persist_directory, collection_name, embedding)
+    raise ValueError(f"Backend de vector store inconnu : {backend}")